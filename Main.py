@@ -16,6 +16,7 @@ from cryptography.fernet import Fernet
 import sys
 import gc
 import psutil
+import numpy as np
 from contextlib import contextmanager
 
 from pyrosm.geometry import haversine
@@ -28,12 +29,18 @@ from asset.distanc import get_distance, SENSORS
 from mod.geoc import geocode_opencage
 from asset.Headless import NanoDetDetector
 from asset.Nanodet import NanoDetVisualizer
-
-try:
-    import pyttsx3
-except ImportError:
-    pyttsx3 = None
-    logging.warning("pyttsx3 not installed. TTS will not function.")
+from asset.admission import FrameAdmission
+from asset.affinity import ROLE_DETECTION, ROLE_IO, CoreBudget
+from asset.detections import ZONE_LEFT, ZONE_RIGHT
+from asset.hazard import HazardScorer
+from asset.instrument import Instrumentation
+from asset.multicam import CameraSource
+from asset.preview import PreviewServer
+from asset.roi import RoiScheduler
+from asset.switcher import ModelSwitcher
+from asset.workers import DetectionWorkerPool
+from asset.tracking import Tracker
+from asset.tts import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_URGENT, default_worker
 
 # Optimized logging - reduce I/O overhead
 log_file = open("system.log", "a", buffering=8192)
@@ -55,12 +62,37 @@ last_action_time = 0
 ESP32_COMMAND_URL = "http://192.168.206.213/vibrate"  # Change to ESP32 IP
 VIBRATION_THRESHOLD_CM = 50
 VIBRATION_ACTIVE = False
+HAZARD_VIBRATION_S = 1.5  # Vibration hold time after a time-to-collision alert
+hazard_vibration_until = 0.0
+vibration_wakeup = threading.Event()  # Cuts the distance loop's sleep short on a hazard
 
 
 # Configuration with power-saving defaults
 GRAPH_HOPPER_URL = "http://localhost:8989/route"
 ESP32_CAM_URL = "http://192.168.206.206:81/stream"
 USE_ESP32_CAM = True
+USB_CAMERA_INDEX = None  # e.g. 0 to run a USB camera next to the ESP32-CAM on the same model
+DETECT_EVERY_N_FRAMES = 3  # Tracker predictions fill the frames in between
+SCORE_FLOOR = 0.35  # No class is announced (or decoded) below this, whatever its per-class threshold
+DETECTION_ROI_MODE = "crop"  # "full", "crop" (drop the sky band) or "tile" (plus native-res corridor tiles, decodes at full scale)
+# Detector variants from cheapest to most accurate; the switcher moves between them with load.
+# "artifact" files are written by tools/compile_model.py and used when present.
+DETECTION_MODELS = [
+    {"config": "config/legacy_v0.x_configs/nanodet-m.yml", "model": "model/nanodet_m.ckpt",
+     "artifact": "model/nanodet_m.frozen.pt"},
+    {"config": "config/nanodet-plus-m_416.yml", "model": "model/nanodet-plus-m_416.ckpt",
+     "artifact": "model/nanodet-plus-m_416.frozen.pt"},
+]
+DETECTION_LATENCY_BUDGET = 0.25  # Seconds per inferred frame before stepping down a model
+DETECTION_WORKERS = 0  # >0 runs inference in that many worker processes (cheapest variant, no switching)
+DETECTION_ENGINE = "torch"  # "onnx" = ONNX Runtime FP32, "int8" = calibrated model from tools/quant_report.py
+DETECTION_PREVIEW_PORT = None  # e.g. 8090 serves an MJPEG preview of the detections at /stream
+# Per-stage timing histograms and drop/reconnect counters, logged on exit
+DETECTION_INSTRUMENTATION = False
+# Core budget: inference (torch pool, worker processes) vs. sensor/voice/audio loops.
+# None = all cores but 0 for detection and core 0 for the rest.
+DETECTION_CORES = None  # e.g. [1, 2, 3] on a 4-core Pi
+IO_CORES = None  # e.g. [0]
 SERIAL_PORT = "/dev/serial0"
 BAUD_RATE = 115200
 SAVE_FILE = "saved_locations.json"
@@ -84,12 +116,29 @@ class PowerManager:
         self.low_power_mode = False
         self.last_activity = time.time()
         self.cpu_samples = deque(maxlen=10)
+        self.avg_cpu = 0.0
+        self.battery_percent = None
+        self.power_plugged = True
+        self.model_switcher = None
 
     def check_system_resources(self):
         """Monitor CPU and adjust performance accordingly"""
         cpu_percent = psutil.cpu_percent(interval=None)
         self.cpu_samples.append(cpu_percent)
         avg_cpu = sum(self.cpu_samples) / len(self.cpu_samples)
+        self.avg_cpu = avg_cpu
+
+        try:
+            battery = psutil.sensors_battery()
+        except Exception:
+            battery = None
+        if battery is not None:
+            self.battery_percent = battery.percent
+            self.power_plugged = bool(battery.power_plugged)
+
+        # Load also picks the detector size, so quality degrades before the device goes quiet
+        if self.model_switcher is not None:
+            self.model_switcher.update_load(avg_cpu, self.battery_percent, self.power_plugged)
 
         # Enable low power mode if high CPU usage
         if avg_cpu > CPU_USAGE_THRESHOLD:
@@ -113,6 +162,7 @@ class PowerManager:
 
 
 power_manager = PowerManager()
+core_budget = CoreBudget(detection_cores=DETECTION_CORES, io_cores=IO_CORES)
 
 
 class AdaptiveThreshold:
@@ -127,13 +177,79 @@ class AdaptiveThreshold:
         }
         self.last_announcements = {}
         self.cooldown = 4.0  # Increased cooldown to save power
+        self.track_cooldown = 15.0  # Same tracked object is not repeated within this window
+        self.hazard_cooldown = 3.0  # Approaching hazards are repeated much sooner
+        self.last_hazard_alerts = {}
+        self._threshold_cache = (None, None)
+        self.detector = None
+        self._pushed_thresholds = None
 
     def get_threshold(self, class_name):
         # Higher thresholds in low power mode
         base = self.class_thresholds.get(class_name, self.base_threshold)
         if power_manager.low_power_mode:
-            return base * 1.3
-        return base
+            base *= 1.3
+        return max(base, SCORE_FLOOR)
+
+    def threshold_array(self, class_names):
+        """Per-class-id thresholds, rebuilt only when the settings change"""
+        key = (tuple(class_names), self.base_threshold, power_manager.low_power_mode,
+               tuple(sorted(self.class_thresholds.items())))
+        if self._threshold_cache[0] != key:
+            thresholds = np.array([self.get_threshold(name) for name in class_names], dtype=np.float32)
+            self._threshold_cache = (key, thresholds)
+        return self._threshold_cache[1]
+
+    def attach(self, detector):
+        """Push thresholds into the detector so they are applied before decoding/NMS"""
+        self.detector = detector
+        self._pushed_thresholds = None
+        self.sync_detector()
+
+    def sync_detector(self):
+        if self.detector is None:
+            return
+        thresholds = self.threshold_array(self.detector.class_names)
+        if thresholds is not self._pushed_thresholds:
+            self.detector.set_class_thresholds(thresholds)
+            self._pushed_thresholds = thresholds
+
+    def filter_announceable(self, batch):
+        """Vectorized should_announce over a DetectionBatch; cooldown per track, else per class and zone"""
+        candidates = batch.above(self.threshold_array(batch.class_names))
+        if not candidates:
+            return candidates
+
+        now = time.time()
+        scale = 2 if power_manager.low_power_mode else 1
+        # Tracked objects get negative keys, untracked ones fall back to class/zone keys
+        track_ids = candidates.track_id.astype(np.int64)
+        keys = np.where(
+            track_ids >= 0,
+            -(track_ids + 1),
+            candidates.class_id.astype(np.int64) * 4 + (candidates.zone.astype(np.int64) + 1)
+        )
+        unique_keys, first = np.unique(keys, return_index=True)
+
+        keep = []
+        for key, idx in zip(unique_keys.tolist(), first.tolist()):
+            cooldown = (self.track_cooldown if key < 0 else self.cooldown) * scale
+            if key in self.last_announcements and now - self.last_announcements[key] < cooldown:
+                continue
+            self.last_announcements[key] = now
+            keep.append(idx)
+        return candidates[np.array(keep, dtype=np.intp)]
+
+    def filter_hazards(self, hazards):
+        """Hazards (soonest first) whose track has not been alerted within hazard_cooldown"""
+        now = time.time()
+        keep = []
+        for idx, track_id in enumerate(hazards.track_id.tolist()):
+            if now - self.last_hazard_alerts.get(track_id, 0.0) < self.hazard_cooldown:
+                continue
+            self.last_hazard_alerts[track_id] = now
+            keep.append(idx)
+        return hazards[np.array(keep, dtype=np.intp)]
 
     def should_announce(self, detection):
         class_name = detection.get('class_name', '')
@@ -156,11 +272,15 @@ class AdaptiveThreshold:
     def cleanup_old_announcements(self):
         """Remove old announcement records to save memory"""
         now = time.time()
-        cutoff = now - (self.cooldown * 3)
+        cutoff = now - max(self.cooldown * 3, self.track_cooldown * 2)
         self.last_announcements = {
             k: v for k, v in self.last_announcements.items()
             if v > cutoff
         }
+        self.last_hazard_alerts = {
+            k: v for k, v in self.last_hazard_alerts.items()
+            if v > now - self.hazard_cooldown * 3
+        }
 
 
 adaptive_threshold = AdaptiveThreshold()
@@ -171,28 +291,13 @@ emergency_number = None
 
 
 
-class RHVoiceTTS:
-    def __init__(self, lang="tl", voice="angela"):
-        self.lang = lang
-        self.voice = voice
-
-    def speak(self, text: str):
-        try:
-            subprocess.run(
-                ["RHVoice-client", "-s", self.voice, "-p", "100", "-r", "0", "-v", "1"],
-                input=text.encode("utf-8"),
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-        except Exception as e:
-            logging.error(f"RHVoice TTS error: {e}")
-
-# Replace pyttsx3 with RHVoice
-tts = RHVoiceTTS()
+# One RHVoice worker for every module; speak() queues and returns
+tts = default_worker()
 
-def speak(msg):
-    if not halt_announcements:
-        tts.speak(msg)
+def speak(msg, priority=PRIORITY_NORMAL, max_wait=None, wait=False):
+    if halt_announcements:
+        return
+    tts.speak(msg, priority=priority, max_wait=max_wait, wait=wait)
 
 def send_vibration_command(on: bool):
     """Send command to ESP32 to trigger or stop vibration motor."""
@@ -225,7 +330,8 @@ def error_handler(operation_name):
 
 
 def voice_once_and_handle():
-    speak("Listening...")
+    # Finish talking before the microphone opens
+    speak("Listening...", priority=PRIORITY_HIGH, wait=True)
     text = listen_filtered_command(min_confidence=0.75)
     if text:
         handle_voice_command(text)
@@ -416,31 +522,47 @@ def fuzzy_geocode_offline(name):
     return None
 
 
-def announce_detections(dets):
-    if halt_announcements or power_manager.low_power_mode:
+def alert_hazards(hazards):
+    """Vibrate and announce objects on a collision course, soonest first"""
+    global hazard_vibration_until
+    # monitor_distance sends the (blocking) ESP32 command; only wake it up from here
+    hazard_vibration_until = time.monotonic() + HAZARD_VIBRATION_S
+    vibration_wakeup.set()
+
+    if halt_announcements:
+        return
+    fresh = adaptive_threshold.filter_hazards(hazards)
+    if fresh:
+        nearest = fresh[0]
+        side = "kaliwa" if nearest['direction'] == "left" else "kanan"
+        speak(f"Ingat! {nearest['class_name']} sa {side}", priority=PRIORITY_URGENT, max_wait=HAZARD_VIBRATION_S)
+
+
+def announce_detections(dets, hazards=None):
+    # Collision hazards go first and bypass the per-side limit
+    if hazards:
+        alert_hazards(hazards)
+
+    if halt_announcements:
         return
 
     # More aggressive filtering to reduce announcements
-    speakable = [d for d in dets if adaptive_threshold.should_announce(d)]
+    speakable = adaptive_threshold.filter_announceable(dets)
+    if hazards and speakable:
+        speakable = speakable.filter(~np.isin(speakable.track_id, hazards.track_id))
     if not speakable:
         return
 
     # Group by direction to reduce speech
-    left = set()
-    right = set()
-    for d in speakable:
-        side = d.get("direction", "")
-        name = d.get("class_name", "object")
-        if side == "kaliwa":
-            left.add(name)
-        elif side == "kanan":
-            right.add(name)
+    left = speakable.filter(speakable.zone == ZONE_LEFT).unique_names()
+    right = speakable.filter(speakable.zone == ZONE_RIGHT).unique_names()
 
     # Limit announcements to most important
+    # Scene descriptions go stale quickly
     if left and len(left) <= 2:
-        speak(f"Kaliwa: {', '.join(list(left)[:2])}")
+        speak(f"Kaliwa: {', '.join(left[:2])}", priority=PRIORITY_LOW, max_wait=3.0)
     if right and len(right) <= 2:
-        speak(f"Kanan: {', '.join(list(right)[:2])}")
+        speak(f"Kanan: {', '.join(right[:2])}", priority=PRIORITY_LOW, max_wait=3.0)
 
 
 def gps_and_voice_live(simulated_input=None):
@@ -452,7 +574,7 @@ def gps_and_voice_live(simulated_input=None):
             return
 
         current_coords = location['coordinates']
-        speak("Ang lokasyon ay nakita na.")
+        speak("Ang lokasyon ay nakita na.", wait=True)
 
         dest = simulated_input or listen_filtered_command(min_confidence=0.75)
         if not dest:
@@ -492,7 +614,7 @@ def gps_and_voice_live(simulated_input=None):
 
             dist = haversine(lat1, lon1, lat2, lon2)
             if dist < 10:
-                speak(instr['text'][:50])
+                speak(instr['text'][:50], priority=PRIORITY_HIGH)
                 index += 1
             else:
                 print(f"[GPS] Approaching step {index + 1} - {int(dist)}m away")
@@ -521,29 +643,134 @@ def send_vibration_command(on: bool):
 
 
 
+def detector_args(variant):
+    """Constructor kwargs for one DETECTION_MODELS entry, or None when its files are missing"""
+    if DETECTION_ENGINE == "torch" and os.path.exists(variant["artifact"]):
+        return {"artifact_path": variant["artifact"], "fast_preprocess": True}
+    if os.path.exists(variant["model"]):
+        return {"config_path": variant["config"], "model_path": variant["model"],
+                "engine": DETECTION_ENGINE, "fast_preprocess": True}
+    return None
+
+
+def load_detectors(variants=DETECTION_MODELS):
+    """Load every available variant, cheapest first"""
+    detectors = []
+    for variant in variants:
+        try:
+            args = detector_args(variant)
+            if args is None:
+                logging.warning(f"Detection model {variant['model']} not found, variant skipped")
+            elif "artifact_path" in args:
+                detectors.append(NanoDetVisualizer.from_artifact(**args))
+            else:
+                detectors.append(NanoDetVisualizer(**args))
+        except Exception as e:
+            logging.warning(f"Failed to load detector {variant['config']}: {e}")
+
+    # The switcher needs matching classes; keep the variants that agree with the first one
+    if detectors:
+        names = list(detectors[0].class_names)
+        detectors = [d for d in detectors if list(d.class_names) == names]
+    return detectors
+
+
 def run_detection():
     with error_handler("Object detection"):
         try:
-            detector = NanoDetVisualizer("config/legacy_v0.x_configs/nanodet-m.yml", "model/nanodet_m.ckpt")
+            if DETECTION_WORKERS:
+                args = detector_args(DETECTION_MODELS[0])
+                if args is None:
+                    logging.error("No detection model could be loaded. Skipping detection.")
+                    return
+                backend = DetectionWorkerPool(
+                    args, num_workers=DETECTION_WORKERS, cpu_affinity=core_budget.detection_cores
+                ).start()
+                backend.set_roi(RoiScheduler(mode=DETECTION_ROI_MODE))
+                # The model lives in the workers; locally only capture and drawing are needed
+                detectors = [NanoDetVisualizer.without_model(backend.class_names, backend.input_size,
+                                                             backend.keep_ratio)]
+            else:
+                detectors = load_detectors(DETECTION_MODELS)
+                if not detectors:
+                    logging.error("No detection model could be loaded. Skipping detection.")
+                    return
+                backend = ModelSwitcher(
+                    detectors,
+                    latency_budget=DETECTION_LATENCY_BUDGET,
+                    cpu_high=CPU_USAGE_THRESHOLD,
+                    battery_low=LOW_BATTERY_THRESHOLD
+                )
+                backend.set_roi(RoiScheduler(mode=DETECTION_ROI_MODE))
+                backend.warmup()
+                power_manager.model_switcher = backend
+            detector = detectors[0]
+            if DETECTION_INSTRUMENTATION:
+                instrument = Instrumentation(enabled=True)
+                for d in detectors:
+                    d.set_instrumentation(instrument)
+            adaptive_threshold.attach(backend)
+
+            hazard_scorer = HazardScorer(detector.class_names)
+            preview = None
+            if DETECTION_PREVIEW_PORT:
+                try:
+                    preview = PreviewServer(lambda frame, dets: detector.visualize(frame, dets, 0.0),
+                                            port=DETECTION_PREVIEW_PORT).start()
+                except OSError as e:
+                    logging.warning(f"Detection preview unavailable: {e}")
 
             def detection_callback(dets):
-                announce_detections(dets)
+                adaptive_threshold.sync_detector()
+                hazard_scorer.update(dets, time.monotonic())
+                announce_detections(dets, hazard_scorer.urgent(dets))
                 crowd_monitor.update_detection_time()
+                crowd_monitor.crowd_analysis(dets, dets.frame_size)
 
                 # Periodic memory cleanups
                 if time.time() % 30 < 0.1:
                     adaptive_threshold.cleanup_old_announcements()
                     power_manager.force_gc()
 
-            logging.info("Checking camera availability...")
-            if not detector.is_camera_available(ESP32_CAM_URL if USE_ESP32_CAM else 0):
-                logging.warning("Camera not available. Detection thread will exit cleanly.")
-                return
-
-            detector.process_camera(
-                url=ESP32_CAM_URL if USE_ESP32_CAM else 0,
-                on_detect=detection_callback
-            )
+            try:
+                if USE_ESP32_CAM and USB_CAMERA_INDEX is not None:
+                    # Chest camera first; each source gets its own tracker id range
+                    sources = [
+                        CameraSource(ESP32_CAM_URL, name="chest", fps=6.0, priority=1),
+                        CameraSource(USB_CAMERA_INDEX, name="usb", fps=3.0),
+                    ]
+                    detector.process_cameras(
+                        sources,
+                        score_threshold=0.0,
+                        on_detect=lambda name, dets: detection_callback(dets),
+                        trackers={s.name: Tracker(detector.class_names, first_id=i * 1000000)
+                                  for i, s in enumerate(sources)},
+                        backend=backend,
+                        preview=preview
+                    )
+                    return
+
+                logging.info("Checking camera availability...")
+                if not detector.is_camera_available(ESP32_CAM_URL if USE_ESP32_CAM else 0):
+                    logging.warning("Camera not available. Detection thread will exit cleanly.")
+                    return
+
+                # Per-class thresholds are already enforced inside the detector
+                detector.process_camera(
+                    url=ESP32_CAM_URL if USE_ESP32_CAM else 0,
+                    score_threshold=0.0,
+                    on_detect=detection_callback,
+                    admission=FrameAdmission(),
+                    tracker=Tracker(detector.class_names),
+                    detect_every=DETECT_EVERY_N_FRAMES,
+                    backend=backend,
+                    preview=preview
+                )
+            finally:
+                if DETECTION_WORKERS:
+                    backend.shutdown()
+                if preview is not None:
+                    preview.stop()
 
         except RuntimeError as e:
             logging.error(f"Camera access failed: {e}. Skipping detection.")
@@ -557,6 +784,7 @@ def monitor_inactivity():
 
             # Check system resources periodically
             power_manager.check_system_resources()
+            adaptive_threshold.sync_detector()
 
             sleep_time = power_manager.get_sleep_interval('inactivity')
             time.sleep(sleep_time)
@@ -578,8 +806,10 @@ def monitor_distance():
                     if dist < VIBRATION_THRESHOLD_CM:
                         too_close = True
 
-            send_vibration_command(on=too_close)
-            time.sleep(power_manager.get_sleep_interval('distance'))
+            # Keep vibrating while a time-to-collision alert is active
+            send_vibration_command(on=too_close or time.monotonic() < hazard_vibration_until)
+            # Measures wake-up delay, the symptom of inference starving the ultrasonic loop
+            core_budget.sleep(power_manager.get_sleep_interval('distance'), "distance", wake=vibration_wakeup)
 
 def system_monitor():
     """Monitor system health and adjust performance"""
@@ -593,6 +823,7 @@ def system_monitor():
                 cpu = psutil.cpu_percent()
                 memory = psutil.virtual_memory().percent
                 logging.info(f"System: CPU {cpu}%, RAM {memory}%, Low Power: {power_manager.low_power_mode}")
+                logging.info(f"Core budget: {core_budget.stats}")
 
             time.sleep(30)  # Check every 30 seconds
 
@@ -606,19 +837,23 @@ def start_all():
     load_emergency_contact()
 
     # Prioritized thread list - critical functions first
-    voice_listener_thread = threading.Thread(target=continuous_voice_loop, daemon=True, name="VoiceListener")
+    # Before any inference; each thread pins itself, so what it spawns inherits its cores
+    core_budget.apply_torch()
+    voice_listener_thread = threading.Thread(
+        target=core_budget.run_as(ROLE_IO, continuous_voice_loop), daemon=True, name="VoiceListener"
+    )
 
     threads = [
-        threading.Thread(target=run_detection, daemon=True, name="Detection"),
-        threading.Thread(target=monitor_distance, daemon=True, name="Distance"),
-        threading.Thread(target=monitor_inactivity, daemon=True, name="Inactivity"),
-        threading.Thread(target=system_monitor, daemon=True, name="SystemMonitor"),
-        threading.Thread(target=gps_and_voice_live, daemon=True, name="GPS"),
+        threading.Thread(target=core_budget.run_as(ROLE_DETECTION, run_detection), daemon=True, name="Detection"),
+        threading.Thread(target=core_budget.run_as(ROLE_IO, monitor_distance), daemon=True, name="Distance"),
+        threading.Thread(target=core_budget.run_as(ROLE_IO, monitor_inactivity), daemon=True, name="Inactivity"),
+        threading.Thread(target=core_budget.run_as(ROLE_IO, system_monitor), daemon=True, name="SystemMonitor"),
+        threading.Thread(target=core_budget.run_as(ROLE_IO, gps_and_voice_live), daemon=True, name="GPS"),
         voice_listener_thread  # ✅ Added correctly now
     ]
 
     esp32_thread = threading.Thread(
-        target=poll_esp32_buttons, daemon=True, name="ESP32Poll"
+        target=core_budget.run_as(ROLE_IO, poll_esp32_buttons), daemon=True, name="ESP32Poll"
     )
     esp32_thread.start()
 
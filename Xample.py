@@ -42,7 +42,7 @@ def my_detection_handler(detections):
 # ESP32-CAM stream + direction-aware TTS
 visualizer.process_camera(
     url="http://192.168.4.2:81/stream",  # Your ESP32 stream
-    log_file="detections.log",
+    log_file="detections.jsonl.gz",
     on_detect=my_detection_handler,
     score_threshold=0.35,
     window_name="NanoDet Direction View",
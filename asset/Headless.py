@@ -1,6 +1,7 @@
+import logging
 import os
 import time
-from typing import List, Tuple, Union, Optional
+from typing import Dict, List, Sequence, Tuple, Union, Optional
 
 import cv2
 import torch
@@ -13,6 +14,17 @@ from nanodet.model.arch import build_model
 from nanodet.util import Logger, cfg, load_config, load_model_weight
 from nanodet.util.path import mkdir
 
+from asset.artifact import load_artifact
+from asset.detections import DetectionBatch
+from asset.engines import FrozenEngine, build_engine
+from asset.instrument import DISABLED, Instrumentation
+from asset.postprocess import NanoDetDecoder
+from asset.preprocess import FastPreprocessor
+from asset.roi import RoiScheduler
+
+# Pristine nanodet defaults, taken before any config is merged into the global cfg
+_DEFAULT_CFG = cfg.clone()
+
 
 class NanoDetDetector:
 	"""
@@ -20,7 +32,8 @@ class NanoDetDetector:
 	Returns raw detection results without visualization.
 	"""
 
-	def __init__(self, config_path: str, model_path: str, device: str = "cpu"):
+	def __init__(self, config_path: str, model_path: str, device: str = "cpu", engine: str = "torch",
+				 fast_preprocess: bool = False):
 		"""
 		Initialize NanoDet object detector.
 
@@ -28,49 +41,193 @@ class NanoDetDetector:
 			config_path (str): Path to model config file
 			model_path (str): Path to model weights file
 			device (str, optional): Device to run on ('cpu' or 'cuda'). Defaults to 'cpu'.
+			engine (str, optional): Inference engine ('torch', 'onnx' or 'int8'). Defaults to 'torch'.
+			fast_preprocess (bool, optional): Use the preallocated single-frame preprocessing path. Defaults to False.
 		"""
 		self.device = device
+		self.model_path = model_path
 
-		# Load configuration
-		load_config(cfg, config_path)
+		# Load configuration into a private copy of the defaults, so several
+		# detectors with different configs can coexist in one process
+		self.cfg = _DEFAULT_CFG.clone()
+		load_config(self.cfg, config_path)
 		self.logger = Logger(-1, use_tensorboard=False)
 		self.logger.log = lambda *args, **kwargs: None
 
 		# Build and load model
-		model = build_model(cfg.model)
+		model = build_model(self.cfg.model)
 		ckpt = torch.load(model_path, map_location=lambda storage, loc: storage)
 		load_model_weight(model, ckpt, self.logger)
 
 		# Handle RepVGG conversion if needed
-		if cfg.model.arch.backbone.name == "RepVGG":
-			deploy_config = cfg.model
+		if self.cfg.model.arch.backbone.name == "RepVGG":
+			deploy_config = self.cfg.model
 			deploy_config.arch.backbone.update({"deploy": True})
 			deploy_model = build_model(deploy_config)
 			from nanodet.model.backbone.repvgg import repvgg_det_model_convert
 			model = repvgg_det_model_convert(model, deploy_model)
 
 		self.model = model.to(device).eval()
-		self.pipeline = Pipeline(cfg.data.val.pipeline, cfg.data.val.keep_ratio)
-		self.class_names = cfg.class_names
+		self.pipeline_cfg = self.cfg.data.val.pipeline
+		self.pipeline = Pipeline(self.cfg.data.val.pipeline, self.cfg.data.val.keep_ratio)
+		self.class_names = self.cfg.class_names
+		self.input_size = self.cfg.data.val.input_size
+		self.keep_ratio = self.cfg.data.val.keep_ratio
+		self.decoder = NanoDetDecoder.from_head_cfg(self.cfg.model.arch.head)
+		self.fixed_shape = None
+		self.roi = None
+		self.instrument = DISABLED
+		# Optional per-class minimum scores, e.g. `class_thresholds: {person: 0.2}` in the YAML
+		self.class_thresholds = dict(self.cfg.get("class_thresholds", None) or {})
+		if self.class_thresholds:
+			self.set_class_thresholds(self.class_thresholds)
+		self.engine = build_engine(engine, self.model, model_path, self.input_size, len(self.class_names))
+		self._setup_fast_preprocess(fast_preprocess)
+		if self.fast_preprocess is not None and engine == "torch":
+			# Matches the channels-last layout of the preallocated input view
+			self.model = self.model.to(memory_format=torch.channels_last)
 
-	def detect(self, img: Union[str, np.ndarray]) -> Tuple[dict, list]:
+	@classmethod
+	def from_artifact(cls, artifact_path: str, device: str = "cpu", fast_preprocess: bool = False) -> "NanoDetDetector":
 		"""
-		Perform object detection on an input image.
+		Restore a detector from a frozen artifact written by tools/compile_model.py.
+		Skips config parsing, graph construction, checkpoint loading and RepVGG conversion.
+
+		Args:
+			artifact_path (str): Path to the compiled .frozen.pt file
+			device (str, optional): Device to run on ('cpu' or 'cuda'). Defaults to 'cpu'.
+			fast_preprocess (bool, optional): Use the preallocated single-frame preprocessing path. Defaults to False.
+
+		Returns:
+			NanoDetDetector: Ready-to-use detector (or subclass instance)
+		"""
+		module, meta = load_artifact(artifact_path, device)
+
+		self = cls.__new__(cls)
+		self.device = device
+		self.model_path = artifact_path
+		self.cfg = None
+		self.model = module
+		self.pipeline_cfg = meta["pipeline"]
+		self.pipeline = Pipeline(meta["pipeline"], meta["keep_ratio"])
+		self.class_names = meta["class_names"]
+		self.input_size = meta["input_size"]
+		self.keep_ratio = meta["keep_ratio"]
+		self.decoder = NanoDetDecoder(**meta["decoder"])
+		self.class_thresholds = meta.get("class_thresholds", {})
+		if self.class_thresholds:
+			self.set_class_thresholds(self.class_thresholds)
+		# The graph was traced at one shape, so every batch is padded to it
+		self.fixed_shape = tuple(meta["input_shape"])
+		self.roi = None
+		self.instrument = DISABLED
+		self.engine = FrozenEngine(module)
+		self._setup_fast_preprocess(fast_preprocess)
+		return self
+
+	@classmethod
+	def without_model(cls, class_names: Sequence[str], input_size: Sequence[int], keep_ratio: bool = True) -> "NanoDetDetector":
+		"""
+		Detector shell without a model, for the capture and drawing side when
+		inference runs elsewhere (e.g. in a DetectionWorkerPool backend).
+		`detect` and `get_detections` are unavailable on it.
+
+		Args:
+			class_names (Sequence[str]): Class names of the remote model
+			input_size (Sequence[int]): Model input [w, h], used for reduced decoding
+			keep_ratio (bool): Whether the remote pipeline keeps aspect ratio
+
+		Returns:
+			NanoDetDetector: Model-less instance (or subclass instance)
+		"""
+		self = cls.__new__(cls)
+		self.device = "cpu"
+		self.model_path = None
+		self.cfg = None
+		self.model = None
+		self.pipeline_cfg = None
+		self.pipeline = None
+		self.class_names = list(class_names)
+		self.input_size = list(input_size)
+		self.keep_ratio = keep_ratio
+		self.decoder = None
+		self.class_thresholds = {}
+		self.fixed_shape = None
+		self.roi = None
+		self.instrument = DISABLED
+		self.engine = None
+		self.fast_preprocess = None
+		return self
+
+	def set_class_thresholds(self, thresholds: Union[Dict[str, float], Sequence[float], None],
+							 default: float = 0.0, multiplier: float = 1.0) -> None:
+		"""
+		Set per-class minimum scores. They are applied to the raw head output
+		before box decoding and NMS, so low-scoring candidates never get decoded.
+
+		Args:
+			thresholds (Union[Dict[str, float], Sequence[float], None]): Mapping of class name
+				to minimum score, a sequence aligned with class_names, or None to reset
+			default (float): Threshold for classes missing from the mapping
+			multiplier (float): Scale applied to every threshold (e.g. low-power mode)
+		"""
+		if thresholds is None:
+			self.decoder.set_class_thresholds(None)
+			return
+		if isinstance(thresholds, dict):
+			unknown = set(thresholds) - set(self.class_names)
+			if unknown:
+				logging.warning(f"Thresholds for unknown classes ignored: {sorted(unknown)}")
+			values = [thresholds.get(name, default) for name in self.class_names]
+		else:
+			values = list(thresholds)
+		self.decoder.set_class_thresholds([v * multiplier for v in values])
+
+	def set_roi(self, roi: Optional[RoiScheduler]) -> None:
+		"""
+		Restrict inference to regions of interest (top-band crop or corridor tiles).
+
+		Args:
+			roi (Optional[RoiScheduler]): Region scheduler, or None to infer the whole frame
+		"""
+		if roi is not None and roi.tile_size is None:
+			roi.tile_size = tuple(self.input_size)
+		self.roi = roi
+
+	def set_instrumentation(self, instrument: Optional[Instrumentation]) -> None:
+		"""
+		Record per-stage timings of detect/get_detections (and of process_camera in subclasses).
+
+		Args:
+			instrument (Optional[Instrumentation]): Shared recorder, or None to stop recording
+		"""
+		self.instrument = instrument if instrument is not None else DISABLED
+
+	def _setup_fast_preprocess(self, enabled: bool) -> None:
+		self.fast_preprocess = None
+		if enabled:
+			self.fast_preprocess = FastPreprocessor(
+				self.input_size, self.keep_ratio, self.pipeline_cfg["normalize"], pad_shape=self.fixed_shape
+			)
+
+	def _preprocess(self, img: Union[str, np.ndarray], img_id: int = 0) -> dict:
+		"""
+		Read (if needed), resize and normalize one image into a model-ready meta dict.
 
 		Args:
 			img (Union[str, np.ndarray]): Either path to image or numpy array
+			img_id (int): Index of the image inside its batch
 
 		Returns:
-			Tuple[dict, list]:
-				- meta: Dictionary containing image metadata
-				- results: List of detections (each detection contains bbox, score, class_id)
+			dict: meta with img_info, raw_img, warp_matrix and a CHW img tensor
 		"""
-		img_info = {"id": 0}
+		img_info = {"id": img_id}
 		if isinstance(img, str):
 			img_info["file_name"] = os.path.basename(img)
-			img = cv2.imread(img)
+			path = img
+			img = cv2.imread(path)
 			if img is None:
-				raise ValueError(f"Could not read image from {img}")
+				raise ValueError(f"Could not read image from {path}")
 		else:
 			img_info["file_name"] = None
 
@@ -79,46 +236,150 @@ class NanoDetDetector:
 		img_info["width"] = width
 		meta = dict(img_info=img_info, raw_img=img, img=img)
 
-		# Preprocess image
-		meta = self.pipeline(None, meta, cfg.data.val.input_size)
+		meta = self.pipeline(None, meta, self.input_size)
 		meta["img"] = torch.from_numpy(meta["img"].transpose(2, 0, 1)).to(self.device)
-		meta = naive_collate([meta])
+		return meta
+
+	def _collate(self, metas: List[dict]) -> dict:
+		meta = naive_collate(metas)
 		meta["img"] = stack_batch_img(meta["img"], divisible=32)
+		if self.fixed_shape is not None:
+			pad_h = self.fixed_shape[0] - meta["img"].shape[2]
+			pad_w = self.fixed_shape[1] - meta["img"].shape[3]
+			if pad_h or pad_w:
+				meta["img"] = torch.nn.functional.pad(meta["img"], (0, pad_w, 0, pad_h))
+		return meta
 
-		# Run inference
+	def _fast_meta(self, img: np.ndarray) -> dict:
+		tensor, warp_matrix = self.fast_preprocess(img)
+		height, width = img.shape[:2]
+		return {
+			"img_info": {"id": [0], "file_name": [None], "height": [height], "width": [width]},
+			"raw_img": [img],
+			"warp_matrix": [warp_matrix],
+			"img": tensor.to(self.device),
+		}
+
+	def prepare(self, img: Union[str, np.ndarray]) -> dict:
+		"""
+		Preprocess one image into a collated, model-ready meta dict.
+		Together with `infer` this exposes the stages that `detect` runs.
+
+		Args:
+			img (Union[str, np.ndarray]): Either path to image or numpy array
+
+		Returns:
+			dict: Collated meta with the [1, 3, H, W] input tensor under "img"
+		"""
+		if self.fast_preprocess is not None and not isinstance(img, str):
+			return self._fast_meta(img)
+		return self._collate([self._preprocess(img)])
+
+	def infer(self, meta: dict) -> dict:
+		"""
+		Run the model and the box decoder on a prepared meta dict.
+
+		Returns:
+			dict: Per-image results keyed by img_id
+		"""
+		start = self.instrument.now()
 		with torch.no_grad():
-			results = self.model.inference(meta)
+			preds = self.engine(meta["img"])
+			start = self.instrument.record("forward", start)
+			results = self.decoder(preds, meta)
+		self.instrument.record("postprocess", start)
+		return results
+
+	def detect(self, img: Union[str, np.ndarray]) -> Tuple[dict, list]:
+		"""
+		Perform object detection on an input image.
+
+		Args:
+			img (Union[str, np.ndarray]): Either path to image or numpy array
+
+		Returns:
+			Tuple[dict, list]:
+				- meta: Dictionary containing image metadata
+				- results: List of detections (each detection contains bbox, score, class_id)
+		"""
+		start = self.instrument.now()
+		meta = self.prepare(img)
+		self.instrument.record("preprocess", start)
+		return meta, self.infer(meta)
+
+	def detect_batch(self, imgs: Sequence[Union[str, np.ndarray]]) -> Tuple[dict, dict]:
+		"""
+		Perform object detection on several images with a single forward pass.
+		Images of different sizes are padded to a common shape by stack_batch_img.
+
+		Args:
+			imgs (Sequence[Union[str, np.ndarray]]): Image paths or numpy arrays
+
+		Returns:
+			Tuple[dict, dict]:
+				- meta: Collated metadata for the whole batch
+				- results: Per-image results keyed by position in `imgs`
+		"""
+		if not imgs:
+			return {}, {}
+		start = self.instrument.now()
+		meta = self._collate([self._preprocess(img, i) for i, img in enumerate(imgs)])
+		self.instrument.record("preprocess", start)
+		return meta, self.infer(meta)
+
+	def _format_detections(self, class_detections: dict, score_threshold: float) -> DetectionBatch:
+		return DetectionBatch.from_results(class_detections, self.class_names, score_threshold)
+
+	def get_detections(self, img: Union[str, np.ndarray], score_threshold: float = 0.35) -> DetectionBatch:
+		"""
+		Detect objects in one image.
 
-		return meta, results
+		Returns:
+			DetectionBatch: Array-backed detections; iterating yields the
+				{'bbox', 'score', 'class_name', 'class_id', ...} dicts
+		"""
+		if self.roi is not None and not isinstance(img, str):
+			return self._get_detections_roi(img, score_threshold)
 
-	def get_detections(self, img: Union[str, np.ndarray], score_threshold: float = 0.35) -> List[dict]:
 		meta, results = self.detect(img)
-		detections = []
 
 		if not isinstance(results, dict) or 0 not in results:
 			print(f"[WARNING] Invalid detection output structure: {results}")
-			return []
+			return DetectionBatch.empty(self.class_names)
 
 		# results[0] is a dict where keys are class_ids and values are detections
-		class_detections = results[0]
+		return self._format_detections(results[0], score_threshold)
 
-		for class_id, class_dets in class_detections.items():
-			for det in class_dets:
-				score = det[-1]
-				if score < score_threshold:
-					continue
+	def _get_detections_roi(self, img: np.ndarray, score_threshold: float) -> DetectionBatch:
+		regions = self.roi.regions(img.shape[1], img.shape[0])
+		crops = [img[y0:y1, x0:x1] for x0, y0, x1, y1 in regions]
+		if len(crops) == 1:
+			# Single region keeps the fast preprocessing path
+			meta, results = self.detect(crops[0])
+			batches = [self._format_detections(results.get(0, {}), score_threshold)]
+		else:
+			batches = self.get_detections_batch(crops, score_threshold)
+		return self.roi.merge(batches, regions, self.class_names)
+
+	def get_detections_batch(self, imgs: Sequence[Union[str, np.ndarray]], score_threshold: float = 0.35) -> List[DetectionBatch]:
+		"""
+		Batched counterpart of get_detections.
 
-				bbox = det[:4]
-				detections.append({
-					'bbox': bbox,
-					'score': score,
-					'class_name': self.class_names[class_id],
-					'class_id': class_id
-				})
+		Args:
+			imgs (Sequence[Union[str, np.ndarray]]): Image paths or numpy arrays
+			score_threshold (float): Minimum confidence score for detections
+
+		Returns:
+			List[DetectionBatch]: One detection batch per input image, in input order
+		"""
+		meta, results = self.detect_batch(imgs)
+		if not isinstance(results, dict):
+			logging.warning(f"Invalid detection output structure: {results}")
+			return [DetectionBatch.empty(self.class_names) for _ in imgs]
 
-		return detections
+		return [self._format_detections(results.get(i, {}), score_threshold) for i in range(len(imgs))]
 
-	def process_image(self, img: Union[str, np.ndarray], score_threshold: float = 0.35) -> List[dict]:
+	def process_image(self, img: Union[str, np.ndarray], score_threshold: float = 0.35) -> DetectionBatch:
 		"""
 		Convenience method that combines detection and result formatting.
 
@@ -127,11 +388,11 @@ class NanoDetDetector:
 			score_threshold (float): Minimum confidence score for detections
 
 		Returns:
-			List[dict]: Formatted detection results
+			DetectionBatch: Formatted detection results
 		"""
 		return self.get_detections(img, score_threshold)
 
-	def process_video_frame(self, frame: np.ndarray, score_threshold: float = 0.35) -> List[dict]:
+	def process_video_frame(self, frame: np.ndarray, score_threshold: float = 0.35) -> DetectionBatch:
 		"""
 		Process a single video frame.
 
@@ -140,7 +401,7 @@ class NanoDetDetector:
 			score_threshold (float): Minimum confidence score for detections
 
 		Returns:
-			List[dict]: Formatted detection results
+			DetectionBatch: Formatted detection results
 		"""
 		return self.get_detections(frame, score_threshold)
 
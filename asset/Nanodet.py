@@ -1,10 +1,19 @@
 import os
 import cv2
 import time
-from typing import Union, Optional, List, Dict, Tuple, Callable
+from typing import Any, Union, Optional, List, Dict, Sequence, Tuple, Callable
 import numpy as np
 import logging
 from asset.Headless import NanoDetDetector
+from asset.admission import INFER, FrameAdmission
+from asset.capture import DirectFrameReader, FrameGrabber, open_frame_source
+from asset.detections import DetectionBatch
+from asset.detlog import DetectionLogWriter
+from asset.multicam import CameraSource, SourceScheduler
+from asset.preview import PreviewServer
+from asset.switcher import ModelSwitcher
+from asset.tracking import Tracker
+from asset.workers import DetectionWorkerPool
 
 
 class NanoDetVisualizer(NanoDetDetector):
@@ -13,12 +22,15 @@ class NanoDetVisualizer(NanoDetDetector):
     Inherits from NanoDetDetector and adds visualization methods.
     """
 
-    def __init__(self, config_path: str, model_path: str, device: str = "cpu"):
-        super().__init__(config_path, model_path, device)
+    def __init__(self, config_path: str, model_path: str, device: str = "cpu", engine: str = "torch",
+                 fast_preprocess: bool = False):
+        super().__init__(config_path, model_path, device, engine, fast_preprocess)
 
 
     @staticmethod
     def is_camera_available(url, timeout=3) -> bool:
+        if not isinstance(url, (int, str)):
+            return url.is_opened()
         cap = cv2.VideoCapture(url)
         start = time.time()
         while not cap.isOpened() and time.time() - start < timeout:
@@ -31,13 +43,29 @@ class NanoDetVisualizer(NanoDetDetector):
     def is_display_available() -> bool:
         return "DISPLAY" in os.environ
 
+    def decode_settings(self, backend: Optional[Union[ModelSwitcher, DetectionWorkerPool]] = None
+                        ) -> Tuple[Optional[Sequence[int]], bool]:
+        """
+        (input_size, keep_ratio) the capture path may reduce-decode to, taken from the
+        backend when one runs inference (a switcher decodes for its largest model).
+        The size is None (full scale) while tiling, since tiles cut from a reduced
+        frame are smaller than the model input.
+        """
+        owner = backend if backend is not None else self
+        if owner.roi is not None and owner.roi.needs_full_resolution:
+            return None, owner.keep_ratio
+        return owner.input_size, owner.keep_ratio
 
-    def visualize(self, img: np.ndarray, detections: List[Dict], score_threshold: float = 0.35) -> np.ndarray:
+
+    def visualize(self, img: np.ndarray, detections: Union[DetectionBatch, List[Dict]],
+                  score_threshold: float = 0.35) -> np.ndarray:
         result_img = img.copy()
 
-        if not isinstance(detections, list):
+        if not isinstance(detections, (DetectionBatch, list)):
             print(f"Invalid detections output: {detections}")
             return img
+        if isinstance(detections, DetectionBatch):
+            detections = detections.above(score_threshold)
 
         for det in detections:
             if det['score'] < score_threshold:
@@ -69,82 +97,235 @@ class NanoDetVisualizer(NanoDetDetector):
 
         return result_img
 
-    def detect_and_visualize(self, img: Union[str, np.ndarray], score_threshold: float = 0.35) -> Tuple[List[dict], np.ndarray]:
+    def detect_and_visualize(self, img: Union[str, np.ndarray], score_threshold: float = 0.35,
+                             render: Optional[bool] = None) -> Tuple[DetectionBatch, np.ndarray]:
+        """
+        Detect and draw the detections on a copy of the image.
+
+        Args:
+            render (bool, optional): Draw the boxes; defaults to whether a display is available,
+                otherwise the input image is returned untouched
+
+        Returns:
+            Tuple[DetectionBatch, np.ndarray]: Detections and the (possibly annotated) image
+        """
+        if render is None:
+            render = self.is_display_available()
         if isinstance(img, str):
             img = cv2.imread(img)
             if img is None:
                 raise ValueError(f"Could not read image from {img}")
 
         detections = self.get_detections(img, score_threshold)
-        print("[DEBUG] Raw detections:", detections)
+        # Lazy %-formatting: the batch is only rendered when debug logging is on
+        logging.debug("Raw detections: %s", detections)
 
-    # ROI-based left/right detection
-        img_width = img.shape[1]
-        for det in detections:
-            bbox = det["bbox"]
-            x_center = (bbox[0] + bbox[2]) / 2
-            det["direction"] = "left" if x_center < img_width / 2 else "right"
-            det['label'] = det.get("class_name", "object")
+        # ROI-based left/right detection
+        detections.assign_zones(img.shape[1], img.shape[0])
 
-        visualized_img = self.visualize(img, detections, score_threshold)
+        visualized_img = self.visualize(img, detections, score_threshold) if render else img
         return detections, visualized_img
 
     def process_camera(
             self,
-            url: Union[int, str] = 0,
+            url: Union[int, str, Any] = 0,
             window_name: str = "NanoDet",
             score_threshold: float = 0.35,
             exit_key: int = ord('q'),
-            log_file: Optional[str] = "detections.log",
-            on_detect: Optional[Callable[[List[Dict]], None]] = None
+            log_file: Optional[str] = "detections.jsonl.gz",
+            on_detect: Optional[Callable[[DetectionBatch], None]] = None,
+            admission: Optional[FrameAdmission] = None,
+            tracker: Optional[Tracker] = None,
+            detect_every: int = 1,
+            backend: Optional[Union[ModelSwitcher, DetectionWorkerPool]] = None,
+            preview: Optional[PreviewServer] = None
     ) -> None:
+        if detect_every < 1:
+            raise ValueError(f"detect_every must be at least 1, got {detect_every}")
         if not self.is_camera_available(url):
             logging.error(f"Camera {url} not available. Skipping detection.")
             return
 
         display_enabled = self.is_display_available()
-        cap = cv2.VideoCapture(url)
-        if not cap.isOpened():
-            raise RuntimeError(f"Could not open camera {url}")
+        if isinstance(url, (int, str)):
+            decode_size, keep_ratio = self.decode_settings(backend)
+            grabber = FrameGrabber(
+                lambda: open_frame_source(url, decode_size, keep_ratio),
+                name=f"Capture-{url}",
+                instrument=self.instrument
+            ).start()
+        else:
+            # Replay sources are read in this thread and end the loop when exhausted
+            grabber = DirectFrameReader(url, name=f"Replay-{type(url).__name__}").start()
 
-        log_fp = open(log_file, "w", encoding="utf-8") if log_file else None
+        # Appended and rotated by a background thread; read it back with tools/detlog_dump.py
+        detection_log = DetectionLogWriter(log_file, self.class_names).start() if log_file else None
         logging.info(f"Logging detections to {log_file}...")
 
+        # Inference can be delegated to a model switcher or to worker processes
+        get_detections = backend.get_detections if backend is not None else self.get_detections
+        instrument = self.instrument
+        last_detections = None
+        frame_index = 0
         while True:
-            ret, frame = cap.read()
-            if not cap.read()[0]:
-                logging.warning("Failed to capture frame, retrying...")
-                cap.release()
-                time.sleep(2)
-                cap = cv2.VideoCapture(url)
-                print(f"[{time.strftime('%H:%M:%S')}] [ERROR] Camera feed unavailable.")
+            start = instrument.now()
+            packet = grabber.read(timeout=1.0)
+            if packet is None:
+                if getattr(grabber, "finished", False):
+                    break
+                continue
+            instrument.record("capture", start)
+            frame, _ = packet
+
+            # Static, blurred or dark frames keep the previous result
+            if admission is not None and admission.check(frame) != INFER:
+                if preview is not None:
+                    preview.publish(frame, last_detections)
+                if display_enabled:
+                    shown = frame if last_detections is None else self.visualize(frame, last_detections, score_threshold)
+                    cv2.imshow(window_name, shown)
+                    if cv2.waitKey(1) & 0xFF == exit_key:
+                        break
                 continue
 
             try:
-                detections, visualized_frame = self.detect_and_visualize(frame, score_threshold)
-                detected_names = set(det['class_name'] for det in detections)
+                if tracker is None:
+                    detections = get_detections(frame, score_threshold)
+                # Run the detector every N frames, track predictions fill the gaps
+                elif frame_index % detect_every == 0:
+                    detections = tracker.update(get_detections(frame, score_threshold))
+                else:
+                    detections = tracker.predict()
+                frame_index += 1
+
+                detections.assign_zones(frame.shape[1], frame.shape[0])
+                last_detections = detections
+                # Drawing happens only for a local window; the preview renders in its own thread
+                if preview is not None:
+                    preview.publish(frame, detections)
 
                 if detections:
-                    log_line = f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {', '.join(detected_names)}"
-                    if log_fp:
-                        log_fp.write(log_line + "\n")
-                        log_fp.flush()
-                    logging.info(log_line)
+                    if detection_log:
+                        detection_log.write(detections)
+                    logging.debug("Detected: %s", detections.unique_names())
                     if on_detect:
+                        start = instrument.now()
                         on_detect(detections)
+                        instrument.record("callback", start)
 
                 if display_enabled:
+                    start = instrument.now()
+                    visualized_frame = self.visualize(frame, detections, score_threshold)
+                    instrument.record("visualize", start)
                     cv2.imshow(window_name, visualized_frame)
                     if cv2.waitKey(1) & 0xFF == exit_key:
                         break
 
             except Exception as e:
+                instrument.count("exceptions")
                 logging.error(f"Error during detection: {e}")
                 if display_enabled:
                     pass
 
-        cap.release()
-        if log_fp:
-            log_fp.close()
+        grabber.stop()
+        logging.info(f"Capture stats: {grabber.stats}")
+        if admission is not None:
+            logging.info(f"Admission stats: {admission.stats}")
+        if backend is not None:
+            logging.info(f"Detection backend stats: {backend.stats}")
+        if instrument.enabled:
+            logging.info(f"Instrumentation: {instrument.stats}")
+        if detection_log:
+            detection_log.close()
+            logging.info(f"Detection log stats: {detection_log.stats}")
+        if display_enabled:
+            cv2.destroyAllWindows()
+
+    def process_cameras(
+            self,
+            sources: Sequence[CameraSource],
+            score_threshold: float = 0.35,
+            exit_key: int = ord('q'),
+            on_detect: Optional[Callable[[str, DetectionBatch], None]] = None,
+            max_batch: int = 2,
+            trackers: Optional[Dict[str, Tracker]] = None,
+            backend: Optional[Union[ModelSwitcher, DetectionWorkerPool]] = None,
+            stats_interval: float = 60.0,
+            preview: Optional[PreviewServer] = None
+    ) -> None:
+        """
+        Run one shared model over several cameras.
+
+        Each source is inferred at its own target FPS; frames of sources that
+        are due at the same time go through one batched inference call.
+
+        Args:
+            sources (Sequence[CameraSource]): Cameras with their fps and priority
+            score_threshold (float): Minimum confidence score for detections
+            exit_key (int): Key that closes the preview windows
+            on_detect (Callable[[str, DetectionBatch], None], optional): Called with the source
+                name and its detections
+            max_batch (int): Maximum frames per inference call
+            trackers (Dict[str, Tracker], optional): Per-source trackers, keyed by source name
+            backend (optional): ModelSwitcher or DetectionWorkerPool used instead of this detector
+            stats_interval (float): Seconds between per-source stats log lines
+            preview (PreviewServer, optional): Shows the highest-priority source
+        """
+        available = [s for s in sources if self.is_camera_available(s.url)]
+        for source in sources:
+            if source not in available:
+                logging.error(f"Camera {source.url} ({source.name}) not available. Skipping it.")
+        if not available:
+            return
+
+        display_enabled = self.is_display_available()
+        decode_size, keep_ratio = self.decode_settings(backend)
+        scheduler = SourceScheduler(
+            available,
+            lambda source: open_frame_source(source.url, decode_size, keep_ratio),
+            max_batch=max_batch
+        ).start()
+        get_detections_batch = backend.get_detections_batch if backend is not None else self.get_detections_batch
+        trackers = trackers or {}
+        last_stats = time.monotonic()
+
+        while True:
+            batch = scheduler.next_batch(timeout=1.0)
+            if not batch:
+                continue
+
+            try:
+                results = get_detections_batch([frame for _, frame, _ in batch], score_threshold)
+                quit_requested = False
+                for (source, frame, captured_at), detections in zip(batch, results):
+                    scheduler.record(source, captured_at)
+                    tracker = trackers.get(source.name)
+                    if tracker is not None:
+                        detections = tracker.update(detections)
+                    detections.assign_zones(frame.shape[1], frame.shape[0])
+
+                    if detections and on_detect:
+                        on_detect(source.name, detections)
+                    if preview is not None and source is scheduler.sources[0]:
+                        preview.publish(frame, detections)
+
+                    if display_enabled:
+                        cv2.imshow(source.name, self.visualize(frame, detections, score_threshold))
+                        if cv2.waitKey(1) & 0xFF == exit_key:
+                            quit_requested = True
+                if quit_requested:
+                    break
+
+            except Exception as e:
+                logging.error(f"Error during multi-camera detection: {e}")
+
+            if time.monotonic() - last_stats > stats_interval:
+                logging.info(f"Camera stats: {scheduler.stats}")
+                last_stats = time.monotonic()
+
+        scheduler.stop()
+        logging.info(f"Camera stats: {scheduler.stats}")
+        if backend is not None:
+            logging.info(f"Detection backend stats: {backend.stats}")
         if display_enabled:
             cv2.destroyAllWindows()
\ No newline at end of file
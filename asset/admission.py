@@ -0,0 +1,92 @@
+import time
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+INFER = "infer"
+REUSE = "reuse"
+SKIP = "skip"
+
+
+class FrameAdmission:
+    """
+    Cheap gate in front of the detector, run on a small grayscale copy of the frame.
+
+    - Under-exposed frames (mostly dark histogram) are skipped.
+    - Motion-blurred frames (low Laplacian variance) reuse the last result.
+    - Frames that barely differ from the last inferred one reuse its result.
+    Everything else is admitted for inference. The first frame, and any frame
+    `refresh_interval` seconds after the last inference, is admitted whatever
+    it looks like, so a long dark, blurred or static stretch never stops
+    detection and there is always a result to reuse.
+    """
+
+    def __init__(
+            self,
+            size: Tuple[int, int] = (80, 60),
+            motion_threshold: float = 4.0,
+            blur_threshold: float = 30.0,
+            dark_level: int = 35,
+            dark_fraction: float = 0.9,
+            refresh_interval: float = 2.0
+    ):
+        """
+        Args:
+            size (Tuple[int, int]): (w, h) of the analysis frame
+            motion_threshold (float): Mean absolute gray-level difference that counts as a scene change
+            blur_threshold (float): Laplacian variance below which a frame is treated as blurred
+            dark_level (int): Gray level under which a pixel counts as dark
+            dark_fraction (float): Fraction of dark pixels above which the frame is skipped
+            refresh_interval (float): Max seconds between inferences, whatever the gates say
+        """
+        self.size = size
+        self.motion_threshold = motion_threshold
+        self.blur_threshold = blur_threshold
+        self.dark_level = dark_level
+        self.dark_fraction = dark_fraction
+        self.refresh_interval = refresh_interval
+
+        self._reference = None
+        self._last_infer = 0.0
+        self._small = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._diff = np.empty_like(self._small)
+
+        self.counters = {"frames": 0, "inferred": 0, "static": 0, "blurred": 0, "dark": 0}
+
+    def check(self, frame: np.ndarray) -> str:
+        """Return INFER, REUSE or SKIP for this frame."""
+        self.counters["frames"] += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+
+        # Without a previous result, or with one older than refresh_interval, always infer
+        now = time.monotonic()
+        if self._reference is not None and now - self._last_infer < self.refresh_interval:
+            hist = cv2.calcHist([small], [0], None, [256], [0, 256])
+            if hist[:self.dark_level].sum() > self.dark_fraction * small.size:
+                self.counters["dark"] += 1
+                return SKIP
+
+            if cv2.Laplacian(small, cv2.CV_32F).var() < self.blur_threshold:
+                self.counters["blurred"] += 1
+                return REUSE
+
+            cv2.absdiff(small, self._reference, dst=self._diff)
+            if cv2.mean(self._diff)[0] < self.motion_threshold:
+                self.counters["static"] += 1
+                return REUSE
+
+        if self._reference is None:
+            self._reference = small.copy()
+        else:
+            np.copyto(self._reference, small)
+        self._last_infer = now
+        self.counters["inferred"] += 1
+        return INFER
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self.counters)
+        stats["saved"] = stats["frames"] - stats["inferred"]
+        return stats
@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROLE_DETECTION = "detection"
+ROLE_IO = "io"
+
+
+def _read_schedstat(tid: int) -> Optional[List[int]]:
+    """(ns on cpu, ns waiting on the run queue, timeslices) of one thread, None if unavailable."""
+    try:
+        with open(f"/proc/self/task/{tid}/schedstat") as f:
+            return [int(v) for v in f.read().split()[:3]]
+    except (OSError, ValueError):
+        return None
+
+
+def default_split(cpu_count: int) -> Dict[str, List[int]]:
+    """Core 0 for audio/voice/sensor loops, the rest for detection (both share on one core)."""
+    cores = list(range(cpu_count))
+    if cpu_count <= 1:
+        return {ROLE_DETECTION: cores, ROLE_IO: cores}
+    return {ROLE_DETECTION: cores[1:], ROLE_IO: cores[:1]}
+
+
+class CoreBudget:
+    """
+    Assigns the application's threads and processes to CPU cores.
+
+    Detection (the detection thread, the torch intra-op pool it spawns, its
+    capture threads and any worker processes) runs on `detection_cores`;
+    sensor, voice and audio loops run on `io_cores`. Threads pin themselves
+    with `os.sched_setaffinity` on their native thread id, and threads or
+    subprocesses they start (torch/OpenMP pools, RHVoice, aplay) inherit that
+    mask. Pinning is a no-op on platforms without sched_setaffinity.
+
+    Contention is measured per role from /proc schedstat run-queue wait of
+    the pinned threads and from how late `sleep` wakes the calling loop.
+    """
+
+    def __init__(self, detection_cores: Optional[Sequence[int]] = None, io_cores: Optional[Sequence[int]] = None,
+                 torch_threads: Optional[int] = None, interop_threads: int = 1):
+        """
+        Args:
+            detection_cores (Sequence[int], optional): Cores for inference, defaults to all but core 0
+            io_cores (Sequence[int], optional): Cores for sensor/audio/voice loops, defaults to core 0
+            torch_threads (int, optional): torch intra-op threads, defaults to len(detection_cores)
+            interop_threads (int): torch inter-op threads
+        """
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else \
+            list(range(os.cpu_count() or 1))
+        split = default_split(len(available))
+        split = {role: [available[i] for i in cores] for role, cores in split.items()}
+        self.cores = {
+            ROLE_DETECTION: sorted(detection_cores) if detection_cores else split[ROLE_DETECTION],
+            ROLE_IO: sorted(io_cores) if io_cores else split[ROLE_IO],
+        }
+        self.torch_threads = torch_threads or len(self.cores[ROLE_DETECTION])
+        self.interop_threads = interop_threads
+        self.supported = hasattr(os, "sched_setaffinity")
+
+        self._lock = threading.Lock()
+        self._threads: Dict[int, str] = {}  # native id -> role
+        self._last_sched: Dict[int, List[int]] = {}
+        self._last_stats = time.monotonic()
+        self._wakeup_late: Dict[str, deque] = {}
+
+    @property
+    def detection_cores(self) -> List[int]:
+        return self.cores[ROLE_DETECTION]
+
+    @property
+    def io_cores(self) -> List[int]:
+        return self.cores[ROLE_IO]
+
+    def apply_torch(self) -> None:
+        """Set torch's thread pools; call before the first inference (inter-op can only be set once)."""
+        import torch
+
+        torch.set_num_threads(self.torch_threads)
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError as e:
+            logging.warning(f"torch inter-op threads already fixed: {e}")
+        logging.info(f"torch threads: {self.torch_threads} intra-op, {torch.get_num_interop_threads()} inter-op")
+
+    def pin_current_thread(self, role: str) -> bool:
+        """Restrict the calling thread to the cores of `role` and track it for contention stats."""
+        tid = threading.get_native_id()
+        with self._lock:
+            self._threads[tid] = role
+            self._last_sched[tid] = _read_schedstat(tid) or [0, 0, 0]
+        if not self.supported:
+            return False
+        try:
+            os.sched_setaffinity(tid, self.cores[role])
+            return True
+        except OSError as e:
+            logging.warning(f"Could not pin {threading.current_thread().name} to cores {self.cores[role]}: {e}")
+            return False
+
+    def pin_process(self, pid: int, role: str) -> bool:
+        if not self.supported:
+            return False
+        try:
+            os.sched_setaffinity(pid, self.cores[role])
+            return True
+        except OSError as e:
+            logging.warning(f"Could not pin process {pid} to cores {self.cores[role]}: {e}")
+            return False
+
+    def run_as(self, role: str, target: Callable, *args, **kwargs) -> Callable[[], None]:
+        """Thread target that pins itself to `role` before running `target`."""
+        def run():
+            self.pin_current_thread(role)
+            return target(*args, **kwargs)
+        return run
+
+    def sleep(self, seconds: float, loop: str, wake: Optional[threading.Event] = None) -> None:
+        """
+        time.sleep that records how late the loop woke up, a direct measure of scheduling delay.
+        Setting `wake` ends the sleep early (not recorded) and clears it.
+        """
+        start = time.monotonic()
+        if wake is None:
+            time.sleep(seconds)
+        elif wake.wait(seconds):
+            wake.clear()
+            return
+        late_ms = (time.monotonic() - start - seconds) * 1000
+        with self._lock:
+            samples = self._wakeup_late.get(loop)
+            if samples is None:
+                samples = self._wakeup_late[loop] = deque(maxlen=200)
+            samples.append(late_ms)
+
+    @staticmethod
+    def _task_ids() -> List[int]:
+        try:
+            return [int(t) for t in os.listdir("/proc/self/task")]
+        except OSError:
+            return []
+
+    def _role_of(self, tid: int) -> Optional[str]:
+        if not self.supported:
+            return None
+        try:
+            mask = sorted(os.sched_getaffinity(tid))
+        except OSError:
+            return None
+        for role, cores in self.cores.items():
+            if mask == cores:
+                return role
+        return None
+
+    @property
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Contention since the previous call.
+
+        Returns:
+            Dict[str, Dict]: Per role the cores, threads and run-queue wait in ms per second of
+                wall time; per sleeping loop the p50/p95/max wake-up delay in ms
+        """
+        now = time.monotonic()
+        with self._lock:
+            elapsed = max(now - self._last_stats, 1e-6)
+            self._last_stats = now
+            roles = {role: {"cores": cores, "threads": 0, "runqueue_wait_ms_per_s": 0.0, "cpu_ms_per_s": 0.0}
+                     for role, cores in self.cores.items()}
+            seen = set()
+            for tid in self._task_ids():
+                current = _read_schedstat(tid)
+                if current is None:
+                    continue
+                seen.add(tid)
+                # Unregistered threads (torch/OpenMP pools, capture threads) count for the role they inherited
+                role = self._threads.get(tid) or self._role_of(tid)
+                previous = self._last_sched.get(tid)
+                self._last_sched[tid] = current
+                if previous is None or role is None:
+                    continue
+                entry = roles[role]
+                entry["threads"] += 1
+                entry["cpu_ms_per_s"] += (current[0] - previous[0]) / 1e6 / elapsed
+                entry["runqueue_wait_ms_per_s"] += (current[1] - previous[1]) / 1e6 / elapsed
+            for tid in set(self._last_sched) - seen:
+                # Thread exited
+                self._last_sched.pop(tid, None)
+                self._threads.pop(tid, None)
+            for entry in roles.values():
+                entry["cpu_ms_per_s"] = round(entry["cpu_ms_per_s"], 1)
+                entry["runqueue_wait_ms_per_s"] = round(entry["runqueue_wait_ms_per_s"], 1)
+
+            loops = {}
+            for loop, samples in self._wakeup_late.items():
+                if samples:
+                    arr = np.asarray(samples)
+                    loops[loop] = {
+                        "wakeup_late_ms_p50": round(float(np.percentile(arr, 50)), 2),
+                        "wakeup_late_ms_p95": round(float(np.percentile(arr, 95)), 2),
+                        "wakeup_late_ms_max": round(float(arr.max()), 2),
+                    }
+        return {"roles": roles, "loops": loops}
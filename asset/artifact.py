@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import time
+from typing import Tuple
+
+import torch
+
+ARTIFACT_META = "nanodet_meta.json"
+
+
+def padded_input_shape(input_size) -> Tuple[int, int]:
+    """(height, width) of the model input after stack_batch_img padding to 32."""
+    width, height = input_size
+    return (height + 31) // 32 * 32, (width + 31) // 32 * 32
+
+
+def compile_artifact(detector, output_path: str) -> str:
+    """
+    Freeze a loaded detector into a single TorchScript file.
+
+    The model is traced at its padded input size and batch size 1 and frozen,
+    which inlines the weights and folds BatchNorm into the preceding
+    convolutions. The batch size stays fixed in the graph, so the artifact is
+    run through FrozenEngine, which feeds batches one image at a time. Class names,
+    pipeline parameters and decoder settings are stored alongside the graph so
+    the detector can be restored without the YAML config or the checkpoint.
+
+    Args:
+        detector (NanoDetDetector): Detector built from config + checkpoint
+        output_path (str): Destination file (e.g. model/nanodet_m.frozen.pt)
+
+    Returns:
+        str: output_path
+    """
+    height, width = padded_input_shape(detector.input_size)
+    model = detector.model.cpu().eval()
+    dummy = torch.zeros(1, 3, height, width)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(model, dummy)
+        # freeze() inlines parameters and runs the conv+BN folding passes;
+        # optimize_for_inference is skipped since its MKLDNN rewrite cannot be saved
+        frozen = torch.jit.freeze(traced)
+
+    meta = {
+        "class_names": list(detector.class_names),
+        "input_size": list(detector.input_size),
+        "keep_ratio": bool(detector.keep_ratio),
+        "input_shape": [height, width],
+        "pipeline": json.loads(json.dumps(detector.pipeline_cfg)),
+        "decoder": detector.decoder.params(),
+        "class_thresholds": dict(detector.class_thresholds),
+        "source_model": detector.model_path,
+        "torch_version": torch.__version__,
+        "compiled_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    torch.jit.save(frozen, output_path, _extra_files={ARTIFACT_META: json.dumps(meta)})
+    logging.info(f"Frozen detector written to {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return output_path
+
+
+def load_artifact(path: str, device: str = "cpu") -> Tuple[torch.jit.ScriptModule, dict]:
+    """
+    Load a compiled artifact.
+
+    The path is handed straight to the TorchScript C++ loader, which reads
+    the archive from disk without an intermediate Python copy.
+
+    Returns:
+        Tuple[torch.jit.ScriptModule, dict]: Frozen model and its stored metadata
+    """
+    extra_files = {ARTIFACT_META: ""}
+    module = torch.jit.load(path, map_location=device, _extra_files=extra_files)
+    return module.eval(), json.loads(extra_files[ARTIFACT_META])
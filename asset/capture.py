@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from asset.instrument import DISABLED, Instrumentation
+from asset.mjpeg import MJPEGStreamSource
+
+
+class VideoCaptureSource:
+    """
+    cv2.VideoCapture wrapped in the read/decode interface used by FrameGrabber.
+    OpenCV always decodes on read, so the payload is already a BGR frame.
+    """
+
+    def __init__(self, url: Union[int, str] = 0):
+        self.url = url
+        self.cap = cv2.VideoCapture(url)
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self) -> Optional[Any]:
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def decode(self, payload: Any) -> Optional[np.ndarray]:
+        return payload
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+def open_frame_source(url: Union[int, str, Any] = 0, input_size: Optional[Sequence[int]] = None,
+                      keep_ratio: bool = True):
+    """
+    Open the best reader for `url`: HTTP streams go through the native MJPEG
+    client (lazy, reduced-scale decode), everything else through OpenCV.
+    Falls back to OpenCV if the URL does not serve multipart JPEG.
+    """
+    if not isinstance(url, (int, str)):
+        # Already a frame source object (e.g. a replay source)
+        return url
+    if isinstance(url, str) and url.startswith("http"):
+        source = MJPEGStreamSource(url, input_size=input_size, keep_ratio=keep_ratio)
+        if source.is_opened():
+            return source
+        source.release()
+    return VideoCaptureSource(url)
+
+
+class DirectFrameReader:
+    """
+    FrameGrabber stand-in that reads a source synchronously in the caller's thread.
+
+    Used for replay sources: nothing is dropped behind the consumer's back
+    (realtime sources skip frames themselves), and `finished` is set when the
+    source runs out instead of triggering reconnects.
+    """
+
+    def __init__(self, source: Any, name: str = "DirectFrameReader"):
+        self.source = source
+        self.name = name
+        self.finished = False
+        self.captured = 0
+        self._started = None
+
+    def start(self) -> "DirectFrameReader":
+        if not self.source.is_opened():
+            raise RuntimeError(f"Could not open frame source for {self.name}")
+        self._started = time.monotonic()
+        return self
+
+    def stop(self) -> None:
+        self.source.release()
+
+    def read(self, timeout: float = 1.0) -> Optional[Tuple[np.ndarray, float]]:
+        if self.finished:
+            return None
+        payload = self.source.read()
+        if payload is None:
+            self.finished = True
+            return None
+        frame = self.source.decode(payload)
+        if frame is None:
+            return None
+        self.captured += 1
+        return frame, time.monotonic()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        return {
+            "captured": self.captured,
+            "skipped": getattr(self.source, "skipped", 0),
+            "elapsed_s": round(elapsed, 2),
+            "fps": round(self.captured / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class FrameGrabber:
+    """
+    Background capture thread that keeps only the newest frame.
+
+    The capture loop reads as fast as the source delivers and overwrites a
+    one-slot buffer, so the consumer always gets the freshest frame instead of
+    whatever is queued in the driver buffer. Frames overwritten before they were
+    consumed are counted as dropped, frames older than `max_age` at read time are
+    discarded and counted as stale. Lost sources are reopened with exponential
+    backoff; so are sources whose last `max_decode_failures` frames could not be
+    decoded (a stream that still delivers parts but no usable JPEG).
+    """
+
+    def __init__(
+            self,
+            open_source: Callable[[], Any],
+            name: str = "FrameGrabber",
+            max_age: float = 1.0,
+            initial_backoff: float = 0.5,
+            max_backoff: float = 30.0,
+            max_decode_failures: int = 5,
+            instrument: Optional[Instrumentation] = None
+    ):
+        """
+        Args:
+            open_source (Callable): Factory returning a new source with
+                is_opened/read/decode/release methods
+            name (str): Name of the capture thread
+            max_age (float): Frames older than this many seconds are not handed out
+            initial_backoff (float): First reconnect delay in seconds
+            max_backoff (float): Upper bound for the reconnect delay in seconds
+            max_decode_failures (int): Consecutive undecodable frames that count as a read failure
+            instrument (Instrumentation, optional): Also counts drops, stale frames and reconnects
+        """
+        self.open_source = open_source
+        self.name = name
+        self.max_age = max_age
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_decode_failures = max_decode_failures
+        self.instrument = instrument if instrument is not None else DISABLED
+
+        self.source = None
+        self.connected = False
+        self._cond = threading.Condition()
+        self._slot = None  # (payload, timestamp, seq, decode)
+        self._seq = 0
+        self._consumed_seq = 0
+        self._stop = threading.Event()
+        self._reset = threading.Event()
+        self._decode_streak = 0
+        self._thread = None
+
+        self.captured = 0
+        self.dropped = 0
+        self.stale = 0
+        self.reconnects = 0
+        self.read_failures = 0
+        self.decode_failures = 0
+
+    def start(self) -> "FrameGrabber":
+        self.source = self.open_source()
+        if not self.source.is_opened():
+            self.source.release()
+            raise RuntimeError(f"Could not open frame source for {self.name}")
+        self.connected = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.source is not None:
+            self.source.release()
+            self.source = None
+        self.connected = False
+
+    def _reconnect(self, backoff: float) -> float:
+        self.connected = False
+        if self.source is not None:
+            self.source.release()
+            self.source = None
+        logging.warning(f"{self.name}: camera feed unavailable, retrying in {backoff:.1f}s")
+        if self._stop.wait(backoff):
+            return backoff
+
+        self.reconnects += 1
+        self.instrument.count("reconnects")
+        source = self.open_source()
+        if source.is_opened():
+            self.source = source
+            self.connected = True
+            logging.info(f"{self.name}: source reopened after {self.reconnects} reconnect(s)")
+            return self.initial_backoff
+        source.release()
+        return min(backoff * 2, self.max_backoff)
+
+    def _run(self) -> None:
+        backoff = self.initial_backoff
+        while not self._stop.is_set():
+            if self.source is None:
+                backoff = self._reconnect(backoff)
+                continue
+
+            if self._reset.is_set():
+                self._reset.clear()
+                self.read_failures += 1
+                logging.warning(f"{self.name}: {self.max_decode_failures} undecodable frames in a row, reconnecting...")
+                backoff = self._reconnect(backoff)
+                continue
+
+            payload = self.source.read()
+            if payload is None:
+                self.read_failures += 1
+                logging.warning("Failed to capture frame, reconnecting...")
+                backoff = self._reconnect(backoff)
+                continue
+
+            backoff = self.initial_backoff
+            with self._cond:
+                dropped = self._slot is not None and self._slot[2] > self._consumed_seq
+                if dropped:
+                    self.dropped += 1
+                self._seq += 1
+                self.captured += 1
+                self._slot = (payload, time.monotonic(), self._seq, self.source.decode)
+                self._cond.notify_all()
+            if dropped:
+                self.instrument.count("dropped_frames")
+
+    def read(self, timeout: float = 1.0) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Wait for a frame newer than the last one returned.
+
+        Returns:
+            Optional[Tuple[np.ndarray, float]]: (frame, monotonic capture time),
+                or None on timeout, stale or undecodable frame
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._slot is None or self._slot[2] <= self._consumed_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    return None
+                self._cond.wait(remaining)
+            payload, timestamp, seq, decode = self._slot
+            self._consumed_seq = seq
+
+        if time.monotonic() - timestamp > self.max_age:
+            self.stale += 1
+            self.instrument.count("stale_frames")
+            return None
+
+        frame = decode(payload)
+        if frame is None:
+            self.decode_failures += 1
+            self._decode_streak += 1
+            if self.max_decode_failures and self._decode_streak >= self.max_decode_failures:
+                self._decode_streak = 0
+                self._reset.set()
+            return None
+        self._decode_streak = 0
+        return frame, timestamp
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "stale": self.stale,
+            "reconnects": self.reconnects,
+            "read_failures": self.read_failures,
+            "decode_failures": self.decode_failures,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
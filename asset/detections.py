@@ -0,0 +1,195 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+ZONE_NONE = -1
+ZONE_LEFT = 0
+ZONE_RIGHT = 1
+ZONE_NAMES = {ZONE_NONE: "", ZONE_LEFT: "left", ZONE_RIGHT: "right"}
+
+DETECTION_DTYPE = np.dtype([
+    ("bbox", np.float32, (4,)),
+    ("score", np.float32),
+    ("class_id", np.int16),
+    ("zone", np.int8),
+    ("track_id", np.int32),
+    ("ttc", np.float32),
+])
+
+
+class DetectionBatch:
+    """
+    Detections of one frame stored in a NumPy structured array.
+
+    Filtering, zone assignment and per-class grouping work on whole columns.
+    Iterating (or indexing with an int) still yields the per-object dicts the
+    rest of the code base used to receive from get_detections, so existing
+    callbacks keep working unchanged.
+
+    `frame_size` is the (width, height) of the frame the boxes refer to, once
+    known (set by `assign_zones`).
+    """
+
+    __slots__ = ("data", "class_names", "frame_size")
+
+    def __init__(self, data: np.ndarray, class_names: Sequence[str],
+                 frame_size: Optional[Tuple[int, int]] = None):
+        self.data = data
+        self.class_names = class_names
+        self.frame_size = frame_size
+
+    @classmethod
+    def empty(cls, class_names: Sequence[str]) -> "DetectionBatch":
+        return cls(np.zeros(0, dtype=DETECTION_DTYPE), class_names)
+
+    @classmethod
+    def from_arrays(cls, bboxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+                    class_names: Sequence[str]) -> "DetectionBatch":
+        data = np.zeros(len(scores), dtype=DETECTION_DTYPE)
+        data["bbox"] = bboxes
+        data["score"] = scores
+        data["class_id"] = class_ids
+        data["zone"] = ZONE_NONE
+        data["track_id"] = -1
+        data["ttc"] = np.inf
+        return cls(data, class_names)
+
+    @classmethod
+    def from_results(cls, class_detections: dict, class_names: Sequence[str],
+                     score_threshold: float = 0.0) -> "DetectionBatch":
+        """Build from the {class_id: [[x1, y1, x2, y2, score], ...]} decoder output."""
+        chunks = []
+        ids = []
+        for class_id, class_dets in class_detections.items():
+            if len(class_dets):
+                arr = np.asarray(class_dets, dtype=np.float32).reshape(-1, 5)
+                chunks.append(arr)
+                ids.append(np.full(len(arr), class_id, dtype=np.int16))
+        if not chunks:
+            return cls.empty(class_names)
+
+        dets = np.concatenate(chunks)
+        class_ids = np.concatenate(ids)
+        keep = dets[:, 4] >= score_threshold
+        return cls.from_arrays(dets[keep, :4], dets[keep, 4], class_ids[keep], class_names)
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["DetectionBatch"], class_names: Sequence[str]) -> "DetectionBatch":
+        if not batches:
+            return cls.empty(class_names)
+        return cls(np.concatenate([b.data for b in batches]), class_names)
+
+    # Column views
+    @property
+    def bbox(self) -> np.ndarray:
+        return self.data["bbox"]
+
+    @property
+    def score(self) -> np.ndarray:
+        return self.data["score"]
+
+    @property
+    def class_id(self) -> np.ndarray:
+        return self.data["class_id"]
+
+    @property
+    def zone(self) -> np.ndarray:
+        return self.data["zone"]
+
+    @property
+    def track_id(self) -> np.ndarray:
+        return self.data["track_id"]
+
+    @property
+    def ttc(self) -> np.ndarray:
+        return self.data["ttc"]
+
+    @property
+    def centers(self) -> np.ndarray:
+        b = self.data["bbox"]
+        return np.stack([(b[:, 0] + b[:, 2]) * 0.5, (b[:, 1] + b[:, 3]) * 0.5], axis=1)
+
+    # Vectorized operations
+    def filter(self, mask: np.ndarray) -> "DetectionBatch":
+        return DetectionBatch(self.data[mask], self.class_names, self.frame_size)
+
+    def above(self, thresholds: Union[float, np.ndarray]) -> "DetectionBatch":
+        """Keep detections scoring at least a global or per-class-id threshold."""
+        if np.ndim(thresholds):
+            thresholds = np.asarray(thresholds, dtype=np.float32)[self.data["class_id"]]
+        return self.filter(self.data["score"] >= thresholds)
+
+    def assign_zones(self, img_width: int, img_height: Optional[int] = None) -> "DetectionBatch":
+        """Split the frame into left/right halves by bbox center (in place) and record the frame size."""
+        if img_height is not None:
+            self.frame_size = (int(img_width), int(img_height))
+        b = self.data["bbox"]
+        x_center = (b[:, 0] + b[:, 2]) * 0.5
+        self.data["zone"] = np.where(x_center < img_width / 2, ZONE_LEFT, ZONE_RIGHT)
+        return self
+
+    def class_index(self, class_name: str) -> Optional[int]:
+        try:
+            return list(self.class_names).index(class_name)
+        except ValueError:
+            return None
+
+    def of_class(self, class_name: str) -> "DetectionBatch":
+        idx = self.class_index(class_name)
+        if idx is None:
+            return DetectionBatch.empty(self.class_names)
+        return self.filter(self.data["class_id"] == idx)
+
+    def count(self, class_name: str) -> int:
+        idx = self.class_index(class_name)
+        return 0 if idx is None else int(np.count_nonzero(self.data["class_id"] == idx))
+
+    def group_by_class(self) -> Dict[str, "DetectionBatch"]:
+        class_ids = self.data["class_id"]
+        order = np.argsort(class_ids, kind="stable")
+        sorted_ids = class_ids[order]
+        unique, starts = np.unique(sorted_ids, return_index=True)
+        bounds = list(starts[1:]) + [len(order)]
+        return {
+            self.class_names[cid]: DetectionBatch(self.data[order[start:end]], self.class_names)
+            for cid, start, end in zip(unique.tolist(), starts.tolist(), bounds)
+        }
+
+    def unique_names(self) -> List[str]:
+        return [self.class_names[i] for i in np.unique(self.data["class_id"]).tolist()]
+
+    # Dict-style compatibility
+    def _as_dict(self, row: np.void) -> dict:
+        class_id = int(row["class_id"])
+        class_name = self.class_names[class_id]
+        return {
+            'bbox': row["bbox"].tolist(),
+            'score': float(row["score"]),
+            'class_name': class_name,
+            'class_id': class_id,
+            'direction': ZONE_NAMES.get(int(row["zone"]), ""),
+            'label': class_name,
+            'track_id': int(row["track_id"]),
+            'ttc': float(row["ttc"]),
+        }
+
+    def to_dicts(self) -> List[dict]:
+        return [self._as_dict(row) for row in self.data]
+
+    def __iter__(self) -> Iterator[dict]:
+        for row in self.data:
+            yield self._as_dict(row)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self._as_dict(self.data[item])
+        return DetectionBatch(self.data[item], self.class_names)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __bool__(self) -> bool:
+        return len(self.data) > 0
+
+    def __repr__(self) -> str:
+        return f"DetectionBatch({len(self)}: {', '.join(self.unique_names())})"
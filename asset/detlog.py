@@ -0,0 +1,248 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from asset.detections import DetectionBatch
+
+LOG_VERSION = 1
+
+
+def rotated_name(path: str, timestamp: float) -> str:
+    """detections.jsonl.gz -> detections.20261018-120000123.jsonl.gz (milliseconds keep names unique)"""
+    directory, name = os.path.split(path)
+    stem, sep, ext = name.partition(".")
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp)) + f"{int(timestamp % 1 * 1000):03d}"
+    return os.path.join(directory, f"{stem}.{stamp}{sep}{ext}")
+
+
+def log_files(path: str) -> List[str]:
+    """Rotated files of a log, oldest first, followed by the current file if it exists."""
+    directory, name = os.path.split(path)
+    stem, sep, ext = name.partition(".")
+    pattern = os.path.join(directory, f"{glob.escape(stem)}.[0-9]*-[0-9]*{sep}{glob.escape(ext)}")
+    files = sorted(glob.glob(pattern))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+class DetectionLogWriter:
+    """
+    Background, batched detection log.
+
+    `write` only copies the detection rows into a bounded queue; a writer
+    thread turns them into compact JSON lines and appends them to a gzip file
+    every `flush_interval` seconds or `batch_size` records. Each flush is its
+    own gzip member, so a crash loses at most the unflushed batch and never
+    corrupts what is already on disk. The file is rotated to a timestamped
+    name once it exceeds `max_bytes` or has been written for `max_age`
+    seconds, keeping the newest `backups` rotated files.
+
+    Every file (and every restart) begins with a header record carrying the
+    class names, so records only store class ids.
+    """
+
+    def __init__(self, path: str = "detections.jsonl.gz", class_names: Sequence[str] = (),
+                 max_bytes: int = 5 * 1024 * 1024, max_age: float = 24 * 3600, backups: int = 10,
+                 flush_interval: float = 5.0, batch_size: int = 256, queue_size: int = 1024):
+        """
+        Args:
+            path (str): Current log file; rotated files are written next to it
+            class_names (Sequence[str]): Names for the class ids, stored in the header
+            max_bytes (int): Rotate once the compressed file is larger than this
+            max_age (float): Rotate once the file has been written for this many seconds
+            backups (int): Rotated files to keep, 0 keeps all of them
+            flush_interval (float): Longest time a record stays in memory
+            batch_size (int): Flush as soon as this many records are pending
+            queue_size (int): Records buffered before `write` starts dropping
+        """
+        self.path = path
+        self.class_names = list(class_names)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._opened_at = None
+        self._pending_header = True
+
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.rotations = 0
+
+    def start(self) -> "DetectionLogWriter":
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="DetectionLog")
+        self._thread.start()
+        return self
+
+    def write(self, detections: DetectionBatch, timestamp: Optional[float] = None,
+              source: Optional[str] = None) -> bool:
+        """Queue one frame's detections without blocking; returns False if the queue was full."""
+        try:
+            self._queue.put_nowait((timestamp or time.time(), source, detections.data.copy()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _encode(self, timestamp: float, source: Optional[str], data: np.ndarray) -> str:
+        record = {
+            "t": round(timestamp, 3),
+            "c": data["class_id"].tolist(),
+            "b": np.round(data["bbox"], 1).tolist(),
+            "s": np.round(data["score"].astype(np.float64), 3).tolist(),
+        }
+        if len(data) and (data["track_id"] >= 0).any():
+            record["k"] = data["track_id"].tolist()
+        if source is not None:
+            record["src"] = source
+        return json.dumps(record, separators=(",", ":"))
+
+    def _header(self) -> str:
+        return json.dumps({"header": LOG_VERSION, "t": round(time.time(), 3),
+                           "class_names": self.class_names}, separators=(",", ":"))
+
+    def _run(self) -> None:
+        lines = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            try:
+                wait = min(max(deadline - time.monotonic(), 0.01), 0.5)
+                lines.append(self._encode(*self._queue.get(timeout=wait)))
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            if now >= deadline:
+                deadline = now + self.flush_interval
+            elif len(lines) < self.batch_size:
+                continue
+            if lines:
+                self._flush(lines)
+                lines = []
+
+        # Drain whatever was queued before close()
+        while True:
+            try:
+                lines.append(self._encode(*self._queue.get_nowait()))
+            except queue.Empty:
+                break
+        if lines:
+            self._flush(lines)
+
+    def _flush(self, lines: List[str]) -> None:
+        self._maybe_rotate()
+        records = len(lines)
+        if self._pending_header:
+            lines = [self._header()] + lines
+        try:
+            with open(self.path, "ab") as f:
+                f.write(gzip.compress(("\n".join(lines) + "\n").encode("utf-8")))
+            if self._opened_at is None:
+                self._opened_at = time.time()
+            self._pending_header = False
+            self.written += records
+            self.flushes += 1
+        except OSError as e:
+            logging.error(f"Failed to write detection log {self.path}: {e}")
+
+    def _maybe_rotate(self) -> None:
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        too_old = self._opened_at is not None and time.time() - self._opened_at >= self.max_age
+        if size < self.max_bytes and not too_old:
+            return
+        try:
+            os.replace(self.path, rotated_name(self.path, time.time()))
+        except OSError as e:
+            logging.error(f"Failed to rotate detection log {self.path}: {e}")
+            return
+        self.rotations += 1
+        self._opened_at = None
+        self._pending_header = True
+        if self.backups:
+            for old in log_files(self.path)[:-self.backups]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "rotations": self.rotations,
+            "queued": self._queue.qsize(),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """
+    Yield the detection records of one log file with class names resolved.
+
+    Each record is {"t", "class_ids", "class_names", "bboxes", "scores"} plus
+    "track_ids" and "source" when they were logged. A truncated last gzip
+    member (power loss during a flush) ends the file quietly.
+    """
+    class_names: List[str] = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "header" in record:
+                    class_names = record.get("class_names", [])
+                    continue
+                out = {
+                    "t": record["t"],
+                    "class_ids": record["c"],
+                    "class_names": [class_names[c] if 0 <= c < len(class_names) else str(c) for c in record["c"]],
+                    "bboxes": record["b"],
+                    "scores": record["s"],
+                }
+                if "k" in record:
+                    out["track_ids"] = record["k"]
+                if "src" in record:
+                    out["source"] = record["src"]
+                yield out
+    except (EOFError, OSError, zlib.error) as e:
+        logging.warning(f"Detection log {path} ends early: {e}")
@@ -0,0 +1,150 @@
+import logging
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+class TorchEngine:
+    """Eager PyTorch forward pass, the default engine."""
+
+    name = "torch"
+
+    def __init__(self, model: torch.nn.Module):
+        self.model = model
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(img)
+
+
+class FrozenEngine(TorchEngine):
+    """
+    Frozen TorchScript artifact from asset.artifact.
+
+    Tracing records tensor sizes read through `.data` (ShuffleNetV2's
+    channel_shuffle) as constants, so the graph only accepts the batch size
+    it was traced with, which is 1. Batches are run one image at a time and
+    the outputs concatenated.
+    """
+
+    name = "frozen"
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            if img.shape[0] == 1:
+                return self.model(img)
+            return torch.cat([self.model(img[i:i + 1]) for i in range(img.shape[0])])
+
+
+class OnnxEngine:
+    """
+    NanoDet graph exported once to ONNX and run through ONNX Runtime on CPU.
+
+    The export is cached next to the checkpoint and redone only when the
+    checkpoint is newer. Batch, height and width are dynamic so the padded
+    tensors from stack_batch_img can be fed directly. Passing model=None
+    loads an existing graph (e.g. the INT8 one) without exporting.
+    """
+
+    name = "onnx"
+
+    def __init__(
+            self,
+            model: Optional[torch.nn.Module],
+            onnx_path: str,
+            input_size: Sequence[int],
+            num_classes: int,
+            checkpoint_path: Optional[str] = None,
+            num_threads: Optional[int] = None
+    ):
+        """
+        Args:
+            model (torch.nn.Module, optional): Eval-mode model (already RepVGG-converted if applicable)
+            onnx_path (str): Where the exported graph is cached
+            input_size (Sequence[int]): Model input [w, h] used for the export trace
+            num_classes (int): Number of classification channels in the head output
+            checkpoint_path (str, optional): Checkpoint the export is derived from
+            num_threads (int, optional): ONNX Runtime intra-op threads, None for default
+        """
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed; use engine='torch'")
+
+        self.onnx_path = onnx_path
+        self.num_classes = num_classes
+        if model is not None and self._needs_export(onnx_path, checkpoint_path):
+            self.export(model, onnx_path, input_size)
+        elif not os.path.exists(onnx_path):
+            raise RuntimeError(f"ONNX graph {onnx_path} not found")
+        elif self._needs_export(onnx_path, checkpoint_path):
+            logging.warning(f"{onnx_path} is older than {checkpoint_path}; recalibrate it")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    @staticmethod
+    def _needs_export(onnx_path: str, checkpoint_path: Optional[str]) -> bool:
+        if not os.path.exists(onnx_path):
+            return True
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            return os.path.getmtime(checkpoint_path) > os.path.getmtime(onnx_path)
+        return False
+
+    @staticmethod
+    def export(model: torch.nn.Module, onnx_path: str, input_size: Sequence[int]) -> None:
+        width, height = input_size
+        dummy = torch.zeros(1, 3, height, width)
+        logging.info(f"Exporting ONNX graph to {onnx_path}...")
+        with torch.no_grad():
+            torch.onnx.export(
+                model.cpu().eval(),
+                dummy,
+                onnx_path,
+                input_names=["data"],
+                output_names=["output"],
+                dynamic_axes={
+                    "data": {0: "batch", 2: "height", 3: "width"},
+                    "output": {0: "batch", 1: "priors"},
+                },
+                opset_version=13,
+                do_constant_folding=True,
+                dynamo=False,
+            )
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        data = np.ascontiguousarray(img.detach().cpu().numpy(), dtype=np.float32)
+        output = torch.from_numpy(self.session.run(None, {self.input_name: data})[0])
+        # NanoDet heads apply sigmoid to the class scores when exporting to ONNX,
+        # while head.post_process expects logits; undo it so both engines share
+        # the same decoding path.
+        output[..., :self.num_classes] = torch.logit(output[..., :self.num_classes], eps=1e-6)
+        return output
+
+
+def onnx_path_for(model_path: str, int8: bool = False) -> str:
+    """Location of the cached FP32 or INT8 ONNX graph for a checkpoint."""
+    return os.path.splitext(model_path)[0] + (".int8.onnx" if int8 else ".onnx")
+
+
+def build_engine(engine: str, model: torch.nn.Module, model_path: str, input_size: Sequence[int],
+                 num_classes: int):
+    """Create the inference engine selected by name ('torch', 'onnx' or 'int8')."""
+    if engine == "torch":
+        return TorchEngine(model)
+    if engine == "onnx":
+        return OnnxEngine(model, onnx_path_for(model_path), input_size, num_classes, checkpoint_path=model_path)
+    if engine == "int8":
+        # Produced by asset.quantize.calibrate_int8 / tools/quant_report.py
+        return OnnxEngine(None, onnx_path_for(model_path, int8=True), input_size, num_classes,
+                          checkpoint_path=model_path)
+    raise ValueError(f"Unknown inference engine: {engine}")
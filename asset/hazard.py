@@ -0,0 +1,132 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from asset.detections import DetectionBatch
+
+# Classes from config/my-config.yml that can be walked or driven into
+HAZARD_CLASSES = ("bollard", "bus", "motorcycle", "post", "pothole", "vehicle")
+
+# COCO names (the models in Main.DETECTION_MODELS) mapped onto the classes above
+HAZARD_ALIASES = {
+    "bicycle": "vehicle",
+    "car": "vehicle",
+    "truck": "vehicle",
+    "train": "vehicle",
+    "fire hydrant": "post",
+    "parking meter": "post",
+}
+
+
+def hazard_mask(class_names: Sequence[str], hazard_classes: Sequence[str] = HAZARD_CLASSES,
+                aliases: Dict[str, str] = HAZARD_ALIASES) -> np.ndarray:
+    """Boolean mask over `class_names` of the classes (or their aliases) in `hazard_classes`."""
+    hazards = {name.lower() for name in hazard_classes}
+    lower = [name.lower() for name in class_names]
+    return np.array([name in hazards or aliases.get(name) in hazards for name in lower], dtype=bool)
+
+
+class HazardScorer:
+    """
+    Time-to-collision estimate from the scale change of tracked boxes.
+
+    For an object approaching at constant speed the image area grows as 1/Z^2,
+    so TTC = Z / (-dZ/dt) = 2 / (d ln(area) / dt). The growth rate of every
+    track is smoothed with an EMA and kept in arrays indexed by track id, so
+    one update covers all tracks of a frame. Detections without a track id,
+    non-hazard classes and shrinking/static boxes get TTC = inf.
+    """
+
+    def __init__(
+            self,
+            class_names: Sequence[str],
+            hazard_classes: Sequence[str] = HAZARD_CLASSES,
+            aliases: Dict[str, str] = HAZARD_ALIASES,
+            smoothing: float = 0.5,
+            min_growth: float = 0.05,
+            max_age: float = 1.5,
+            alert_ttc: float = 2.5
+    ):
+        """
+        Args:
+            class_names (Sequence[str]): Detector class names
+            hazard_classes (Sequence[str]): Class names treated as collision hazards
+            aliases (Dict[str, str]): Detector class name -> hazard class, e.g. COCO "car" -> "vehicle"
+            smoothing (float): EMA weight of the newest growth-rate sample
+            min_growth (float): Smallest d ln(area)/dt (1/s) considered an approach
+            max_age (float): Seconds after which a track's history is discarded
+            alert_ttc (float): TTC in seconds under which a hazard is urgent
+        """
+        self.class_names = class_names
+        self.hazard_mask = hazard_mask(class_names, hazard_classes, aliases)
+        self.smoothing = smoothing
+        self.min_growth = min_growth
+        self.max_age = max_age
+        self.alert_ttc = alert_ttc
+
+        # Per-track state, sorted by track id
+        self.ids = np.zeros(0, dtype=np.int32)
+        self.log_area = np.zeros(0, dtype=np.float64)
+        self.rate = np.zeros(0, dtype=np.float64)
+        self.stamp = np.zeros(0, dtype=np.float64)
+
+    def update(self, detections: DetectionBatch, timestamp: float) -> DetectionBatch:
+        """Fill the ttc column of `detections` (in place) and return it."""
+        ttc = detections.data["ttc"]
+        ttc[:] = np.inf
+        tracked = detections.track_id >= 0
+        if not tracked.any():
+            self._expire(timestamp)
+            return detections
+
+        ids = detections.track_id[tracked]
+        bbox = detections.bbox[tracked].astype(np.float64)
+        area = np.maximum((bbox[:, 2] - bbox[:, 0]) * (bbox[:, 3] - bbox[:, 1]), 1.0)
+        log_area = np.log(area)
+
+        # Match current tracks against stored history
+        rate = np.zeros(len(ids), dtype=np.float64)
+        if len(self.ids):
+            pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+            known = self.ids[pos] == ids
+        else:
+            known = np.zeros(len(ids), dtype=bool)
+
+        if known.any():
+            idx = pos[known]
+            dt = timestamp - self.stamp[idx]
+            valid = (dt > 1e-3) & (dt < self.max_age)
+            sample = np.where(valid, (log_area[known] - self.log_area[idx]) / np.maximum(dt, 1e-3), 0.0)
+            prev = np.where(valid, self.rate[idx], 0.0)
+            rate[known] = np.where(valid, prev + self.smoothing * (sample - prev), 0.0)
+
+        # TTC only for hazard classes that are actually growing
+        approaching = (rate > self.min_growth) & self.hazard_mask[detections.class_id[tracked]]
+        track_ttc = np.full(len(ids), np.inf, dtype=np.float32)
+        track_ttc[approaching] = 2.0 / rate[approaching]
+        ttc[tracked] = track_ttc
+
+        self._store(ids, log_area, rate, timestamp)
+        return detections
+
+    def _store(self, ids: np.ndarray, log_area: np.ndarray, rate: np.ndarray, timestamp: float) -> None:
+        stale = np.isin(self.ids, ids) | (timestamp - self.stamp > self.max_age)
+        keep = ~stale
+        all_ids = np.concatenate([self.ids[keep], ids])
+        order = np.argsort(all_ids, kind="stable")
+        self.ids = all_ids[order]
+        self.log_area = np.concatenate([self.log_area[keep], log_area])[order]
+        self.rate = np.concatenate([self.rate[keep], rate])[order]
+        self.stamp = np.concatenate([self.stamp[keep], np.full(len(ids), timestamp)])[order]
+
+    def _expire(self, timestamp: float) -> None:
+        keep = timestamp - self.stamp <= self.max_age
+        if not keep.all():
+            self.ids, self.log_area = self.ids[keep], self.log_area[keep]
+            self.rate, self.stamp = self.rate[keep], self.stamp[keep]
+
+    def urgent(self, detections: DetectionBatch, max_ttc: Optional[float] = None) -> DetectionBatch:
+        """Detections with TTC under `max_ttc` (default alert_ttc), soonest first."""
+        limit = self.alert_ttc if max_ttc is None else max_ttc
+        hazards = detections.filter(detections.data["ttc"] < limit)
+        return hazards[np.argsort(hazards.data["ttc"], kind="stable")]
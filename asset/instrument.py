@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+STAGES = ("capture", "preprocess", "forward", "postprocess", "visualize", "callback")
+COUNTERS = ("dropped_frames", "stale_frames", "reconnects", "exceptions")
+
+# Log-spaced bucket edges from 0.1 ms to ~13 s, 8 buckets per decade
+DEFAULT_EDGES_MS = tuple(float(v) for v in np.logspace(-1, 5.1, 42))
+
+
+class Histogram:
+    """
+    Fixed-size latency histogram in milliseconds.
+
+    Memory does not grow with the number of samples; percentiles are
+    interpolated inside the bucket that contains them.
+    """
+
+    def __init__(self, edges_ms: Sequence[float] = DEFAULT_EDGES_MS):
+        self.edges = list(edges_ms)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float) -> None:
+        self.counts[bisect_right(self.edges, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= target:
+                lo = self.edges[i - 1] if i > 0 else 0.0
+                hi = self.edges[i] if i < len(self.edges) else self.max
+                return min(lo + (hi - lo) * (target - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(float(self.total) / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "max": round(float(self.max), 3),
+        }
+
+
+class Instrumentation:
+    """
+    Opt-in stage timings and event counters for the detection loop.
+
+    Timings are taken with `now()` and closed with `record(stage, start)`,
+    which returns the end time so consecutive stages can be chained. While
+    disabled both return 0.0 right away, so leaving the calls in the hot path
+    costs one attribute check each.
+
+    Subscribers are called as `callback(kind, name, value)` with kind
+    "timing" (value in ms) or "counter" (increment), from whichever thread
+    recorded the event.
+    """
+
+    def __init__(self, enabled: bool = False, edges_ms: Sequence[float] = DEFAULT_EDGES_MS):
+        """
+        Args:
+            enabled (bool): Start recording immediately
+            edges_ms (Sequence[float]): Histogram bucket upper edges in milliseconds
+        """
+        self.enabled = enabled
+        self.edges_ms = tuple(edges_ms)
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.subscribers: List[Callable[[str, str, float], None]] = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms = {stage: Histogram(self.edges_ms) for stage in STAGES}
+            self.counters = {name: 0 for name in COUNTERS}
+
+    def subscribe(self, callback: Callable[[str, str, float], None]) -> None:
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, str, float], None]) -> None:
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def now(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, stage: str, start: float) -> float:
+        """Record the time since `start` (from `now()`) under `stage` and return the current time."""
+        if not self.enabled or not start:
+            return 0.0
+        end = time.perf_counter()
+        value_ms = (end - start) * 1000
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.edges_ms)
+            histogram.record(value_ms)
+        self._notify("timing", stage, value_ms)
+        return end
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        self._notify("counter", name, n)
+
+    def _notify(self, kind: str, name: str, value: float) -> None:
+        for callback in self.subscribers:
+            try:
+                callback(kind, name, value)
+            except Exception as e:
+                logging.error(f"Instrumentation subscriber failed: {e}")
+
+    @property
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                "stages_ms": {stage: h.summary() for stage, h in self.histograms.items() if h.count},
+                "counters": dict(self.counters),
+            }
+
+
+# Shared disabled instance, the default for every detector and frame grabber
+DISABLED = Instrumentation(enabled=False)
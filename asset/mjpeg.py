@@ -0,0 +1,274 @@
+import logging
+import socket
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+# cv2.imdecode flags that decode at 1/2, 1/4 and 1/8 scale inside libjpeg
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from the JPEG SOF header without decoding."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    n = len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        if marker == 0xD9 or marker == 0xDA:
+            return None
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def reduced_decode_flag(frame_size: Tuple[int, int], input_size: Sequence[int], keep_ratio: bool = True) -> int:
+    """
+    Pick the strongest libjpeg downscale that still leaves at least as many
+    pixels as the detector will resize the frame to.
+    """
+    width, height = frame_size
+    dst_w, dst_h = input_size
+    if keep_ratio:
+        max_factor = max(width / dst_w, height / dst_h)
+    else:
+        max_factor = min(width / dst_w, height / dst_h)
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        if factor <= max_factor:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+class JpegDecoder:
+    """
+    cv2.imdecode at the strongest libjpeg downscale that still covers the
+    detector input, or at full scale when `input_size` is None. The flag is
+    picked once per stream resolution.
+    """
+
+    def __init__(self, input_size: Optional[Sequence[int]] = None, keep_ratio: bool = True):
+        """
+        Args:
+            input_size (Sequence[int], optional): Detector input [w, h]; None decodes at full size
+            keep_ratio (bool): Whether the detector pipeline keeps aspect ratio
+        """
+        self.input_size = input_size
+        self.keep_ratio = keep_ratio
+        self._flags: Dict[Tuple[int, int], int] = {}
+
+    def __call__(self, payload: bytes) -> Optional[np.ndarray]:
+        flag = cv2.IMREAD_COLOR
+        if self.input_size is not None:
+            size = jpeg_size(payload)
+            if size is not None:
+                flag = self._flags.get(size)
+                if flag is None:
+                    flag = reduced_decode_flag(size, self.input_size, self.keep_ratio)
+                    self._flags[size] = flag
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), flag)
+
+
+class ChunkedReader:
+    """
+    readline/read view of an HTTP/1.1 `Transfer-Encoding: chunked` body.
+
+    The ESP32 firmware sends its stream with httpd_resp_send_chunk, so every
+    boundary, part header and JPEG arrives wrapped in chunk size lines.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self._buf = bytearray()
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False at the last chunk or a broken stream."""
+        if self._eof:
+            return False
+        line = self.fp.readline()
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            self._eof = True
+            return False
+        if size == 0:
+            self._eof = True
+            return False
+        data = self.fp.read(size)
+        self.fp.readline()  # CRLF after the chunk data
+        if len(data) < size:
+            self._eof = True
+        self._buf += data
+        return bool(data)
+
+    def readline(self) -> bytes:
+        while True:
+            end = self._buf.find(b"\n")
+            if end >= 0:
+                end += 1
+                break
+            if not self._fill():
+                end = len(self._buf)
+                break
+        line = bytes(self._buf[:end])
+        del self._buf[:end]
+        return line
+
+    def read(self, size: int) -> bytes:
+        while len(self._buf) < size and self._fill():
+            pass
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        return data
+
+    def close(self) -> None:
+        self.fp.close()
+
+
+class MJPEGStreamSource:
+    """
+    multipart/x-mixed-replace client for the ESP32-CAM `/stream` endpoint.
+
+    Parts are read straight off the socket as raw JPEG bytes (de-chunked when
+    the camera uses chunked transfer encoding, as the ESP32 does); decoding is
+    deferred to `decode`, which FrameGrabber only calls for the frame that is
+    actually consumed. Frames are decoded at reduced scale when the stream is
+    larger than the detector input.
+    """
+
+    def __init__(self, url: str, input_size: Optional[Sequence[int]] = None,
+                 keep_ratio: bool = True, timeout: float = 5.0):
+        """
+        Args:
+            url (str): Stream URL, e.g. http://192.168.206.206:81/stream
+            input_size (Sequence[int], optional): Detector input [w, h]; None decodes at full size
+            keep_ratio (bool): Whether the detector pipeline keeps aspect ratio
+            timeout (float): Socket timeout in seconds
+        """
+        self.url = url
+        self.input_size = input_size
+        self.keep_ratio = keep_ratio
+        self.timeout = timeout
+        self.boundary = None
+        self.sock = None
+        self.fp = None
+        self._pending = None
+        self._decoder = JpegDecoder(input_size, keep_ratio)
+        self._open()
+
+    def _open(self) -> None:
+        parts = urlsplit(self.url)
+        host = parts.hostname
+        port = parts.port or 80
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        try:
+            self.sock = socket.create_connection((host, port), timeout=self.timeout)
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n"
+            self.sock.sendall(request.encode("ascii"))
+            self.fp = self.sock.makefile("rb")
+
+            status = self.fp.readline()
+            if b" 200" not in status:
+                raise ConnectionError(f"unexpected status {status.strip()!r}")
+            headers = self._read_headers()
+            content_type = headers.get("content-type", "")
+            if "multipart" not in content_type or "boundary=" not in content_type:
+                raise ConnectionError(f"not a multipart stream: {content_type!r}")
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                self.fp = ChunkedReader(self.fp)
+            boundary = content_type.split("boundary=", 1)[1].split(";")[0].strip().strip('"')
+            if boundary.startswith("--"):
+                boundary = boundary[2:]
+            self.boundary = b"--" + boundary.encode("ascii")
+        except (OSError, ConnectionError) as e:
+            logging.warning(f"MJPEG stream {self.url} unavailable: {e}")
+            self.release()
+
+    def _read_headers(self) -> Dict[str, str]:
+        headers = {}
+        while True:
+            line = self.fp.readline()
+            if not line:
+                raise ConnectionError("connection closed while reading headers")
+            line = line.strip()
+            if not line:
+                return headers
+            if b":" in line:
+                key, value = line.split(b":", 1)
+                headers[key.decode("latin-1").strip().lower()] = value.decode("latin-1").strip()
+
+    def is_opened(self) -> bool:
+        return self.fp is not None and self.boundary is not None
+
+    def read(self) -> Optional[bytes]:
+        """Return the next JPEG part as bytes, or None if the stream broke."""
+        if not self.is_opened():
+            return None
+        try:
+            line, self._pending = self._pending or self.fp.readline(), None
+            while line and not line.startswith(self.boundary):
+                line = self.fp.readline()
+            if not line:
+                return None
+
+            headers = self._read_headers()
+            length = headers.get("content-length")
+            if length is not None:
+                data = self.fp.read(int(length))
+                return data if len(data) == int(length) else None
+
+            # No Content-Length: collect until the next boundary line
+            chunks = []
+            while True:
+                line = self.fp.readline()
+                if not line:
+                    return None
+                if line.startswith(self.boundary):
+                    break
+                chunks.append(line)
+            data = b"".join(chunks).rstrip(b"\r\n")
+            # Hand the boundary back to the next read()
+            self._pending = line
+            return data
+        except (OSError, ValueError, ConnectionError) as e:
+            logging.warning(f"MJPEG stream read failed: {e}")
+            return None
+
+    def decode(self, payload: bytes) -> Optional[np.ndarray]:
+        return self._decoder(payload)
+
+    def release(self) -> None:
+        if self.fp is not None:
+            try:
+                self.fp.close()
+            except OSError:
+                pass
+            self.fp = None
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
@@ -0,0 +1,121 @@
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from asset.capture import FrameGrabber
+
+
+class CameraSource:
+    """One camera of a multi-source setup, with its own frame rate and priority."""
+
+    def __init__(self, url: Union[int, str], name: Optional[str] = None, fps: float = 5.0, priority: int = 0):
+        """
+        Args:
+            url (Union[int, str]): Camera index, stream URL or file
+            name (str, optional): Label for logs, windows and callbacks, defaults to str(url)
+            fps (float): Target inference rate for this source
+            priority (int): Higher priority sources are served first when a batch is full
+        """
+        self.url = url
+        self.name = name if name is not None else str(url)
+        self.fps = fps
+        self.priority = priority
+
+        self.grabber: Optional[FrameGrabber] = None
+        self.next_due = 0.0
+        self.inferred = 0
+        self.deferred = 0
+        self.latencies = deque(maxlen=200)
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps if self.fps > 0 else 0.0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        stats = {"inferred": self.inferred, "deferred": self.deferred}
+        if self.latencies:
+            lat = np.asarray(self.latencies) * 1000
+            stats["latency_p50_ms"] = round(float(np.percentile(lat, 50)), 1)
+            stats["latency_p95_ms"] = round(float(np.percentile(lat, 95)), 1)
+        if self.grabber is not None:
+            stats.update(self.grabber.stats)
+        return stats
+
+
+class SourceScheduler:
+    """
+    Decides which cameras feed the next inference call.
+
+    A source is due once its frame interval has elapsed. Due sources are
+    served by priority (then by how overdue they are), up to `max_batch`
+    frames per call; frames of sources that are due together end up in the
+    same batch. Sources that do not fit stay due and count as deferred.
+    Frames of sources that are not due are never decoded; their grabbers just
+    keep overwriting the newest frame.
+    """
+
+    def __init__(self, sources: List[CameraSource], open_source: Callable[[CameraSource], object],
+                 max_batch: int = 2):
+        """
+        Args:
+            sources (List[CameraSource]): Cameras to schedule
+            open_source (Callable[[CameraSource], object]): Opens the frame source of one camera
+            max_batch (int): Maximum frames per inference call
+        """
+        self.sources = sorted(sources, key=lambda s: -s.priority)
+        self.open_source = open_source
+        self.max_batch = max_batch
+
+    def start(self) -> "SourceScheduler":
+        for source in self.sources:
+            source.grabber = FrameGrabber(lambda s=source: self.open_source(s), name=f"Capture-{source.name}").start()
+        return self
+
+    def stop(self) -> None:
+        for source in self.sources:
+            if source.grabber is not None:
+                source.grabber.stop()
+
+    def next_batch(self, timeout: float = 1.0) -> List[Tuple[CameraSource, np.ndarray, float]]:
+        """
+        Wait for due sources to deliver frames.
+
+        Returns:
+            List[Tuple[CameraSource, np.ndarray, float]]: (source, frame, capture time) per frame,
+                empty on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            due = [s for s in self.sources if now >= s.next_due]
+            due.sort(key=lambda s: (-s.priority, s.next_due))
+
+            batch = []
+            for source in due:
+                if len(batch) >= self.max_batch:
+                    source.deferred += 1
+                    continue
+                packet = source.grabber.read(timeout=0)
+                if packet is not None:
+                    batch.append((source, packet[0], packet[1]))
+                    # Keep the cadence, but do not try to catch up after a long gap
+                    source.next_due += source.interval
+                    if source.next_due < now:
+                        source.next_due = now + source.interval
+            if batch or now >= deadline:
+                return batch
+
+            # Sleep until the next source is due, polling for late frames
+            wake = min(s.next_due for s in self.sources)
+            time.sleep(min(max(wake - now, 0.005), 0.02, max(deadline - now, 0)))
+
+    def record(self, source: CameraSource, captured_at: float) -> None:
+        source.inferred += 1
+        source.latencies.append(time.monotonic() - captured_at)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {s.name: s.stats for s in self.sources}
@@ -0,0 +1,127 @@
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from nanodet.data.transform.warp import warp_boxes
+from nanodet.model.module.nms import multiclass_nms
+from nanodet.util import distance2bbox
+
+
+class NanoDetDecoder:
+    """
+    Standalone version of the GFL/NanoDet-Plus head post-processing.
+
+    Turns the raw [B, N, num_classes + 4 * (reg_max + 1)] head output into the
+    same {img_id: {class_id: [[x1, y1, x2, y2, score], ...]}} structure as
+    head.post_process, without needing the head module itself. This lets
+    exported and frozen models be decoded without rebuilding the graph.
+    """
+
+    def __init__(self, num_classes: int, strides: Sequence[int], reg_max: int = 7,
+                 score_thr: float = 0.05, iou_threshold: float = 0.6, max_num: int = 100):
+        self.num_classes = num_classes
+        self.strides = list(strides)
+        self.reg_max = reg_max
+        self.score_thr = score_thr
+        self.iou_threshold = iou_threshold
+        self.max_num = max_num
+        self.project = torch.linspace(0, reg_max, reg_max + 1)
+        self._priors_cache: Dict[tuple, torch.Tensor] = {}
+        self.class_score_thr: Optional[torch.Tensor] = None
+        self._logit_thr = torch.full((num_classes,), math.log(score_thr / (1 - score_thr)))
+
+    def set_class_thresholds(self, thresholds: Optional[Sequence[float]]) -> None:
+        """
+        Per-class minimum scores applied to the raw head output, before box
+        decoding and NMS. None falls back to the global score_thr.
+        """
+        if thresholds is None:
+            self.class_score_thr = None
+        else:
+            thr = torch.as_tensor(thresholds, dtype=torch.float32).clamp(min=self.score_thr, max=1 - 1e-6)
+            if thr.numel() != self.num_classes:
+                raise ValueError(f"Expected {self.num_classes} class thresholds, got {thr.numel()}")
+            self.class_score_thr = thr
+        thr = self.class_score_thr
+        if thr is None:
+            thr = torch.full((self.num_classes,), self.score_thr)
+        # Sigmoid is monotonic, so thresholds can be compared against the logits directly
+        self._logit_thr = torch.logit(thr)
+
+    @classmethod
+    def from_head_cfg(cls, head_cfg) -> "NanoDetDecoder":
+        return cls(head_cfg.num_classes, head_cfg.strides, head_cfg.get("reg_max", 7))
+
+    def params(self) -> dict:
+        return {"num_classes": self.num_classes, "strides": self.strides, "reg_max": self.reg_max}
+
+    def center_priors(self, input_height: int, input_width: int, device) -> torch.Tensor:
+        """[N, 4] (x, y, stride, stride) priors for a padded input size, cached per shape."""
+        key = (input_height, input_width, str(device))
+        priors = self._priors_cache.get(key)
+        if priors is None:
+            levels = []
+            for stride in self.strides:
+                h = math.ceil(input_height / stride)
+                w = math.ceil(input_width / stride)
+                y, x = torch.meshgrid(
+                    torch.arange(h, dtype=torch.float32, device=device) * stride,
+                    torch.arange(w, dtype=torch.float32, device=device) * stride,
+                    indexing="ij",
+                )
+                s = torch.full((h * w,), float(stride), device=device)
+                levels.append(torch.stack([x.flatten(), y.flatten(), s, s], dim=-1))
+            priors = torch.cat(levels, dim=0)
+            self._priors_cache[key] = priors
+        return priors
+
+    def distribution_project(self, reg_preds: torch.Tensor) -> torch.Tensor:
+        shape = reg_preds.shape
+        x = F.softmax(reg_preds.reshape(*shape[:-1], 4, self.reg_max + 1), dim=-1)
+        return F.linear(x, self.project.to(x.device)).reshape(*shape[:-1], 4)
+
+    def get_bboxes(self, preds: torch.Tensor, input_height: int, input_width: int) -> list:
+        cls_preds, reg_preds = preds.split([self.num_classes, 4 * (self.reg_max + 1)], dim=-1)
+        priors = self.center_priors(input_height, input_width, preds.device)
+        logit_thr = self._logit_thr.to(preds.device)
+        results = []
+        for i in range(preds.shape[0]):
+            # Drop priors where no class clears its threshold before decoding anything
+            passing = cls_preds[i] >= logit_thr
+            keep = passing.any(dim=1).nonzero().squeeze(1)
+            if keep.numel() == 0:
+                results.append((preds.new_zeros(0, 5), preds.new_zeros(0, dtype=torch.long)))
+                continue
+
+            scores = cls_preds[i][keep].sigmoid() * passing[keep]
+            kept_priors = priors[keep]
+            dis_preds = self.distribution_project(reg_preds[i][keep]) * kept_priors[:, 2, None]
+            bboxes = distance2bbox(kept_priors[:, :2], dis_preds, max_shape=(input_height, input_width))
+            # Dummy background column, as expected by multiclass_nms
+            scores = torch.cat([scores, scores.new_zeros(scores.shape[0], 1)], dim=1)
+            results.append(multiclass_nms(
+                bboxes, scores,
+                score_thr=self.score_thr,
+                nms_cfg=dict(type="nms", iou_threshold=self.iou_threshold),
+                max_num=self.max_num,
+            ))
+        return results
+
+    def __call__(self, preds: torch.Tensor, meta: dict) -> dict:
+        input_height, input_width = meta["img"].shape[2:]
+        img_info = meta["img_info"]
+        det_results = {}
+        for (det_bboxes, det_labels), width, height, img_id, warp_matrix in zip(
+                self.get_bboxes(preds, input_height, input_width),
+                img_info["width"], img_info["height"], img_info["id"], meta["warp_matrix"]):
+            det_bboxes = det_bboxes.detach().cpu().numpy()
+            det_bboxes[:, :4] = warp_boxes(det_bboxes[:, :4], np.linalg.inv(warp_matrix), width, height)
+            classes = det_labels.detach().cpu().numpy()
+            det_result = {}
+            for c in range(self.num_classes):
+                det_result[c] = det_bboxes[classes == c, :5].astype(np.float32).tolist()
+            det_results[img_id] = det_result
+        return det_results
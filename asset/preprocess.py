@@ -0,0 +1,85 @@
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from nanodet.data.transform.warp import get_minimum_dst_shape, get_resize_matrix
+
+
+class FastPreprocessor:
+    """
+    Allocation-free replacement for Pipeline + transpose + stack_batch_img on
+    single frames of a fixed size.
+
+    The frame is warped straight into a reusable uint8 buffer and normalized
+    in place into a reusable float32 HWC buffer. The model input tensor is a
+    permuted view of that buffer, i.e. an NCHW tensor in channels-last memory
+    format, so no per-frame tensor is created. Buffers and the warp matrix are
+    only rebuilt when the incoming frame size changes.
+
+    The returned tensor is overwritten by the next call.
+    """
+
+    def __init__(self, input_size: Sequence[int], keep_ratio: bool, normalize: Sequence[Sequence[float]],
+                 pad_shape: Optional[Tuple[int, int]] = None, divisible: int = 32):
+        """
+        Args:
+            input_size (Sequence[int]): Model input [w, h]
+            keep_ratio (bool): Keep aspect ratio when resizing (as the val pipeline does)
+            normalize (Sequence[Sequence[float]]): [mean, std] in BGR 0-255 space
+            pad_shape (Tuple[int, int], optional): Fixed (h, w) to pad to, e.g. for traced graphs
+            divisible (int): Padding multiple when pad_shape is not given
+        """
+        self.input_size = tuple(input_size)
+        self.keep_ratio = keep_ratio
+        self.mean = np.array(normalize[0], dtype=np.float32).reshape(1, 1, 3)
+        self.inv_std = (1.0 / np.array(normalize[1], dtype=np.float32)).reshape(1, 1, 3)
+        self.pad_shape = pad_shape
+        self.divisible = divisible
+
+        self._frame_size = None
+        self._dst_size = None
+        self._affine = None
+        self.warp_matrix = None
+        self._resized = None
+        self._input = None
+        self.tensor = None
+
+    def _plan(self, width: int, height: int) -> None:
+        if self.keep_ratio:
+            dst_w, dst_h = get_minimum_dst_shape((width, height), self.input_size)
+        else:
+            dst_w, dst_h = self.input_size
+        warp = get_resize_matrix((width, height), (dst_w, dst_h), self.keep_ratio)
+
+        if self.pad_shape is not None:
+            pad_h, pad_w = self.pad_shape
+        else:
+            pad_h = (dst_h + self.divisible - 1) // self.divisible * self.divisible
+            pad_w = (dst_w + self.divisible - 1) // self.divisible * self.divisible
+
+        self._frame_size = (width, height)
+        self._dst_size = (dst_w, dst_h)
+        self.warp_matrix = warp
+        self._affine = np.ascontiguousarray(warp[:2], dtype=np.float64)
+        self._resized = np.empty((dst_h, dst_w, 3), dtype=np.uint8)
+        # Padding stays at 0, which is what stack_batch_img pads normalized images with
+        self._input = np.zeros((pad_h, pad_w, 3), dtype=np.float32)
+        self.tensor = torch.from_numpy(self._input).permute(2, 0, 1).unsqueeze(0)
+
+    def __call__(self, img: np.ndarray) -> Tuple[torch.Tensor, np.ndarray]:
+        """
+        Returns:
+            Tuple[torch.Tensor, np.ndarray]: [1, 3, H, W] channels-last input view and the 3x3 warp matrix
+        """
+        height, width = img.shape[:2]
+        if self._frame_size != (width, height):
+            self._plan(width, height)
+
+        dst_w, dst_h = self._dst_size
+        cv2.warpAffine(img, self._affine, (dst_w, dst_h), dst=self._resized, flags=cv2.INTER_LINEAR)
+        view = self._input[:dst_h, :dst_w]
+        np.subtract(self._resized, self.mean, out=view)
+        np.multiply(view, self.inv_std, out=view)
+        return self.tensor, self.warp_matrix
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from asset.replay import ESP32_BOUNDARY, mjpeg_part_header
+
+_INDEX_HTML = b"<html><body style='margin:0;background:#000'><img src='/stream' style='width:100%'></body></html>"
+
+
+class PreviewServer:
+    """
+    Optional MJPEG preview of what the detector sees.
+
+    The detection loop only hands over references to the latest frame and
+    its detections with `publish`, which returns immediately while no client
+    is connected. Drawing and JPEG encoding run in the client's HTTP thread,
+    at most `max_fps` times per second and only for frames that changed, so
+    headless units without a viewer pay no drawing cost at all.
+    Published frames must not be modified afterwards.
+    """
+
+    def __init__(self, render: Callable[[np.ndarray, Any], np.ndarray], host: str = "0.0.0.0",
+                 port: int = 8090, max_fps: float = 5.0, jpeg_quality: int = 70):
+        """
+        Args:
+            render (Callable): Draws detections on a copy of the frame, e.g. NanoDetVisualizer.visualize
+            host (str): Interface to bind
+            port (int): TCP port, 0 picks a free one
+            max_fps (float): Upper bound on rendered preview frames per second
+            jpeg_quality (int): JPEG quality of the preview
+        """
+        self.render = render
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+
+        self.clients = 0
+        self.rendered = 0
+        self._cond = threading.Condition()
+        self._latest = None  # (frame, detections)
+        self._seq = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._stop_requested = False
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/stream"
+
+    @property
+    def active(self) -> bool:
+        return self.clients > 0
+
+    def publish(self, frame: np.ndarray, detections: Any = None) -> None:
+        """Offer the newest frame and its detections; a no-op while nobody is watching."""
+        if not self.clients:
+            return
+        with self._cond:
+            self._latest = (frame, detections)
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _next_frame(self, last_seq: int, timeout: float = 1.0):
+        with self._cond:
+            if self._seq == last_seq:
+                self._cond.wait(timeout)
+            if self._seq == last_seq or self._latest is None:
+                return last_seq, None
+            return self._seq, self._latest
+
+    def _encode(self, frame: np.ndarray, detections: Any) -> Optional[bytes]:
+        image = frame if detections is None else self.render(frame, detections)
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return buf.tobytes() if ok else None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logging.debug(f"Preview server: {format % args}")
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(_INDEX_HTML)))
+                    self.end_headers()
+                    self.wfile.write(_INDEX_HTML)
+                    return
+                if path != "/stream":
+                    self.send_error(404)
+                    return
+
+                with server._cond:
+                    server.clients += 1
+                interval = 1.0 / server.max_fps if server.max_fps > 0 else 0.0
+                seq = 0
+                next_due = 0.0
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", f"multipart/x-mixed-replace;boundary={ESP32_BOUNDARY}")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                    while not server._stop_requested:
+                        wait = next_due - time.monotonic()
+                        if wait > 0:
+                            time.sleep(wait)
+                        seq, latest = server._next_frame(seq)
+                        if latest is None:
+                            continue
+                        jpeg = server._encode(*latest)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(mjpeg_part_header(len(jpeg)))
+                        self.wfile.write(jpeg)
+                        self.wfile.flush()
+                        server.rendered += 1
+                        next_due = time.monotonic() + interval
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server._cond:
+                        server.clients -= 1
+                        if not server.clients:
+                            # Do not pin the last frame in memory while nobody watches
+                            server._latest = None
+                    self.close_connection = True
+
+        return Handler
+
+    def start(self) -> "PreviewServer":
+        self._stop_requested = False
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="PreviewServer")
+        self._thread.start()
+        logging.info(f"Detection preview on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._stop_requested = True
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"clients": self.clients, "rendered": self.rendered}
@@ -0,0 +1,301 @@
+import glob
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from asset.mjpeg import JpegDecoder
+
+JPEG_EXTENSIONS = (".jpg", ".jpeg", ".JPG", ".JPEG")
+# Same multipart boundary as the ESP32-CAM CameraWebServer example
+ESP32_BOUNDARY = "123456789000000000000987654321"
+
+
+def mjpeg_part_header(length: int) -> bytes:
+    """Part header the ESP32 firmware sends before each JPEG of its /stream."""
+    now = time.time()
+    return (
+        f"\r\n--{ESP32_BOUNDARY}\r\n"
+        f"Content-Type: image/jpeg\r\nContent-Length: {length}\r\n"
+        f"X-Timestamp: {int(now)}.{int(now % 1 * 1e6):06d}\r\n\r\n"
+    ).encode("ascii")
+
+
+class ReplayClock:
+    """
+    Paces recorded frames against the wall clock.
+
+    In realtime mode `wait(ts)` sleeps until a frame's recorded timestamp is
+    due and reports whether the reader has fallen behind it, so a slow
+    consumer skips frames like it would on the live camera. Without realtime
+    every frame is delivered as fast as it is asked for.
+    """
+
+    def __init__(self, realtime: bool = True, speed: float = 1.0):
+        self.realtime = realtime
+        self.speed = speed
+        self._start = None
+
+    def reset(self) -> None:
+        self._start = None
+
+    def wait(self, timestamp: float, frame_interval: float) -> bool:
+        """Return False if the frame at `timestamp` (seconds) is already a full interval late."""
+        if not self.realtime:
+            return True
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now - timestamp / self.speed
+        due = self._start + timestamp / self.speed
+        if now > due + frame_interval / self.speed:
+            return False
+        if due > now:
+            time.sleep(due - now)
+        return True
+
+
+class JpegDirectorySource:
+    """
+    Frame source over a directory of JPEG files, in file name order.
+
+    `read` returns the raw file bytes and `decode` turns them into a BGR frame,
+    matching the lazy-decode interface of MJPEGStreamSource, including its
+    reduced-scale decode when `input_size` is given. Files are played at `fps`
+    in realtime mode, or back to back otherwise.
+    """
+
+    def __init__(self, path: str, fps: float = 10.0, realtime: bool = True, loop: bool = False,
+                 input_size: Optional[Sequence[int]] = None, keep_ratio: bool = True):
+        """
+        Args:
+            path (str): Directory with .jpg/.jpeg files
+            fps (float): Playback rate used to derive frame timestamps
+            realtime (bool): Pace frames at `fps` and skip frames the consumer is too slow for
+            loop (bool): Start over at the end instead of finishing
+            input_size (Sequence[int], optional): Detector input [w, h] for reduced decode, None for full size
+            keep_ratio (bool): Whether the detector pipeline keeps aspect ratio
+        """
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.clock = ReplayClock(realtime)
+        self._decoder = JpegDecoder(input_size, keep_ratio)
+        self.files = sorted(
+            f for f in glob.glob(os.path.join(path, "*")) if f.endswith(JPEG_EXTENSIONS)
+        )
+        self.index = 0
+        self.skipped = 0
+
+    def is_opened(self) -> bool:
+        return bool(self.files)
+
+    def read(self) -> Optional[bytes]:
+        interval = 1.0 / self.fps
+        while True:
+            if self.index >= len(self.files):
+                if not self.loop or not self.files:
+                    return None
+                self.index = 0
+                self.clock.reset()
+            index = self.index
+            self.index += 1
+            if self.clock.wait(index * interval, interval):
+                return np.fromfile(self.files[index], dtype=np.uint8).tobytes()
+            self.skipped += 1
+
+    def decode(self, payload: bytes) -> Optional[np.ndarray]:
+        return self._decoder(payload)
+
+    def release(self) -> None:
+        self.index = len(self.files)
+
+
+class VideoFileSource:
+    """
+    Frame source over a recorded video (e.g. MP4).
+
+    In realtime mode frames are released at their recorded timestamps and
+    frames the consumer is too slow for are skipped with `grab()` (no decode);
+    otherwise every frame is returned as fast as possible.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        """
+        Args:
+            path (str): Video file readable by OpenCV
+            realtime (bool): Play at recorded timestamps instead of as fast as possible
+            loop (bool): Start over at the end instead of finishing
+        """
+        self.path = path
+        self.loop = loop
+        self.clock = ReplayClock(realtime)
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.index = 0
+        self.skipped = 0
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self) -> Optional[np.ndarray]:
+        interval = 1.0 / self.fps
+        while True:
+            msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            timestamp = msec / 1000.0 if msec > 0 else self.index * interval
+            if not self.clock.wait(timestamp, interval):
+                if not self.cap.grab():
+                    if self._rewind():
+                        continue
+                    return None
+                self.index += 1
+                self.skipped += 1
+                continue
+
+            ret, frame = self.cap.read()
+            if not ret:
+                if self._rewind():
+                    continue
+                return None
+            self.index += 1
+            return frame
+
+    def _rewind(self) -> bool:
+        if not self.loop or self.index == 0:
+            return False
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.index = 0
+        self.clock.reset()
+        return True
+
+    def decode(self, payload: np.ndarray) -> Optional[np.ndarray]:
+        return payload
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+def open_replay_source(path: str, realtime: bool = True, loop: bool = False, fps: float = 10.0,
+                       input_size: Optional[Sequence[int]] = None, keep_ratio: bool = True):
+    """
+    JpegDirectorySource for directories, VideoFileSource for anything else.
+    `input_size` enables the live reduced-scale JPEG decode (JPEG directories only).
+    """
+    if os.path.isdir(path):
+        return JpegDirectorySource(path, fps=fps, realtime=realtime, loop=loop,
+                                   input_size=input_size, keep_ratio=keep_ratio)
+    return VideoFileSource(path, realtime=realtime, loop=loop)
+
+
+class MJPEGStandInServer:
+    """
+    Local stand-in for the ESP32-CAM `/stream` endpoint.
+
+    Serves multipart/x-mixed-replace JPEG parts (same boundary and part
+    headers as the ESP32 firmware) from a replay source, so the complete
+    capture path (MJPEGStreamSource, reconnects, stale-frame handling) can be
+    exercised without the camera. Every client gets its own source from
+    `open_source`. With `chunked` the stream is sent with chunked transfer
+    encoding, one chunk per boundary/header and per JPEG, like the firmware's
+    httpd_resp_send_chunk calls.
+    """
+
+    def __init__(self, open_source: Callable[[], Any], host: str = "127.0.0.1", port: int = 8081,
+                 jpeg_quality: int = 85, chunked: bool = False):
+        """
+        Args:
+            open_source (Callable): Factory returning a fresh replay source per client
+            host (str): Interface to bind
+            port (int): TCP port, 0 picks a free one
+            jpeg_quality (int): Quality used when the source yields decoded frames
+            chunked (bool): Use Transfer-Encoding: chunked like the ESP32 firmware
+        """
+        self.open_source = open_source
+        self.jpeg_quality = jpeg_quality
+        self.chunked = chunked
+        self.clients = 0
+        self.frames_sent = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/stream"
+
+    def _encode(self, payload: Any) -> Optional[bytes]:
+        if isinstance(payload, (bytes, bytearray)):
+            return bytes(payload)
+        ok, buf = cv2.imencode(".jpg", payload, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return buf.tobytes() if ok else None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logging.debug(f"Stand-in server: {format % args}")
+
+            def send_part(self, data: bytes) -> None:
+                if server.chunked:
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                else:
+                    self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/stream":
+                    self.send_error(404)
+                    return
+                source = server.open_source()
+                server.clients += 1
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", f"multipart/x-mixed-replace;boundary={ESP32_BOUNDARY}")
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    if server.chunked:
+                        self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    while True:
+                        payload = source.read()
+                        if payload is None:
+                            break
+                        jpeg = server._encode(payload)
+                        if jpeg is None:
+                            continue
+                        self.send_part(mjpeg_part_header(len(jpeg)))
+                        self.send_part(jpeg)
+                        self.wfile.flush()
+                        server.frames_sent += 1
+                    if server.chunked:
+                        self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    source.release()
+                    self.close_connection = True
+
+        return Handler
+
+    def start(self) -> "MJPEGStandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="MJPEGStandIn")
+        self._thread.start()
+        logging.info(f"MJPEG stand-in serving on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"clients": self.clients, "frames_sent": self.frames_sent}
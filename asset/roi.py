@@ -0,0 +1,147 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from asset.detections import DetectionBatch
+from asset.tracking import iou_matrix
+
+ROI_FULL = "full"
+ROI_CROP = "crop"
+ROI_TILE = "tile"
+
+Region = Tuple[int, int, int, int]
+
+
+def nms(batch: DetectionBatch, iou_threshold: float = 0.5) -> DetectionBatch:
+    """Class-aware greedy NMS over a DetectionBatch, highest score wins."""
+    if len(batch) < 2:
+        return batch
+    order = np.argsort(-batch.score, kind="stable")
+    bbox = batch.bbox[order]
+    iou = iou_matrix(bbox, bbox)
+    iou[batch.class_id[order][:, None] != batch.class_id[order][None, :]] = 0.0
+
+    keep = np.ones(len(order), dtype=bool)
+    for i in range(len(order)):
+        if keep[i]:
+            suppress = iou[i, i + 1:] > iou_threshold
+            keep[i + 1:][suppress] = False
+    return batch[np.sort(order[keep])]
+
+
+def tile_starts(start: int, end: int, tile: int, overlap: float) -> List[int]:
+    """Evenly spaced tile origins covering [start, end) with at least `overlap` overlap."""
+    length = end - start
+    if length <= tile:
+        return [start]
+    count = math.ceil((length - tile) / (tile * (1.0 - overlap))) + 1
+    return np.linspace(start, end - tile, count).round().astype(int).tolist()
+
+
+class RoiScheduler:
+    """
+    Regions of interest for the detector.
+
+    - "full": the whole frame, as before.
+    - "crop": the top `crop_top` fraction (sky, building fronts) is dropped
+      before resizing, so the walking area gets more of the model input.
+    - "tile": the cropped frame is still inferred every frame, and in addition
+      one overlapping tile of the walking corridor is inferred at native
+      resolution. Tiles are visited round-robin; each tile's last result is
+      kept for one full round and merged with the current frame by NMS.
+      Small distant objects that vanish at 320 px show up in the tiles.
+    """
+
+    def __init__(
+            self,
+            mode: str = ROI_CROP,
+            crop_top: float = 0.25,
+            corridor: Sequence[float] = (0.1, 0.25, 0.9, 0.85),
+            tile_size: Optional[Tuple[int, int]] = None,
+            overlap: float = 0.2,
+            iou_threshold: float = 0.5
+    ):
+        """
+        Args:
+            mode (str): "full", "crop" or "tile"
+            crop_top (float): Fraction of the frame height dropped from the top
+            corridor (Sequence[float]): (x0, y0, x1, y1) corridor in frame fractions, used for tiles
+            tile_size (Tuple[int, int], optional): (w, h) of a tile, defaults to the model input size
+            overlap (float): Minimum overlap fraction between neighbouring tiles
+            iou_threshold (float): IoU above which merged detections of one class are suppressed
+        """
+        if mode not in (ROI_FULL, ROI_CROP, ROI_TILE):
+            raise ValueError(f"Unknown ROI mode: {mode}")
+        self.mode = mode
+        self.crop_top = crop_top
+        self.corridor = tuple(corridor)
+        self.tile_size = tuple(tile_size) if tile_size is not None else None
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+
+        self._frame_size = None
+        self._base = None
+        self._tiles: List[Region] = []
+        self._tile_results: List[Optional[DetectionBatch]] = []
+        self._next_tile = 0
+
+    def _plan(self, width: int, height: int) -> None:
+        top = int(height * self.crop_top) if self.mode != ROI_FULL else 0
+        self._base = (0, top, width, height)
+
+        self._tiles = []
+        if self.mode == ROI_TILE:
+            cx0, cy0, cx1, cy1 = (int(f * s) for f, s in zip(self.corridor, (width, height, width, height)))
+            tile_w = min(self.tile_size[0], cx1 - cx0)
+            tile_h = min(self.tile_size[1], cy1 - cy0)
+            for y in tile_starts(cy0, cy1, tile_h, self.overlap):
+                for x in tile_starts(cx0, cx1, tile_w, self.overlap):
+                    self._tiles.append((x, y, x + tile_w, y + tile_h))
+        self._tile_results = [None] * len(self._tiles)
+        self._next_tile = 0
+        self._frame_size = (width, height)
+
+    @property
+    def needs_full_resolution(self) -> bool:
+        """Tiles only add detail if they are cut from frames decoded at full scale."""
+        return self.mode == ROI_TILE
+
+    @property
+    def tiles(self) -> List[Region]:
+        return list(self._tiles)
+
+    def regions(self, width: int, height: int) -> List[Region]:
+        """(x0, y0, x1, y1) regions to infer for the next frame: the base region, then at most one tile."""
+        if self._frame_size != (width, height):
+            self._plan(width, height)
+        if not self._tiles:
+            return [self._base]
+        return [self._base, self._tiles[self._next_tile]]
+
+    def merge(self, batches: Sequence[DetectionBatch], regions: Sequence[Region],
+              class_names: Sequence[str]) -> DetectionBatch:
+        """
+        Shift per-region detections back to frame coordinates and merge them.
+
+        Args:
+            batches (Sequence[DetectionBatch]): Detections per region, in region coordinates
+            regions (Sequence[Region]): The regions returned by `regions()` for this frame
+            class_names (Sequence[str]): Detector class names
+
+        Returns:
+            DetectionBatch: Detections in frame coordinates
+        """
+        shifted = []
+        for batch, (x0, y0, _, _) in zip(batches, regions):
+            batch.data["bbox"] += np.array([x0, y0, x0, y0], dtype=np.float32)
+            shifted.append(batch)
+
+        if not self._tiles:
+            return shifted[0]
+
+        self._tile_results[self._next_tile] = shifted[1]
+        self._next_tile = (self._next_tile + 1) % len(self._tiles)
+        cached = [r for r in self._tile_results if r is not None and r is not shifted[1]]
+        merged = DetectionBatch.concatenate([shifted[0], shifted[1]] + cached, class_names)
+        return nms(merged, self.iou_threshold)
@@ -0,0 +1,206 @@
+import copy
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from asset.detections import DetectionBatch
+from asset.roi import RoiScheduler
+
+
+class ModelSwitcher:
+    """
+    Keeps several warmed-up detectors and picks one per frame based on load.
+
+    Detectors are ordered from cheapest to most accurate (e.g. 320 then 416
+    input). System load (CPU, battery) is reported from the power-management
+    loop, frame latency from the detection loop; both only set a target
+    level, which is applied at the next frame boundary by `begin_frame()`.
+    Stepping down happens as soon as one signal is over its limit for
+    `down_dwell` seconds; stepping up needs every signal comfortably below its
+    limit for `up_dwell` seconds, so the two thresholds never flap.
+
+    The switcher also forwards `class_names`, `set_class_thresholds` and
+    `set_roi` to every detector, so it can stand in for a single detector.
+    Its `input_size` / `keep_ratio` are those of the largest model, so frames
+    are decoded with enough pixels for every level.
+    """
+
+    def __init__(
+            self,
+            detectors: Sequence,
+            latency_budget: float = 0.25,
+            cpu_high: float = 85.0,
+            cpu_low: float = 50.0,
+            battery_low: float = 25.0,
+            battery_resume: float = 40.0,
+            down_dwell: float = 2.0,
+            up_dwell: float = 20.0,
+            latency_smoothing: float = 0.2
+    ):
+        """
+        Args:
+            detectors (Sequence[NanoDetDetector]): Detectors ordered from cheapest to most accurate
+            latency_budget (float): Target seconds per inferred frame
+            cpu_high (float): Average CPU percent above which the switcher steps down
+            cpu_low (float): Average CPU percent below which stepping up is allowed
+            battery_low (float): Battery percent (on battery power) below which it steps down
+            battery_resume (float): Battery percent above which stepping up is allowed again
+            down_dwell (float): Seconds a step-down condition must hold
+            up_dwell (float): Seconds a step-up condition must hold
+            latency_smoothing (float): EMA weight of the newest latency sample
+        """
+        if not detectors:
+            raise ValueError("ModelSwitcher needs at least one detector")
+        names = list(detectors[0].class_names)
+        for detector in detectors[1:]:
+            if list(detector.class_names) != names:
+                raise ValueError(f"Detector {detector.model_path} has different class names")
+
+        self.detectors = list(detectors)
+        self.latency_budget = latency_budget
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.battery_low = battery_low
+        self.battery_resume = battery_resume
+        self.down_dwell = down_dwell
+        self.up_dwell = up_dwell
+        self.latency_smoothing = latency_smoothing
+
+        # Decode for the model needing the most pixels; keep_ratio=False needs more at equal size
+        largest = max(self.detectors, key=lambda d: (d.input_size[0] * d.input_size[1], not d.keep_ratio))
+        self.input_size = list(largest.input_size)
+        self.keep_ratio = largest.keep_ratio
+
+        self.level = len(self.detectors) - 1
+        self.target = self.level
+        self.roi = None
+        self.latency = [None] * len(self.detectors)
+        self.base_latency = [None] * len(self.detectors)
+        self.cpu = None
+        self.battery = None
+        self.plugged = True
+        self._down_since = None
+        self._up_since = None
+        self.switches = 0
+
+    @property
+    def class_names(self) -> List[str]:
+        return self.detectors[0].class_names
+
+    @property
+    def active(self):
+        return self.detectors[self.level]
+
+    def set_class_thresholds(self, thresholds, default: float = 0.0, multiplier: float = 1.0) -> None:
+        for detector in self.detectors:
+            detector.set_class_thresholds(thresholds, default, multiplier)
+
+    def set_roi(self, roi: Optional[RoiScheduler]) -> None:
+        # Each detector keeps its own copy: tile size and tile cache depend on the input size
+        self.roi = roi
+        for detector in self.detectors:
+            detector.set_roi(copy.deepcopy(roi))
+
+    def warmup(self, frame_size: Tuple[int, int] = (640, 480), runs: int = 2) -> None:
+        """Run dummy frames through every detector and seed their latency estimates."""
+        frame = np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        for i, detector in enumerate(self.detectors):
+            for _ in range(runs):
+                start = time.perf_counter()
+                detector.get_detections(frame, 1.0)
+                self.latency[i] = time.perf_counter() - start
+            self.base_latency[i] = self.latency[i]
+            logging.info(f"Warmed up {detector.model_path}: {self.latency[i] * 1000:.1f} ms/frame")
+
+    def begin_frame(self):
+        """Apply a pending switch and return the detector for this frame."""
+        if self.target != self.level:
+            old = self.active
+            self.level = self.target
+            self.switches += 1
+            logging.info(f"Detector switched {old.model_path} -> {self.active.model_path}")
+        return self.active
+
+    def get_detections(self, img: Union[str, np.ndarray], score_threshold: float = 0.35) -> DetectionBatch:
+        detector = self.begin_frame()
+        start = time.perf_counter()
+        detections = detector.get_detections(img, score_threshold)
+        self.observe(time.perf_counter() - start)
+        return detections
+
+    def get_detections_batch(self, imgs: Sequence[Union[str, np.ndarray]],
+                             score_threshold: float = 0.35) -> List[DetectionBatch]:
+        detector = self.begin_frame()
+        start = time.perf_counter()
+        detections = detector.get_detections_batch(imgs, score_threshold)
+        # Latency budget is per frame, so a batch counts with its per-image cost
+        self.observe((time.perf_counter() - start) / max(len(imgs), 1))
+        return detections
+
+    def observe(self, latency: float) -> None:
+        """Record the inference time of the active detector."""
+        previous = self.latency[self.level]
+        if previous is None:
+            self.latency[self.level] = latency
+        else:
+            self.latency[self.level] = previous + self.latency_smoothing * (latency - previous)
+        self._decide()
+
+    def update_load(self, cpu_percent: Optional[float], battery_percent: Optional[float] = None,
+                    plugged: bool = True) -> None:
+        """Record system load; called from the power-management loop."""
+        self.cpu = cpu_percent
+        self.battery = battery_percent
+        self.plugged = plugged
+        self._decide()
+
+    def _pressure(self) -> bool:
+        if self.cpu is not None and self.cpu > self.cpu_high:
+            return True
+        if not self.plugged and self.battery is not None and self.battery < self.battery_low:
+            return True
+        latency = self.latency[self.level]
+        return latency is not None and latency > self.latency_budget
+
+    def _headroom(self) -> bool:
+        if self.cpu is not None and self.cpu > self.cpu_low:
+            return False
+        if not self.plugged and self.battery is not None and self.battery < self.battery_resume:
+            return False
+        # The next model must fit the budget with some margin; its unloaded
+        # (warm-up) cost is used, since its last live latency was measured under load
+        heavier = self.base_latency[self.level + 1]
+        return heavier is None or heavier < 0.8 * self.latency_budget
+
+    def _decide(self) -> None:
+        now = time.monotonic()
+        if self.level > 0 and self._pressure():
+            self._up_since = None
+            if self._down_since is None:
+                self._down_since = now
+            if now - self._down_since >= self.down_dwell:
+                self.target = self.level - 1
+                self._down_since = None
+            return
+        self._down_since = None
+
+        if self.level < len(self.detectors) - 1 and self._headroom():
+            if self._up_since is None:
+                self._up_since = now
+            if now - self._up_since >= self.up_dwell:
+                self.target = self.level + 1
+                self._up_since = None
+        else:
+            self._up_since = None
+
+    @property
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self.active.model_path,
+            "switches": self.switches,
+            "latency_ms": [None if l is None else round(l * 1000, 1) for l in self.latency],
+            "cpu": self.cpu,
+            "battery": self.battery,
+        }
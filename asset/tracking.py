@@ -0,0 +1,173 @@
+from typing import Sequence
+
+import numpy as np
+
+from asset.detections import DETECTION_DTYPE, ZONE_NONE, DetectionBatch
+
+# Constant-velocity model on [cx, cy, area, aspect, vcx, vcy, varea] (SORT)
+_F = np.eye(7, dtype=np.float64)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(4, 7, dtype=np.float64)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+
+def bbox_to_z(bbox: np.ndarray) -> np.ndarray:
+    """[N, 4] x1y1x2y2 -> [N, 4] (cx, cy, area, aspect)."""
+    w = np.maximum(bbox[:, 2] - bbox[:, 0], 1e-3)
+    h = np.maximum(bbox[:, 3] - bbox[:, 1], 1e-3)
+    return np.stack([bbox[:, 0] + w / 2, bbox[:, 1] + h / 2, w * h, w / h], axis=1)
+
+
+def x_to_bbox(x: np.ndarray) -> np.ndarray:
+    """[N, >=4] Kalman state -> [N, 4] x1y1x2y2."""
+    area = np.maximum(x[:, 2], 1e-3)
+    w = np.sqrt(area * np.maximum(x[:, 3], 1e-3))
+    h = area / w
+    return np.stack([x[:, 0] - w / 2, x[:, 1] - h / 2, x[:, 0] + w / 2, x[:, 1] + h / 2], axis=1)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between [N, 4] and [M, 4] boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class Tracker:
+    """
+    Lightweight SORT-style multi-object tracker.
+
+    Every track carries a Kalman filter on box center, area and aspect ratio;
+    all filters are stored as stacked arrays and predicted/updated together.
+    Detections are associated greedily by IoU within the same class. Between
+    detector runs `predict()` advances the filters and returns the predicted
+    boxes, so the detector only has to run every N frames.
+    """
+
+    def __init__(self, class_names: Sequence[str], iou_threshold: float = 0.3, max_misses: int = 3,
+                 min_hits: int = 1, first_id: int = 0):
+        """
+        Args:
+            class_names (Sequence[str]): Detector class names
+            iou_threshold (float): Minimum IoU to associate a detection with a track
+            max_misses (int): Detector runs a track may go unmatched before it is dropped
+            min_hits (int): Matches needed before a track is reported
+            first_id (int): First track id, lets several trackers use disjoint id ranges
+        """
+        self.class_names = class_names
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+
+        self.ids = np.zeros(0, dtype=np.int32)
+        self.class_ids = np.zeros(0, dtype=np.int16)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.misses = np.zeros(0, dtype=np.int32)
+        self.x = np.zeros((0, 7), dtype=np.float64)
+        self.P = np.zeros((0, 7, 7), dtype=np.float64)
+        self._next_id = first_id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _predict(self) -> None:
+        if not len(self.ids):
+            return
+        # Keep the predicted area positive
+        shrinking = self.x[:, 2] + self.x[:, 6] <= 0
+        self.x[shrinking, 6] = 0.0
+        self.x = self.x @ _F.T
+        self.P = _F @ self.P @ _F.T + _Q
+
+    def _associate(self, det_bbox: np.ndarray, det_class: np.ndarray):
+        iou = iou_matrix(x_to_bbox(self.x), det_bbox)
+        iou[self.class_ids[:, None] != det_class[None, :]] = 0.0
+
+        matches = []
+        if iou.size:
+            track_idx, det_idx = np.nonzero(iou >= self.iou_threshold)
+            order = np.argsort(-iou[track_idx, det_idx], kind="stable")
+            used_t, used_d = set(), set()
+            for t, d in zip(track_idx[order].tolist(), det_idx[order].tolist()):
+                if t in used_t or d in used_d:
+                    continue
+                used_t.add(t)
+                used_d.add(d)
+                matches.append((t, d))
+        return np.array(matches, dtype=np.intp).reshape(-1, 2)
+
+    def _kalman_update(self, tracks: np.ndarray, z: np.ndarray) -> None:
+        P = self.P[tracks]
+        S = _H @ P @ _H.T + _R
+        K = P @ _H.T @ np.linalg.inv(S)
+        y = z - self.x[tracks] @ _H.T
+        self.x[tracks] += np.einsum("nij,nj->ni", K, y)
+        self.P[tracks] = (np.eye(7) - K @ _H) @ P
+
+    def update(self, detections: DetectionBatch) -> DetectionBatch:
+        """Advance all tracks one frame and correct them with fresh detections."""
+        self._predict()
+        det_bbox = detections.bbox.astype(np.float64)
+        det_class = detections.class_id
+
+        matches = self._associate(det_bbox, det_class)
+        matched_t, matched_d = matches[:, 0], matches[:, 1]
+
+        if len(matches):
+            self._kalman_update(matched_t, bbox_to_z(det_bbox[matched_d]))
+            self.scores[matched_t] = detections.score[matched_d]
+            self.hits[matched_t] += 1
+
+        unmatched_tracks = np.ones(len(self.ids), dtype=bool)
+        unmatched_tracks[matched_t] = False
+        self.misses[unmatched_tracks] += 1
+        self.misses[matched_t] = 0
+
+        # Spawn tracks for unmatched detections
+        new = np.ones(len(detections), dtype=bool)
+        new[matched_d] = False
+        n_new = int(new.sum())
+        if n_new:
+            x_new = np.zeros((n_new, 7))
+            x_new[:, :4] = bbox_to_z(det_bbox[new])
+            self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + n_new, dtype=np.int32)])
+            self._next_id += n_new
+            self.class_ids = np.concatenate([self.class_ids, det_class[new]])
+            self.scores = np.concatenate([self.scores, detections.score[new]])
+            self.hits = np.concatenate([self.hits, np.ones(n_new, dtype=np.int32)])
+            self.misses = np.concatenate([self.misses, np.zeros(n_new, dtype=np.int32)])
+            self.x = np.concatenate([self.x, x_new])
+            self.P = np.concatenate([self.P, np.repeat(_P0[None], n_new, axis=0)])
+
+        alive = self.misses <= self.max_misses
+        if not alive.all():
+            for name in ("ids", "class_ids", "scores", "hits", "misses", "x", "P"):
+                setattr(self, name, getattr(self, name)[alive])
+
+        return self._output()
+
+    def predict(self) -> DetectionBatch:
+        """Advance all tracks one frame without a detector run."""
+        self._predict()
+        return self._output()
+
+    def _output(self) -> DetectionBatch:
+        visible = (self.misses == 0) & (self.hits >= self.min_hits)
+        data = np.zeros(int(visible.sum()), dtype=DETECTION_DTYPE)
+        data["bbox"] = x_to_bbox(self.x[visible])
+        data["score"] = self.scores[visible]
+        data["class_id"] = self.class_ids[visible]
+        data["zone"] = ZONE_NONE
+        data["track_id"] = self.ids[visible]
+        data["ttc"] = np.inf
+        return DetectionBatch(data, self.class_names)
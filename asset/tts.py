@@ -0,0 +1,250 @@
+import heapq
+import logging
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None
+
+PRIORITY_URGENT = 0  # Collision hazards: preempt whatever is being said
+PRIORITY_HIGH = 1  # Command feedback, navigation
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3  # Scene descriptions
+
+
+class SpeechWorker:
+    """
+    One long-lived speech thread for the whole application.
+
+    `speak` only queues the text and returns; the worker says queued messages
+    most urgent first (FIFO within a priority). The queue is bounded: when it
+    is full, a new message replaces the least urgent queued one, or is
+    dropped if it is not more urgent than any of them. An urgent message
+    stops lower-priority speech that is already playing, and messages can
+    carry a `max_wait` after which they are no longer worth saying. A message
+    whose text is already queued is not queued twice; a more urgent request
+    raises the queued copy's priority instead.
+
+    RHVoice-client runs as a Popen per utterance so it can be terminated;
+    without it the worker falls back to a pyttsx3 engine created inside the
+    worker thread (pyttsx3 engines must stay on one thread), and to logging
+    only when neither is available.
+    """
+
+    def __init__(self, voice: str = "angela", backend: Optional[str] = None, max_queue: int = 8):
+        """
+        Args:
+            voice (str): RHVoice voice name
+            backend (str, optional): "rhvoice", "pyttsx3" or "log"; picked automatically if None
+            max_queue (int): Messages that can wait at once
+        """
+        if backend is None:
+            if shutil.which("RHVoice-client"):
+                backend = "rhvoice"
+            elif pyttsx3 is not None:
+                backend = "pyttsx3"
+            else:
+                backend = "log"
+        self.voice = voice
+        self.backend = backend
+        self.max_queue = max_queue
+
+        self._cond = threading.Condition()
+        self._heap = []  # (priority, seq, text, deadline, done event)
+        self._seq = 0
+        self._current_priority = None
+        self._interrupted = False
+        self._proc = None
+        self._engine = None
+        self._stop = False
+        self._thread = None
+
+        self.spoken = 0
+        self.dropped = 0
+        self.expired = 0
+        self.preempted = 0
+
+    def start(self) -> "SpeechWorker":
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="SpeechWorker")
+            self._thread.start()
+            logging.info(f"Speech worker started ({self.backend})")
+        return self
+
+    def speak(self, text: str, priority: int = PRIORITY_NORMAL, max_wait: Optional[float] = None,
+              wait: bool = False) -> bool:
+        """
+        Queue a message without blocking.
+
+        Args:
+            text (str): What to say
+            priority (int): PRIORITY_URGENT ... PRIORITY_LOW, lower is more urgent
+            max_wait (float, optional): Drop the message if it has not started within this many seconds
+            wait (bool): Block until the message was said (or dropped), e.g. before listening;
+                also applies when the same text is already queued
+
+        Returns:
+            bool: False if the message was dropped because the queue is full of more urgent speech
+        """
+        if not text:
+            return False
+        with self._cond:
+            queued = next((item for item in self._heap if item[2] == text), None)
+            if queued is None:
+                done = self._push(text, priority, max_wait)
+                if done is None:
+                    return False
+            else:
+                # Already waiting to be said; a waiting caller waits for that copy
+                done = queued[4]
+                if priority < queued[0]:
+                    self._heap.remove(queued)
+                    heapq.heapify(self._heap)
+                    self._push(text, priority, max_wait, done)
+
+        if wait:
+            done.wait()
+        return True
+
+    def _push(self, text: str, priority: int, max_wait: Optional[float],
+              done: Optional[threading.Event] = None) -> Optional[threading.Event]:
+        """Queue a message (caller holds self._cond); returns its done event, None if it was dropped."""
+        if len(self._heap) >= self.max_queue:
+            least = max(self._heap)
+            if least[0] <= priority:
+                self.dropped += 1
+                return None
+            self._heap.remove(least)
+            heapq.heapify(self._heap)
+            self.dropped += 1
+            least[4].set()
+        self._seq += 1
+        deadline = time.monotonic() + max_wait if max_wait is not None else None
+        done = done or threading.Event()
+        heapq.heappush(self._heap, (priority, self._seq, text, deadline, done))
+
+        if (priority == PRIORITY_URGENT and self._current_priority is not None
+                and self._current_priority > PRIORITY_URGENT):
+            self._interrupt()
+        self._cond.notify()
+        return done
+
+    def _interrupt(self) -> None:
+        """
+        Stop the current utterance; if its process has not started yet, it is skipped.
+        pyttsx3 engines are not thread-safe, so they only see the flag and stop
+        themselves from the worker thread at the next word.
+        """
+        with self._cond:
+            self.preempted += 1
+            self._interrupted = True
+            proc = self._proc
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+
+    def _on_word(self, name, location, length) -> None:
+        # pyttsx3 callback, runs in the worker thread inside runAndWait
+        if self._interrupted:
+            self._engine.stop()
+
+    def _run(self) -> None:
+        if self.backend == "pyttsx3":
+            try:
+                self._engine = pyttsx3.init()
+                self._engine.connect("started-word", self._on_word)
+            except Exception as e:
+                logging.error(f"pyttsx3 init failed, speech is logged only: {e}")
+                self.backend = "log"
+
+        while True:
+            with self._cond:
+                while not self._heap and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    break
+                priority, _, text, deadline, done = heapq.heappop(self._heap)
+                if deadline is not None and time.monotonic() > deadline:
+                    self.expired += 1
+                    done.set()
+                    continue
+                self._current_priority = priority
+                self._interrupted = False
+
+            try:
+                self._say(text)
+                self.spoken += 1
+            except Exception as e:
+                logging.error(f"TTS error: {e}")
+            finally:
+                with self._cond:
+                    self._current_priority = None
+                    self._proc = None
+                done.set()
+
+        # Release anyone still waiting on a message that will never be said
+        with self._cond:
+            for item in self._heap:
+                item[4].set()
+            self._heap.clear()
+
+    def _say(self, text: str) -> None:
+        if self.backend == "rhvoice":
+            with self._cond:
+                if self._interrupted:
+                    # Preempted between leaving the queue and starting to speak
+                    return
+                self._proc = subprocess.Popen(
+                    ["RHVoice-client", "-s", self.voice, "-p", "100", "-r", "0", "-v", "1"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+                proc = self._proc
+            proc.communicate(text.encode("utf-8"))
+        elif self.backend == "pyttsx3":
+            if self._interrupted:
+                return
+            self._engine.say(text)
+            self._engine.runAndWait()
+        else:
+            logging.info(f"[SPEAK] {text}")
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        """Stop speaking, drop the queue and end the worker thread."""
+        with self._cond:
+            self._stop = True
+            if self._current_priority is not None:
+                self._interrupt()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "spoken": self.spoken,
+            "queued": len(self._heap),
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "preempted": self.preempted,
+        }
+
+
+_default_worker = None
+_default_lock = threading.Lock()
+
+
+def default_worker() -> SpeechWorker:
+    """The process-wide speech worker, started on first use."""
+    global _default_worker
+    with _default_lock:
+        if _default_worker is None:
+            _default_worker = SpeechWorker().start()
+        return _default_worker
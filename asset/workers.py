@@ -0,0 +1,450 @@
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from asset.detections import DetectionBatch
+
+
+def _build_detector(detector_args: dict):
+    # Imported here so the parent only pays for torch/nanodet when it uses them itself
+    from asset.Headless import NanoDetDetector
+
+    args = dict(detector_args)
+    if "artifact_path" in args:
+        return NanoDetDetector.from_artifact(**args)
+    return NanoDetDetector(**args)
+
+
+def _worker_main(worker_id: int, shm_name: str, num_slots: int, slot_shape: Tuple[int, int, int],
+                 detector_args: dict, num_threads: int, task_queue, result_conn,
+                 cpu_affinity: Optional[Sequence[int]] = None, factory: Callable = _build_detector) -> None:
+    import torch
+
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        # Before torch starts its pool, so the intra-op threads inherit the mask
+        os.sched_setaffinity(0, cpu_affinity)
+    torch.set_num_threads(num_threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((num_slots,) + tuple(slot_shape), dtype=np.uint8, buffer=shm.buf)
+    try:
+        detector = factory(detector_args)
+        info = {"class_names": list(detector.class_names), "input_size": list(detector.input_size),
+                "keep_ratio": bool(detector.keep_ratio)}
+        result_conn.send(("ready", worker_id, info, None))
+
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            kind = task[0]
+            if kind == "thresholds":
+                detector.set_class_thresholds(*task[1:])
+                continue
+            if kind == "roi":
+                detector.set_roi(task[1])
+                continue
+            if kind == "slots":
+                # The parent grew the frame ring; nothing is in flight while it swaps
+                _, shm_name, slot_shape = task
+                frames = None
+                shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+                frames = np.ndarray((num_slots,) + tuple(slot_shape), dtype=np.uint8, buffer=shm.buf)
+                continue
+
+            _, seq, slot, height, width, score_threshold = task
+            try:
+                detections = detector.get_detections(frames[slot, :height, :width], score_threshold)
+                result_conn.send((seq, slot, detections.data, None))
+            except Exception as e:
+                result_conn.send((seq, slot, None, str(e)))
+    except Exception as e:
+        result_conn.send(("error", worker_id, None, str(e)))
+    finally:
+        del frames
+        shm.close()
+        result_conn.close()
+
+
+class DetectionWorkerPool:
+    """
+    Runs NanoDetDetector in separate processes so inference does not hold the
+    GIL of the main process (voice, GPS, ultrasonic and TTS loops).
+
+    Frames are copied into a ring of fixed-size slots in one shared memory
+    block; only (seq, slot, height, width) goes through the task queue. Each
+    worker returns the structured detection array, a few hundred bytes per
+    frame, over its own pipe (a worker killed mid-write cannot block the
+    others, as it could with a shared result queue's lock). Tasks go to the
+    worker with the fewest frames in flight, so batches are spread over all
+    workers.
+
+    A worker that dies (crash, OOM kill) is noticed while waiting for results:
+    its in-flight frames fail, their slots go back to the ring, and a new
+    worker is started with the current thresholds and ROI, up to
+    `max_restarts` times per worker. A frame larger than the slots grows the
+    ring once the frames in flight are back.
+
+    Frames are submitted and collected from one thread (the detection loop);
+    `set_class_thresholds` and `set_roi` may be called from any thread.
+    """
+
+    def __init__(
+            self,
+            detector_args: dict,
+            num_workers: int = 1,
+            num_slots: int = 4,
+            max_frame_shape: Tuple[int, int, int] = (720, 1280, 3),
+            threads_per_worker: Optional[int] = None,
+            timeout: float = 5.0,
+            cpu_affinity: Optional[Sequence[int]] = None,
+            max_restarts: int = 5,
+            factory: Callable = _build_detector
+    ):
+        """
+        Args:
+            detector_args (dict): NanoDetDetector kwargs (config_path, model_path, ...) or
+                from_artifact kwargs (artifact_path, ...)
+            num_workers (int): Number of worker processes
+            num_slots (int): Frames that can be in flight at once
+            max_frame_shape (Tuple[int, int, int]): Initial (h, w, c) slot size, grown for larger frames
+            threads_per_worker (int, optional): torch threads per worker, defaults to cores / workers
+            timeout (float): Seconds to wait for a result before giving up on it
+            cpu_affinity (Sequence[int], optional): Cores for the workers, split between them
+                when there are enough; defaults to the cores the parent may use
+            max_restarts (int): Respawns per worker before it is left dead
+            factory (Callable): Module-level function building the detector from detector_args
+                inside the worker
+        """
+        self.detector_args = dict(detector_args)
+        self.num_workers = num_workers
+        self.num_slots = max(num_slots, num_workers)
+        self.slot_shape = tuple(max_frame_shape)
+        self.cpu_affinity = list(cpu_affinity) if cpu_affinity else None
+        cores = len(self.cpu_affinity) if self.cpu_affinity else (os.cpu_count() or 1)
+        self.threads_per_worker = threads_per_worker or max(1, cores // num_workers)
+        self.timeout = timeout
+        self.model_path = detector_args.get("artifact_path", detector_args.get("model_path"))
+        self.max_restarts = max_restarts
+        self.factory = factory
+
+        self.class_names: List[str] = []
+        self.input_size: Optional[List[int]] = None
+        self.keep_ratio = True
+        self.roi = None
+        self._thresholds = None
+        # Guards the worker/queue lists and the settings replayed to respawned workers
+        self._lock = threading.RLock()
+        self._ctx = None
+        self._restarts: List[int] = []
+        self._shm = None
+        self._frames = None
+        self._processes = []
+        self._task_queues = []
+        self._result_conns = []
+        self._free_slots: List[int] = []
+        self._in_flight: Dict[int, Tuple[int, int]] = {}  # seq -> (slot, worker)
+        self._load = []
+        self._done: Dict[int, Optional[np.ndarray]] = {}
+        self._abandoned = set()
+        self._seq = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0, "restarts": 0}
+
+    def start(self, ready_timeout: float = 120.0) -> "DetectionWorkerPool":
+        """Create the shared frame ring and start the workers; waits until every model is loaded."""
+        self._ctx = mp.get_context("spawn")
+        slot_bytes = int(np.prod(self.slot_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=slot_bytes * self.num_slots)
+        self._frames = np.ndarray((self.num_slots,) + self.slot_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._free_slots = list(range(self.num_slots))
+
+        for worker_id in range(self.num_workers):
+            self._processes.append(None)
+            self._task_queues.append(None)
+            self._result_conns.append(None)
+            self._load.append(0)
+            self._restarts.append(0)
+            self._spawn(worker_id)
+
+        ready = 0
+        deadline = time.monotonic() + ready_timeout
+        while ready < self.num_workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.shutdown()
+                raise RuntimeError("Detection workers did not start in time")
+            for conn in wait(self._result_conns, remaining):
+                try:
+                    kind, worker_id, payload, error = conn.recv()
+                except (EOFError, OSError):
+                    self.shutdown()
+                    raise RuntimeError("Detection worker exited while starting")
+                if kind == "error":
+                    self.shutdown()
+                    raise RuntimeError(f"Detection worker {worker_id} failed to start: {error}")
+                self._set_info(payload)
+                ready += 1
+        logging.info(f"Started {self.num_workers} detection worker(s), {self.threads_per_worker} thread(s) each")
+        return self
+
+    def _spawn(self, worker_id: int) -> None:
+        task_queue = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._shm.name, self.num_slots, self.slot_shape, self.detector_args,
+                  self.threads_per_worker, task_queue, writer, self._worker_cores(worker_id),
+                  self.factory),
+            name=f"DetectionWorker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        # Only the worker keeps the write end, so its exit shows up as EOF here
+        writer.close()
+        self._processes[worker_id] = process
+        self._task_queues[worker_id] = task_queue
+        self._result_conns[worker_id] = reader
+
+    def _set_info(self, info: dict) -> None:
+        self.class_names = info["class_names"]
+        self.input_size = info["input_size"]
+        self.keep_ratio = info["keep_ratio"]
+
+    def _check_workers(self) -> None:
+        """Fail the frames of dead workers, reclaim their slots and start replacements."""
+        with self._lock:
+            self._replace_dead_workers()
+
+    def _replace_dead_workers(self) -> None:
+        for worker_id, process in enumerate(self._processes):
+            if process is None or process.is_alive():
+                continue
+            conn = self._result_conns[worker_id]
+            if conn is not None:
+                # Keep whatever the worker finished before it died
+                try:
+                    while conn.poll():
+                        self._handle(*conn.recv())
+                except (EOFError, OSError):
+                    pass
+                conn.close()
+                self._result_conns[worker_id] = None
+            lost = [seq for seq, (_, worker) in self._in_flight.items() if worker == worker_id]
+            for seq in lost:
+                slot, _ = self._in_flight.pop(seq)
+                self._free_slots.append(slot)
+                self.counters["failed"] += 1
+                if seq in self._abandoned:
+                    self._abandoned.discard(seq)
+                else:
+                    self._done[seq] = None
+            self._load[worker_id] = 0
+            self._task_queues[worker_id].close()
+            logging.error(f"Detection worker {worker_id} exited with code {process.exitcode}, "
+                          f"{len(lost)} frame(s) lost")
+
+            if self._restarts[worker_id] >= self.max_restarts:
+                logging.error(f"Detection worker {worker_id} restarted {self.max_restarts} times, giving up on it")
+                self._processes[worker_id] = None
+                continue
+            self._restarts[worker_id] += 1
+            self.counters["restarts"] += 1
+            self._spawn(worker_id)
+            if self._thresholds is not None:
+                self._task_queues[worker_id].put(("thresholds",) + self._thresholds)
+            if self.roi is not None:
+                self._task_queues[worker_id].put(("roi", self.roi))
+
+    def _worker_cores(self, worker_id: int) -> Optional[List[int]]:
+        """Disjoint core sets per worker when every worker gets at least one core, else all of them."""
+        if not self.cpu_affinity:
+            return None
+        if len(self.cpu_affinity) >= self.num_workers:
+            return self.cpu_affinity[worker_id::self.num_workers]
+        return self.cpu_affinity
+
+    def set_class_thresholds(self, thresholds, default: float = 0.0, multiplier: float = 1.0) -> None:
+        if isinstance(thresholds, np.ndarray):
+            thresholds = thresholds.tolist()
+        with self._lock:
+            # Kept so respawned workers get the same thresholds
+            self._thresholds = (thresholds, default, multiplier)
+            self._broadcast(("thresholds", thresholds, default, multiplier))
+
+    def set_roi(self, roi) -> None:
+        with self._lock:
+            self.roi = roi
+            self._broadcast(("roi", roi))
+
+    def _broadcast(self, task: tuple) -> None:
+        """Send a task to every live worker (caller holds self._lock)."""
+        for worker_id, task_queue in enumerate(self._task_queues):
+            if self._processes[worker_id] is not None:
+                task_queue.put(task)
+
+    def _grow_slots(self, shape: Tuple[int, ...]) -> bool:
+        """Reallocate the frame ring to hold `shape`; False if frames in flight did not come back in time."""
+        deadline = time.monotonic() + self.timeout
+        while self._in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.warning(f"Could not grow worker slots for {shape}: frames still in flight")
+                return False
+            self._receive(min(remaining, 0.25))
+            self._check_workers()
+
+        slot_shape = (max(self.slot_shape[0], shape[0]), max(self.slot_shape[1], shape[1]), self.slot_shape[2])
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(slot_shape)) * self.num_slots)
+        with self._lock:
+            old = self._shm
+            self._frames = None
+            self._shm = shm
+            self.slot_shape = slot_shape
+            self._frames = np.ndarray((self.num_slots,) + slot_shape, dtype=np.uint8, buffer=shm.buf)
+            self._broadcast(("slots", shm.name, slot_shape))
+        # Workers drop their mapping when they read the task; unlinking only removes the name
+        old.close()
+        old.unlink()
+        logging.info(f"Worker frame slots grown to {slot_shape}")
+        return True
+
+    def submit(self, img: np.ndarray, score_threshold: float = 0.35) -> Optional[int]:
+        """
+        Copy a frame into a free slot and queue it.
+
+        Returns:
+            Optional[int]: Sequence number to collect the result with, or None when all slots are busy
+        """
+        height, width = img.shape[:2]
+        if img.ndim != 3 or img.shape[2] != self.slot_shape[2]:
+            raise ValueError(f"Frame {img.shape} does not match the {self.slot_shape} worker slots")
+        if (height > self.slot_shape[0] or width > self.slot_shape[1]) and not self._grow_slots(img.shape):
+            self.counters["dropped"] += 1
+            return None
+        self._check_workers()
+        with self._lock:
+            alive = [i for i, process in enumerate(self._processes) if process is not None]
+            if not self._free_slots or not alive:
+                self.counters["dropped"] += 1
+                return None
+
+            slot = self._free_slots.pop()
+            self._frames[slot, :height, :width] = img
+            worker = min(alive, key=lambda i: self._load[i])
+            seq = self._seq
+            self._seq += 1
+            self._in_flight[seq] = (slot, worker)
+            self._load[worker] += 1
+            self._task_queues[worker].put(("detect", seq, slot, height, width, score_threshold))
+        self.counters["submitted"] += 1
+        return seq
+
+    def _receive(self, timeout: float) -> bool:
+        """Handle every message that arrives within `timeout`; False if there was none."""
+        conns = [conn for conn in self._result_conns if conn is not None]
+        if not conns:
+            time.sleep(min(timeout, 0.05))
+            return False
+        ready = wait(conns, timeout)
+        for conn in ready:
+            try:
+                self._handle(*conn.recv())
+            except (EOFError, OSError):
+                # Worker gone; _check_workers replaces it once the process has exited
+                self._result_conns[self._result_conns.index(conn)] = None
+                conn.close()
+        return bool(ready)
+
+    def _handle(self, seq, slot, data, error) -> None:
+        if seq == "error":
+            logging.error(f"Detection worker {slot} died: {error}")
+            return
+        if seq == "ready":
+            logging.info(f"Detection worker {slot} restarted")
+            return
+        _, worker = self._in_flight.pop(seq)
+        self._free_slots.append(slot)
+        self._load[worker] -= 1
+        if error is not None:
+            logging.error(f"Detection worker error: {error}")
+            self.counters["failed"] += 1
+        else:
+            self.counters["completed"] += 1
+        if seq in self._abandoned:
+            self._abandoned.discard(seq)
+        else:
+            self._done[seq] = data
+
+    def collect(self, seq: int, timeout: Optional[float] = None) -> DetectionBatch:
+        """Wait for the result of one submitted frame."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while seq not in self._done:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.warning(f"Detection result {seq} timed out")
+                self._abandoned.add(seq)
+                return DetectionBatch.empty(self.class_names)
+            self._receive(min(remaining, 0.25))
+            # The worker holding the frame may have died
+            self._check_workers()
+        data = self._done.pop(seq)
+        if data is None:
+            return DetectionBatch.empty(self.class_names)
+        return DetectionBatch(data, self.class_names)
+
+    def get_detections(self, img: np.ndarray, score_threshold: float = 0.35) -> DetectionBatch:
+        seq = self.submit(img, score_threshold)
+        if seq is None:
+            return DetectionBatch.empty(self.class_names)
+        return self.collect(seq)
+
+    def get_detections_batch(self, imgs: Sequence[np.ndarray], score_threshold: float = 0.35) -> List[DetectionBatch]:
+        """Spread the frames over the workers and wait for all of them."""
+        results = []
+        for start in range(0, len(imgs), self.num_slots):
+            seqs = [self.submit(img, score_threshold) for img in imgs[start:start + self.num_slots]]
+            results.extend(DetectionBatch.empty(self.class_names) if seq is None else self.collect(seq)
+                           for seq in seqs)
+        return results
+
+    @property
+    def stats(self) -> Dict[str, Union[int, List[int]]]:
+        stats = dict(self.counters)
+        stats["in_flight"] = len(self._in_flight)
+        stats["alive"] = sum(p is not None and p.is_alive() for p in self._processes)
+        return stats
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            self._shutdown(timeout)
+
+    def _shutdown(self, timeout: float) -> None:
+        for task_queue in self._task_queues:
+            try:
+                task_queue.put(None)
+            except Exception:
+                pass
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._result_conns:
+            if conn is not None:
+                conn.close()
+        self._processes = []
+        self._task_queues = []
+        self._result_conns = []
+        if self._shm is not None:
+            self._frames = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset.Nanodet import NanoDetVisualizer
+from asset.hazard import HazardScorer
+from asset.instrument import STAGES, Instrumentation
+from asset.mjpeg import JpegDecoder
+from asset.quantize import list_frames
+from asset.tracking import Tracker
+
+
+def load_detector(args) -> NanoDetVisualizer:
+    if args.artifact:
+        return NanoDetVisualizer.from_artifact(args.artifact, fast_preprocess=not args.slow_preprocess)
+    return NanoDetVisualizer(args.config, args.model, engine=args.engine, fast_preprocess=not args.slow_preprocess)
+
+
+class MemoryJpegSource:
+    """
+    Preloaded JPEGs served back to back through the frame source interface,
+    decoded like the live ESP32 stream (reduced scale unless tiling).
+    """
+
+    def __init__(self, jpegs, decoder: JpegDecoder):
+        self.jpegs = jpegs
+        self.decode = decoder
+        self.index = 0
+
+    def is_opened(self) -> bool:
+        return bool(self.jpegs)
+
+    def read(self):
+        if self.index >= len(self.jpegs):
+            return None
+        self.index += 1
+        return self.jpegs[self.index - 1]
+
+    def release(self) -> None:
+        self.index = len(self.jpegs)
+
+
+class StageRecorder:
+    """
+    Instrumentation subscriber keeping every stage sample (for exact p99) and
+    per-frame totals; a frame cycle starts at each "capture" record.
+    """
+
+    def __init__(self, on_frame=None):
+        self.timings = {stage: [] for stage in STAGES}
+        self.totals = []
+        self.on_frame = on_frame
+        self._frame = None
+
+    def __call__(self, kind: str, name: str, value: float) -> None:
+        if kind != "timing":
+            return
+        if name == "capture":
+            self.close_frame()
+            self._frame = 0.0
+            if self.on_frame is not None:
+                self.on_frame()
+        self.timings.setdefault(name, []).append(value)
+        if self._frame is not None:
+            self._frame += value
+
+    def close_frame(self) -> None:
+        if self._frame is not None:
+            self.totals.append(self._frame)
+            self._frame = None
+
+
+def run_pass(detector, jpegs, score_threshold, hazard_scorer, tracker) -> None:
+    """One pass over the frames through process_camera, the loop the device runs."""
+
+    def on_detect(dets):
+        # The pure part of Main's detection callback (no speech, GPIO or HTTP)
+        hazard_scorer.update(dets, time.monotonic())
+        hazard_scorer.urgent(dets)
+
+    source = MemoryJpegSource(jpegs, JpegDecoder(*detector.decode_settings()))
+    detector.process_camera(url=source, score_threshold=score_threshold, log_file=None,
+                            on_detect=on_detect, tracker=tracker)
+
+
+def summarize(values) -> dict:
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "mean": float(arr.mean()),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "max": float(arr.max()),
+    }
+
+
+def measure_allocations(detector, jpegs, score_threshold) -> dict:
+    """
+    Python-heap allocations per frame cycle via tracemalloc (NumPy buffers
+    included, torch's C++ allocator is not visible to it). Run separately
+    because tracing slows everything down.
+    """
+    peaks = []
+    retained = []
+    marks = []
+
+    def on_frame():
+        current, peak = tracemalloc.get_traced_memory()
+        if marks:
+            peaks.append((peak - marks[-1]) / 1024)
+            retained.append((current - marks[-1]) / 1024)
+        marks.append(current)
+        tracemalloc.reset_peak()
+
+    instrument = Instrumentation(enabled=True)
+    instrument.subscribe(StageRecorder(on_frame))
+    detector.set_instrumentation(instrument)
+    tracemalloc.start()
+    try:
+        run_pass(detector, jpegs, score_threshold, HazardScorer(detector.class_names), Tracker(detector.class_names))
+    finally:
+        tracemalloc.stop()
+        detector.set_instrumentation(None)
+    return {
+        "frames": len(peaks),
+        "transient_kb_per_frame": summarize(peaks or [0.0]),
+        "retained_kb_per_frame": float(np.mean(retained)) if retained else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency, throughput and memory of the detection pipeline")
+    parser.add_argument("--frames", required=True, help="Directory of recorded JPEG frames")
+    parser.add_argument("--config", default="config/legacy_v0.x_configs/nanodet-m.yml")
+    parser.add_argument("--model", default="model/nanodet_m.ckpt")
+    parser.add_argument("--artifact", default=None, help="Frozen artifact to use instead of config + checkpoint")
+    parser.add_argument("--engine", default="torch", choices=["torch", "onnx", "int8"])
+    parser.add_argument("--slow-preprocess", action="store_true", help="Use the Pipeline preprocessing path")
+    parser.add_argument("--limit", type=int, default=200, help="Max frames to load")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the frame set")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--alloc-frames", type=int, default=20, help="Frames traced with tracemalloc, 0 to skip")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--score-threshold", type=float, default=0.35)
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    paths = list_frames(args.frames, args.limit)
+    jpegs = [np.fromfile(p, dtype=np.uint8).tobytes() for p in paths]
+    if not jpegs:
+        print("[ERROR] No frames found.")
+        return
+
+    start = time.perf_counter()
+    detector = load_detector(args)
+    load_s = time.perf_counter() - start
+    tracker = Tracker(detector.class_names)
+    hazard_scorer = HazardScorer(detector.class_names)
+
+    run_pass(detector, jpegs[:args.warmup], args.score_threshold, hazard_scorer, tracker)
+
+    instrument = Instrumentation(enabled=True)
+    recorder = StageRecorder()
+    instrument.subscribe(recorder)
+    detector.set_instrumentation(instrument)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        run_pass(detector, jpegs, args.score_threshold, hazard_scorer, tracker)
+    elapsed = time.perf_counter() - start
+    recorder.close_frame()
+    detector.set_instrumentation(None)
+    frames = len(recorder.totals)
+    timings = {stage: values for stage, values in recorder.timings.items() if values}
+    decode_size, _ = detector.decode_settings()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "threads": torch.get_num_threads(),
+        "model": args.artifact or args.model,
+        "engine": "artifact" if args.artifact else args.engine,
+        "fast_preprocess": not args.slow_preprocess,
+        "decode": "reduced" if decode_size is not None else "full",
+        "frames": frames,
+        "load_s": load_s,
+        "throughput_fps": frames / elapsed,
+        "stages_ms": {stage: summarize(values) for stage, values in timings.items()},
+        "total_ms": summarize(recorder.totals),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if args.alloc_frames:
+        report["allocations"] = measure_allocations(detector, jpegs[:args.alloc_frames], args.score_threshold)
+
+    print(f"{frames} frames, {report['throughput_fps']:.2f} fps, load {load_s:.2f}s, "
+          f"peak RSS {report['peak_rss_mb']:.1f} MB")
+    print(f"{'stage':>12} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for stage, stats in list(report["stages_ms"].items()) + [("total", report["total_ms"])]:
+        print(f"{stage:>12} {stats['mean']:>8.2f} {stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f}")
+    if "allocations" in report:
+        alloc = report["allocations"]
+        print(f"Allocations: {alloc['transient_kb_per_frame']['p50']:.1f} KB transient (p50), "
+              f"{alloc['retained_kb_per_frame']:.2f} KB retained per frame")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two bench_pipeline.py JSON results")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown (0.10 = 10%%)")
+    parser.add_argument("--metric", default="p95", choices=["mean", "p50", "p95", "p99"])
+    args = parser.parse_args()
+
+    base, cur = load(args.baseline), load(args.current)
+    print(f"baseline {base.get('commit', '?')} ({base.get('timestamp', '')}) vs "
+          f"current {cur.get('commit', '?')} ({cur.get('timestamp', '')}), {args.metric} ms")
+
+    regressions = []
+    rows = [(stage, base["stages_ms"][stage][args.metric], cur["stages_ms"].get(stage, {}).get(args.metric))
+            for stage in base["stages_ms"]]
+    rows.append(("total", base["total_ms"][args.metric], cur["total_ms"][args.metric]))
+    for name, old, new in rows:
+        if new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = " <-- regression" if change > args.tolerance else ""
+        print(f"{name:>12} {old:>9.2f} {new:>9.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+
+    fps_change = (cur["throughput_fps"] - base["throughput_fps"]) / base["throughput_fps"]
+    print(f"{'fps':>12} {base['throughput_fps']:>9.2f} {cur['throughput_fps']:>9.2f} {fps_change:>+8.1%}")
+    if fps_change < -args.tolerance:
+        regressions.append("throughput")
+
+    rss_change = (cur["peak_rss_mb"] - base["peak_rss_mb"]) / base["peak_rss_mb"]
+    print(f"{'rss MB':>12} {base['peak_rss_mb']:>9.1f} {cur['peak_rss_mb']:>9.1f} {rss_change:>+8.1%}")
+    if rss_change > args.tolerance:
+        regressions.append("peak_rss")
+
+    if regressions:
+        print(f"[WARNING] Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
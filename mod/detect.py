@@ -1,18 +1,19 @@
 import time
-import pyttsx3
 from asset.Nanodet import NanoDetVisualizer
+from asset.tts import PRIORITY_NORMAL, default_worker
 
 class DetectionEngine:
     def __init__(self, config_path, model_path):
         self.detector = NanoDetVisualizer(config_path, model_path)
-        self.engine = pyttsx3.init()
+        self.tts = default_worker()
         self.last_announcement = 0
         self.routing_active = False
 
     def speak(self, message):
         print("Speaking:", message)
-        self.engine.say(message)
-        self.engine.runAndWait()
+        # Queued, so the detection callback does not wait for the speech. Plain detections are
+        # not collision hazards and must not cut off other speech
+        self.tts.speak(message, PRIORITY_NORMAL, max_wait=2.0)
 
     def on_detect(self, detections):
         if self.routing_active:
@@ -2,29 +2,29 @@
 
 import RPi.GPIO as GPIO
 import time
-import pyttsx3
 import serial
 
+from asset.tts import PRIORITY_HIGH, default_worker
+
 EMERGENCY_BUTTON = 24
 SERIAL_PORT = "/dev/ttyS0"  # Adjust if needed
 BAUD_RATE = 115200
 
-engine = pyttsx3.init()
+tts = default_worker()
 emergency_number = None  # to be input via voice
 
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(EMERGENCY_BUTTON, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
 
-def speak(msg):
+def speak(msg, wait=False):
     print("[SPEAK]:", msg)
-    engine.say(msg)
-    engine.runAndWait()
+    tts.speak(msg, PRIORITY_HIGH, wait=wait)
 
 
 def set_emergency_contact():
     global emergency_number
-    speak("Please type the emergency contact number.")
+    speak("Please type the emergency contact number.", wait=True)
     number = input("Enter emergency number: ")  # Replace with voice input if available
     emergency_number = number
     speak(f"Emergency number {number} saved.")
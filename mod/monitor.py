@@ -1,25 +1,223 @@
+import threading
 import time
-import pyttsx3
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from asset.detections import DetectionBatch
+from asset.tts import PRIORITY_HIGH, PRIORITY_LOW, default_worker
+
+CROWD_CLEAR = "clear"
+CROWD_CLEARING = "clearing"
+CROWD_CROWDED = "crowded"
+
+
+class CrowdDensityEstimator:
+    """
+    Decayed occupancy grid of people (and walkable lane) in front of the user.
+
+    Each update spreads every box over a coarse rows x cols grid by the
+    fraction of each cell it covers (one outer product per class, no Python
+    loop over boxes) and blends it into an exponentially decayed map with a
+    `half_life` in seconds, so the signal follows the crowd rather than single
+    frames. Only every `every_n`-th detection frame is used; the decay is
+    time based, so skipped frames do not change the time scale.
+
+    The near-field rows give a crowded / clearing / clear state with
+    hysteresis and the freer side (fewer people, more pedestrian lane).
+    """
+
+    def __init__(self, grid: Tuple[int, int] = (3, 4), frame_size: Tuple[int, int] = (640, 480),
+                 half_life: float = 2.0, every_n: int = 3, crowded_density: float = 0.35,
+                 clear_density: float = 0.15, crowded_people: float = 5.0,
+                 person_classes: Sequence[str] = ("person",), lane_classes: Sequence[str] = ("pedestrian lane",),
+                 side_margin: float = 0.1):
+        """
+        Args:
+            grid (Tuple[int, int]): (rows, cols) of the occupancy map
+            frame_size (Tuple[int, int]): (width, height) assumed until an update brings the real size
+            half_life (float): Seconds after which an observation counts half
+            every_n (int): Use one in this many detection frames
+            crowded_density (float): Near-field person occupancy that means crowded
+            clear_density (float): Occupancy below which a crowd counts as gone
+            crowded_people (float): Decayed person count that also means crowded
+            person_classes (Sequence[str]): Classes counted as people
+            lane_classes (Sequence[str]): Classes counted as walkable path
+            side_margin (float): Occupancy difference needed to prefer one side
+        """
+        self.rows, self.cols = grid
+        self.frame_size = frame_size
+        self.half_life = half_life
+        self.every_n = max(1, every_n)
+        self.crowded_density = crowded_density
+        self.clear_density = clear_density
+        self.crowded_people = crowded_people
+        self.person_classes = tuple(person_classes)
+        self.lane_classes = tuple(lane_classes)
+        self.side_margin = side_margin
+
+        self.people_map = np.zeros(grid, dtype=np.float32)
+        self.lane_map = np.zeros(grid, dtype=np.float32)
+        self.people = 0.0
+        self.state = CROWD_CLEAR
+        self._calls = 0
+        self._last_update = None
+        self._class_ids = {}  # tuple(class_names) -> (person ids, lane ids)
+        self._lock = threading.Lock()
+        self._edges_x = np.linspace(0, 1, self.cols + 1, dtype=np.float32)
+        self._edges_y = np.linspace(0, 1, self.rows + 1, dtype=np.float32)
+
+    def _ids(self, class_names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        key = tuple(class_names)
+        if key not in self._class_ids:
+            lower = [name.lower() for name in class_names]
+            self._class_ids[key] = (
+                np.array([i for i, n in enumerate(lower) if n in self.person_classes], dtype=np.int64),
+                np.array([i for i, n in enumerate(lower) if n in self.lane_classes], dtype=np.int64),
+            )
+        return self._class_ids[key]
+
+    def _coverage(self, boxes: np.ndarray) -> np.ndarray:
+        """Fraction of each grid cell covered by the boxes (summed, may exceed 1)."""
+        if not len(boxes):
+            return np.zeros((self.rows, self.cols), dtype=np.float32)
+        width, height = self.frame_size
+        x = np.clip(boxes[:, [0, 2]] / width, 0, 1)
+        y = np.clip(boxes[:, [1, 3]] / height, 0, 1)
+        # [N, cols] and [N, rows] overlap of each box with each column / row, in cell units
+        ox = np.clip(np.minimum(x[:, 1:2], self._edges_x[1:]) - np.maximum(x[:, 0:1], self._edges_x[:-1]), 0, None)
+        oy = np.clip(np.minimum(y[:, 1:2], self._edges_y[1:]) - np.maximum(y[:, 0:1], self._edges_y[:-1]), 0, None)
+        return np.einsum("nr,nc->rc", oy * self.rows, ox * self.cols)
+
+    def _blend(self, people: np.ndarray, lane: np.ndarray, count: float, now: float) -> None:
+        dt = 0.0 if self._last_update is None else now - self._last_update
+        keep = 0.5 ** (dt / self.half_life) if self._last_update is not None else 0.0
+        self.people_map *= keep
+        self.people_map += (1 - keep) * np.minimum(people, 1.0)
+        self.lane_map *= keep
+        self.lane_map += (1 - keep) * np.minimum(lane, 1.0)
+        self.people = keep * self.people + (1 - keep) * count
+        self._last_update = now
+
+    def update(self, detections: DetectionBatch, now: Optional[float] = None,
+               frame_size: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+        """
+        Feed one detection frame.
+
+        Args:
+            detections (DetectionBatch): Detections of the frame
+            now (float, optional): Monotonic time of the frame
+            frame_size (Tuple[int, int], optional): (width, height) the boxes refer to, defaults
+                to detections.frame_size; reduced-decode frames are smaller than the camera's
+
+        Returns:
+            Optional[Dict]: The current signal (see `signal`) on frames that were used, else None
+        """
+        self._calls += 1
+        if self._calls % self.every_n:
+            return None
+        now = time.monotonic() if now is None else now
+
+        frame_size = frame_size or detections.frame_size
+        if frame_size is not None:
+            self.frame_size = frame_size
+        bbox = detections.bbox
+        person_ids, lane_ids = self._ids(detections.class_names)
+        is_person = np.isin(detections.class_id, person_ids)
+        is_lane = np.isin(detections.class_id, lane_ids)
+        people, lane = self._coverage(bbox[is_person]), self._coverage(bbox[is_lane])
+        with self._lock:
+            self._blend(people, lane, float(np.count_nonzero(is_person)), now)
+            return self._evaluate()
+
+    def decay(self, now: Optional[float] = None) -> Dict:
+        """Advance the map without detections, e.g. while nothing is in view."""
+        now = time.monotonic() if now is None else now
+        zeros = np.zeros((self.rows, self.cols), dtype=np.float32)
+        with self._lock:
+            self._blend(zeros, zeros, 0.0, now)
+            return self._evaluate()
+
+    def _evaluate(self) -> Dict:
+        # Lower rows are closest to the user
+        near = self.people_map[self.rows // 3:]
+        density = float(near.mean())
+        crowded = density >= self.crowded_density or self.people >= self.crowded_people
+        if crowded:
+            self.state = CROWD_CROWDED
+        elif self.state == CROWD_CROWDED and density < self.crowded_density:
+            self.state = CROWD_CLEARING
+        elif self.state == CROWD_CLEARING and density < self.clear_density and self.people < self.crowded_people / 2:
+            self.state = CROWD_CLEAR
+        return self.signal(density)
+
+    def signal(self, density: Optional[float] = None) -> Dict:
+        """
+        Returns:
+            Dict: {"state", "free_side" ("left", "right" or None), "density", "people"}
+        """
+        near = self.people_map[self.rows // 3:]
+        if density is None:
+            density = float(near.mean())
+        half = self.cols // 2
+        lane = self.lane_map[self.rows // 3:]
+        # Blocked = people minus a bonus for visible pedestrian lane
+        left = float(near[:, :half].mean() - 0.5 * lane[:, :half].mean())
+        right = float(near[:, self.cols - half:].mean() - 0.5 * lane[:, self.cols - half:].mean())
+        free_side = None
+        if abs(left - right) >= self.side_margin:
+            free_side = "left" if left < right else "right"
+        return {"state": self.state, "free_side": free_side, "density": round(density, 3),
+                "people": round(self.people, 1)}
+
 
 class CrowdMonitor:
-    def __init__(self):
+    def __init__(self, crowd_cooldown: float = 20.0):
         self.last_seen = time.time()
-        self.engine = pyttsx3.init()
+        self.tts = default_worker()
+        self.density = CrowdDensityEstimator()
+        self.crowd_cooldown = crowd_cooldown
+        self.last_crowd_alert = 0.0
+        self.last_crowd_state = CROWD_CLEAR
 
     def update_detection_time(self):
         self.last_seen = time.time()
 
     def check_inactivity(self):
         if time.time() - self.last_seen >= 30:
-            self.engine.say("No objects detected. Would you like a comprehensive scan?")
-            self.engine.runAndWait()
+            self.tts.speak("No objects detected. Would you like a comprehensive scan?", PRIORITY_LOW)
             self.last_seen = time.time()
+        # Detection callbacks stop while nothing is in view; let the crowd map fade anyway
+        if time.time() - self.last_seen >= 2:
+            self._announce_crowd(self.density.decay())
+
+    def crowd_analysis(self, detections, frame_size=None):
+        if isinstance(detections, DetectionBatch):
+            signal = self.density.update(detections, frame_size=frame_size)
+            if signal is not None:
+                self._announce_crowd(signal)
+            return signal
+
+        people = sum(1 for d in detections if d['class_name'].lower() == 'person')
+        if people > 5:
+            self.tts.speak("You are entering a crowded area.", PRIORITY_HIGH, max_wait=5.0)
 
-    def crowd_analysis(self, detections):
-        people = [d for d in detections if d['class_name'].lower() == 'person']
-        if len(people) > 5:
-            self.engine.say("You are entering a crowded area.")
-            self.engine.runAndWait()
+    def _announce_crowd(self, signal: Dict) -> None:
+        """Speak on state changes only, not on every crowded frame."""
+        state = signal["state"]
+        if state == self.last_crowd_state:
+            return
+        self.last_crowd_state = state
+        message = None
+        if state == CROWD_CROWDED and time.time() - self.last_crowd_alert >= self.crowd_cooldown:
+            message = "You are entering a crowded area."
+            if signal["free_side"]:
+                message += f" The {signal['free_side']} side is clearer."
+            self.last_crowd_alert = time.time()
+        elif state == CROWD_CLEARING:
+            message = "The crowd is clearing."
+        if message:
+            self.tts.speak(message, PRIORITY_HIGH, max_wait=5.0)
 
 if __name__ == '__main__':
     cm = CrowdMonitor()
@@ -4,19 +4,18 @@ import RPi.GPIO as GPIO
 import time
 import json
 from mod.GP_s import get_current_location_info
-import pyttsx3
+from asset.tts import default_worker
 
 SAVE_BUTTON_PIN = 5
 SAVE_FILE = "saved_locations.json"
 
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(SAVE_BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-engine = pyttsx3.init()
+tts = default_worker()
 
 def speak(msg):
     print("[SPEAK]:", msg)
-    engine.say(msg)
-    engine.runAndWait()
+    tts.speak(msg)
 
 def save_location():
     loc = get_current_location_info()
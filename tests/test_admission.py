@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from asset import admission
+from asset.admission import INFER, REUSE, SKIP, FrameAdmission
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def textured(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+
+
+def blurred():
+    return np.full((240, 320, 3), 128, dtype=np.uint8)
+
+
+def dark():
+    return np.full((240, 320, 3), 5, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("frame", [blurred(), dark(), textured()])
+def test_first_frame_is_always_inferred(clock, frame):
+    assert FrameAdmission().check(frame) == INFER
+
+
+@pytest.mark.parametrize("frame, gated", [(blurred(), REUSE), (dark(), SKIP), (textured(), REUSE)])
+def test_refresh_interval_bounds_every_gate(clock, frame, gated):
+    gate = FrameAdmission(refresh_interval=2.0)
+    assert gate.check(textured()) == INFER
+
+    clock[0] += 1.0
+    assert gate.check(frame) == gated
+    clock[0] += 1.5
+    assert gate.check(frame) == INFER
+    clock[0] += 0.5
+    assert gate.check(frame) == gated
+
+
+def test_moving_scene_is_inferred(clock):
+    gate = FrameAdmission()
+    assert gate.check(textured(0)) == INFER
+    assert gate.check(textured(1)) == INFER
+    assert gate.stats["saved"] == 0
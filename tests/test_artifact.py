@@ -0,0 +1,90 @@
+import os
+import types
+
+import numpy as np
+import pytest
+import torch
+
+from asset.artifact import compile_artifact, load_artifact
+from asset.engines import FrozenEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def channel_shuffle(x, groups):
+    # Same size access as nanodet's ShuffleNetV2, which tracing turns into constants
+    batchsize, num_channels, height, width = x.data.size()
+    x = x.view(batchsize, groups, num_channels // groups, height, width)
+    x = torch.transpose(x, 1, 2).contiguous()
+    return x.view(batchsize, -1, height, width)
+
+
+class ShuffleHead(torch.nn.Module):
+    def __init__(self, num_classes=2, reg_max=7):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 8, 3, stride=8, padding=1)
+        self.bn = torch.nn.BatchNorm2d(8)
+        self.out = torch.nn.Conv2d(8, num_classes + 4 * (reg_max + 1), 1)
+
+    def forward(self, x):
+        x = channel_shuffle(torch.relu(self.bn(self.conv(x))), 2)
+        return self.out(x).flatten(2).permute(0, 2, 1)
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    torch.manual_seed(0)
+    detector = types.SimpleNamespace(
+        model=ShuffleHead().eval(),
+        class_names=["person", "car"],
+        input_size=[64, 64],
+        keep_ratio=True,
+        pipeline_cfg={"normalize": [[103.53, 116.28, 123.675], [57.375, 57.12, 58.395]]},
+        decoder=types.SimpleNamespace(params=lambda: {"num_classes": 2, "strides": [8], "reg_max": 7}),
+        class_thresholds={},
+        model_path="shuffle.ckpt",
+    )
+    path = compile_artifact(detector, str(tmp_path / "shuffle.frozen.pt"))
+    return detector.model, path
+
+
+def test_frozen_engine_runs_batches(artifact):
+    model, path = artifact
+    module, meta = load_artifact(path)
+    assert meta["input_shape"] == [64, 64]
+
+    batch = torch.randn(2, 3, 64, 64)
+    with pytest.raises(RuntimeError):
+        # The traced graph itself only takes the batch size it was traced with
+        module(batch)
+
+    output = FrozenEngine(module)(batch)
+    with torch.no_grad():
+        expected = model(batch)
+    assert output.shape == expected.shape
+    assert torch.allclose(output, expected, atol=1e-4)
+
+
+def test_artifact_detect_batch_of_two(tmp_path):
+    pytest.importorskip("nanodet")
+    from nanodet.model.arch import build_model
+
+    from asset.Headless import NanoDetDetector, _DEFAULT_CFG
+    from nanodet.util import load_config
+
+    config = os.path.join(ROOT, "config", "legacy_v0.x_configs", "nanodet-m.yml")
+    cfg = _DEFAULT_CFG.clone()
+    load_config(cfg, config)
+    cfg.model.arch.backbone.pretrain = False
+    ckpt = str(tmp_path / "nanodet_m.ckpt")
+    torch.save({"state_dict": {f"model.{k}": v for k, v in build_model(cfg.model).state_dict().items()}}, ckpt)
+
+    detector = NanoDetDetector(config, ckpt)
+    path = compile_artifact(detector, str(tmp_path / "nanodet_m.frozen.pt"))
+    frozen = NanoDetDetector.from_artifact(path)
+
+    rng = np.random.default_rng(0)
+    imgs = [rng.integers(0, 255, (240, 320, 3), dtype=np.uint8) for _ in range(2)]
+    _, results = frozen.detect_batch(imgs)
+    assert set(results) == {0, 1}
+    assert len(frozen.get_detections_batch(imgs)) == 2
@@ -0,0 +1,35 @@
+import numpy as np
+
+from asset.detections import DetectionBatch
+from asset.hazard import HazardScorer
+
+COCO_NAMES = ["person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck"]
+
+
+def tracked(name, box, track_id=1):
+    detections = DetectionBatch.from_arrays(np.array([box], dtype=np.float32), np.array([0.9]),
+                                            np.array([COCO_NAMES.index(name)]), COCO_NAMES)
+    detections.data["track_id"] = track_id
+    return detections
+
+
+def test_coco_vehicles_are_hazards():
+    scorer = HazardScorer(COCO_NAMES)
+    assert [name for name, hazard in zip(COCO_NAMES, scorer.hazard_mask) if hazard] == \
+        ["bicycle", "car", "motorcycle", "bus", "train", "truck"]
+
+
+def test_growing_car_track_gets_a_ttc():
+    scorer = HazardScorer(COCO_NAMES)
+    for i, t in enumerate(np.arange(0.0, 1.0, 0.1)):
+        grow = 4.0 * i
+        detections = scorer.update(tracked("car", [100 - grow, 100 - grow, 200 + grow, 200 + grow]), t)
+    assert np.isfinite(detections.ttc[0])
+    assert len(scorer.urgent(detections, max_ttc=10.0)) == 1
+
+    # A person growing the same way is not a collision hazard
+    scorer = HazardScorer(COCO_NAMES)
+    for i, t in enumerate(np.arange(0.0, 1.0, 0.1)):
+        grow = 4.0 * i
+        detections = scorer.update(tracked("person", [100 - grow, 100 - grow, 200 + grow, 200 + grow]), t)
+    assert np.isinf(detections.ttc[0])
@@ -0,0 +1,75 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from asset.capture import FrameGrabber
+from asset.mjpeg import MJPEGStreamSource
+from asset.replay import JpegDirectorySource, MJPEGStandInServer
+
+
+@pytest.fixture
+def jpeg_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    for i in range(5):
+        frame = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+        cv2.imwrite(str(tmp_path / f"{i:03d}.jpg"), frame)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_stream_source_reads_stand_in_parts(jpeg_dir, chunked):
+    server = MJPEGStandInServer(lambda: JpegDirectorySource(jpeg_dir, realtime=False),
+                                port=0, chunked=chunked).start()
+    try:
+        source = MJPEGStreamSource(server.url)
+        assert source.is_opened()
+        frames = []
+        while True:
+            payload = source.read()
+            if payload is None:
+                break
+            frames.append(source.decode(payload))
+        source.release()
+    finally:
+        server.stop()
+
+    assert len(frames) == 5
+    assert all(frame is not None and frame.shape == (240, 320, 3) for frame in frames)
+
+
+class GarbageSource:
+    opened = 0
+
+    def __init__(self):
+        GarbageSource.opened += 1
+
+    def is_opened(self):
+        return True
+
+    def read(self):
+        time.sleep(0.005)
+        return b"not a jpeg"
+
+    def decode(self, payload):
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def release(self):
+        pass
+
+
+def test_grabber_reconnects_after_decode_failures():
+    GarbageSource.opened = 0
+    grabber = FrameGrabber(GarbageSource, initial_backoff=0.01, max_decode_failures=3).start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while grabber.reconnects == 0 and time.monotonic() < deadline:
+            assert grabber.read(timeout=0.5) is None
+    finally:
+        grabber.stop()
+
+    assert grabber.decode_failures >= 3
+    assert grabber.read_failures >= 1
+    assert grabber.reconnects >= 1
+    assert GarbageSource.opened >= 2
@@ -0,0 +1,37 @@
+import numpy as np
+
+from asset.detections import DetectionBatch
+from mod.monitor import CROWD_CROWDED, CrowdDensityEstimator
+
+CLASS_NAMES = ["person", "car", "pedestrian lane"]
+
+
+def people_on_right(width, height, count=6):
+    # Tall boxes filling the near-field right half of the frame
+    xs = np.linspace(width / 2, width - width / 8, count)
+    bboxes = np.stack([xs, np.full(count, height * 0.3), xs + width / 8, np.full(count, height)], axis=1)
+    return DetectionBatch.from_arrays(bboxes, np.full(count, 0.9), np.zeros(count), CLASS_NAMES)
+
+
+def test_reduced_decode_resolution_uses_real_frame_size():
+    estimator = CrowdDensityEstimator(every_n=1, half_life=1.0)
+    signal = None
+    for i in range(10):
+        # 320x240 frames, as MJPEGStreamSource decodes a VGA stream for a 320 input
+        detections = people_on_right(320, 240).assign_zones(320, 240)
+        signal = estimator.update(detections, now=float(i))
+
+    assert estimator.frame_size == (320, 240)
+    assert signal["state"] == CROWD_CROWDED
+    assert signal["free_side"] == "left"
+    # Right half of the near-field rows is occupied, the left half is not
+    near = estimator.people_map[estimator.rows // 3:]
+    assert near[:, estimator.cols // 2:].mean() > 0.5
+    assert near[:, :estimator.cols // 2].max() == 0
+
+
+def test_explicit_frame_size_overrides_detections():
+    estimator = CrowdDensityEstimator(every_n=1)
+    estimator.update(people_on_right(160, 120), now=0.0, frame_size=(160, 120))
+    assert estimator.frame_size == (160, 120)
+    assert estimator.people_map[:, :estimator.cols // 2].max() == 0
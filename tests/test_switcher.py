@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from asset.mjpeg import JpegDecoder, reduced_decode_flag
+from asset.switcher import ModelSwitcher
+
+CLASS_NAMES = ["person", "car"]
+
+
+def detector(size, keep_ratio, name):
+    return SimpleNamespace(class_names=CLASS_NAMES, input_size=[size, size], keep_ratio=keep_ratio, model_path=name)
+
+
+def test_switcher_decodes_for_its_largest_model():
+    switcher = ModelSwitcher([detector(320, True, "m-320"), detector(416, False, "m-416")])
+    assert switcher.input_size == [416, 416]
+    assert switcher.keep_ratio is False
+
+    # The 320 model alone would halve a 640x480 frame to 320x240, too small for the 416 level
+    assert reduced_decode_flag((640, 480), [320, 320], True) == cv2.IMREAD_REDUCED_COLOR_2
+    assert reduced_decode_flag((640, 480), switcher.input_size, switcher.keep_ratio) == cv2.IMREAD_COLOR
+
+    ok, jpeg = cv2.imencode(".jpg", np.zeros((480, 640, 3), dtype=np.uint8))
+    frame = JpegDecoder(switcher.input_size, switcher.keep_ratio)(jpeg.tobytes())
+    assert frame.shape[0] >= 416 and frame.shape[1] >= 416
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from asset.tts import PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_URGENT, SpeechWorker
+
+
+class SlowWorker(SpeechWorker):
+    """Logs instead of speaking; every utterance takes `duration` seconds."""
+
+    def __init__(self, duration=0.2):
+        super().__init__(backend="log")
+        self.duration = duration
+        self.said = []
+
+    def _say(self, text):
+        time.sleep(self.duration)
+        self.said.append(text)
+
+
+def test_waiting_on_a_queued_duplicate_waits_for_it():
+    worker = SlowWorker().start()
+    try:
+        worker.speak("first")
+        worker.speak("second", PRIORITY_LOW)
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        assert worker.speak("second", PRIORITY_LOW, wait=True)
+        assert time.monotonic() - start >= 0.3
+        assert worker.said == ["first", "second"]
+    finally:
+        worker.shutdown()
+
+
+def test_duplicates_are_said_once():
+    worker = SlowWorker(duration=0.1).start()
+    try:
+        worker.speak("busy")
+        time.sleep(0.02)
+        for _ in range(3):
+            worker.speak("again", PRIORITY_NORMAL)
+        worker.speak("done", PRIORITY_LOW, wait=True)
+        assert worker.said == ["busy", "again", "done"]
+    finally:
+        worker.shutdown()
+
+
+def test_shutdown_releases_waiters():
+    worker = SlowWorker(duration=0.5).start()
+    worker.speak("long")
+    time.sleep(0.05)
+    released = threading.Event()
+    waiter = threading.Thread(target=lambda: (worker.speak("queued", wait=True), released.set()))
+    waiter.start()
+    time.sleep(0.05)
+    worker.shutdown()
+    assert released.wait(2.0)
+
+
+def test_urgent_duplicate_raises_the_queued_copy():
+    worker = SlowWorker().start()
+    try:
+        worker.speak("first")
+        time.sleep(0.05)
+        worker.speak("later", PRIORITY_LOW)
+        worker.speak("car ahead", PRIORITY_LOW)
+        worker.speak("car ahead", PRIORITY_URGENT)
+        worker.speak("end", PRIORITY_LOW, wait=True)
+        assert worker.said == ["first", "car ahead", "later", "end"]
+        assert worker.preempted == 1
+    finally:
+        worker.shutdown()
+
+
+class FakeEngine:
+    def __init__(self):
+        self.stopped_from = []
+
+    def stop(self):
+        self.stopped_from.append(threading.current_thread().name)
+
+
+def test_interrupt_leaves_the_pyttsx3_engine_to_the_worker_thread():
+    worker = SpeechWorker(backend="log")
+    worker._engine = FakeEngine()
+    worker._interrupt()
+    assert worker._engine.stopped_from == []
+    # The engine's word callback (worker thread) performs the stop
+    worker._on_word("utterance", 0, 3)
+    assert worker._engine.stopped_from == [threading.current_thread().name]
@@ -0,0 +1,114 @@
+import os
+import signal
+import time
+
+import numpy as np
+import pytest
+
+from asset.detections import DetectionBatch
+from asset.workers import DetectionWorkerPool
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+
+
+class FakeDetector:
+    class_names = ["person", "car"]
+    input_size = [320, 320]
+    keep_ratio = True
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.default_threshold = 0.9
+
+    def set_class_thresholds(self, thresholds, default=0.0, multiplier=1.0):
+        self.default_threshold = default
+
+    def set_roi(self, roi):
+        pass
+
+    def get_detections(self, img, score_threshold=0.35):
+        time.sleep(self.delay)
+        # One box per frame, tagged with the frame's mean so results can be matched to frames
+        value = float(img.mean())
+        # The score reports the last default threshold, so tests can see which settings a worker has
+        return DetectionBatch.from_arrays(np.array([[0, 0, value, value]]), np.array([self.default_threshold]),
+                                          np.array([0]), self.class_names)
+
+
+def fake_detector(detector_args):
+    return FakeDetector(detector_args.get("delay", 0.0))
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def kill(pool, worker_id=0):
+    process = pool._processes[worker_id]
+    os.kill(process.pid, signal.SIGKILL)
+    process.join(5.0)
+
+
+def test_dead_worker_is_respawned():
+    pool = DetectionWorkerPool({}, num_workers=1, num_slots=2, max_frame_shape=(48, 64, 3),
+                               timeout=10.0, factory=fake_detector).start()
+    try:
+        assert pool.class_names == FakeDetector.class_names
+        assert pool.input_size == [320, 320]
+        assert pool.get_detections(frame(7)).bbox[0, 2] == 7
+
+        kill(pool)
+        assert pool.get_detections(frame(9)).bbox[0, 2] == 9
+        assert pool.stats["restarts"] == 1
+        assert pool.stats["alive"] == 1
+        assert sorted(pool._free_slots) == [0, 1]
+    finally:
+        pool.shutdown()
+
+
+def test_in_flight_frames_of_a_dead_worker_fail_and_free_their_slots():
+    pool = DetectionWorkerPool({"delay": 2.0}, num_workers=1, num_slots=2, max_frame_shape=(48, 64, 3),
+                               timeout=10.0, max_restarts=0, factory=fake_detector).start()
+    try:
+        seqs = [pool.submit(frame(1)), pool.submit(frame(2))]
+        assert pool.submit(frame(3)) is None  # ring full
+        time.sleep(0.2)
+        kill(pool)
+
+        start = time.monotonic()
+        assert [len(pool.collect(seq)) for seq in seqs] == [0, 0]
+        assert time.monotonic() - start < 2.0
+        assert pool.stats["failed"] == 2
+        assert sorted(pool._free_slots) == [0, 1]
+        # Restarts exhausted: frames are dropped instead of queued to a dead worker
+        assert pool.submit(frame(4)) is None
+        assert pool.stats["alive"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_thresholds_set_while_a_worker_is_dead_reach_its_replacement():
+    pool = DetectionWorkerPool({}, num_workers=1, num_slots=2, max_frame_shape=(48, 64, 3),
+                               timeout=10.0, factory=fake_detector).start()
+    try:
+        kill(pool)
+        # Lands on the dead worker's queue before the pool notices the death
+        pool.set_class_thresholds([0.5, 0.5], 0.5)
+        assert pool.get_detections(frame(3)).score[0] == pytest.approx(0.5)
+        assert pool.stats["restarts"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_larger_frames_grow_the_slots():
+    pool = DetectionWorkerPool({}, num_workers=2, num_slots=2, max_frame_shape=(48, 64, 3),
+                               timeout=10.0, factory=fake_detector).start()
+    try:
+        assert pool.get_detections(frame(5)).bbox[0, 2] == 5
+        big = np.full((120, 160, 3), 11, dtype=np.uint8)
+        results = pool.get_detections_batch([big, big])
+        assert [r.bbox[0, 2] for r in results] == [11, 11]
+        assert pool.slot_shape == (120, 160, 3)
+        assert pool.get_detections(frame(6)).bbox[0, 2] == 6
+    finally:
+        pool.shutdown()
@@ -0,0 +1,36 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset.Headless import NanoDetDetector
+from asset.artifact import compile_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a NanoDet config + checkpoint into a frozen artifact")
+    parser.add_argument("--config", default="config/legacy_v0.x_configs/nanodet-m.yml")
+    parser.add_argument("--model", default="model/nanodet_m.ckpt")
+    parser.add_argument("--out", default=None, help="Defaults to <checkpoint>.frozen.pt")
+    args = parser.parse_args()
+
+    out = args.out or os.path.splitext(args.model)[0] + ".frozen.pt"
+
+    start = time.perf_counter()
+    detector = NanoDetDetector(args.config, args.model)
+    build_time = time.perf_counter() - start
+
+    compile_artifact(detector, out)
+
+    start = time.perf_counter()
+    NanoDetDetector.from_artifact(out)
+    load_time = time.perf_counter() - start
+
+    print(f"[INFO] Artifact written to {out}")
+    print(f"[INFO] Startup: config + checkpoint {build_time:.2f}s, artifact {load_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
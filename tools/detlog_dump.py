@@ -0,0 +1,69 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset.detlog import log_files, read_records
+
+
+def parse_time(value):
+    return time.mktime(time.strptime(value, "%Y-%m-%d %H:%M:%S"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turn a detection log (.jsonl.gz) back into text")
+    parser.add_argument("path", nargs="?", default="detections.jsonl.gz",
+                        help="Current log file; its rotated files are read first unless --only")
+    parser.add_argument("--only", action="store_true", help="Read just this file, not its rotated siblings")
+    parser.add_argument("--format", default="text", choices=["text", "boxes", "jsonl", "csv"])
+    parser.add_argument("--class", dest="class_name", default=None, help="Keep only this class")
+    parser.add_argument("--since", default=None, help="YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--until", default=None, help="YYYY-MM-DD HH:MM:SS")
+    args = parser.parse_args()
+
+    files = [args.path] if args.only else log_files(args.path)
+    if not files:
+        print(f"[ERROR] No detection log found at {args.path}")
+        return
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until) if args.until else None
+
+    writer = None
+    if args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["time", "source", "class", "score", "x1", "y1", "x2", "y2", "track_id"])
+
+    for path in files:
+        for record in read_records(path):
+            if (since and record["t"] < since) or (until and record["t"] > until):
+                continue
+            rows = list(zip(record["class_names"], record["scores"], record["bboxes"],
+                            record.get("track_ids", [-1] * len(record["scores"]))))
+            if args.class_name:
+                rows = [r for r in rows if r[0] == args.class_name]
+                if not rows:
+                    continue
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["t"]))
+            source = record.get("source", "")
+
+            if args.format == "text":
+                names = list(dict.fromkeys(r[0] for r in rows))
+                print(f"{stamp}: {', '.join(names)}")
+            elif args.format == "boxes":
+                print(f"{stamp}{' [' + source + ']' if source else ''}")
+                for name, score, bbox, track_id in rows:
+                    track = f" #{track_id}" if track_id >= 0 else ""
+                    print(f"    {name}{track} {score:.2f} [{', '.join(f'{v:.0f}' for v in bbox)}]")
+            elif args.format == "jsonl":
+                print(json.dumps(record))
+            else:
+                for name, score, bbox, track_id in rows:
+                    writer.writerow([f"{record['t']:.3f}", source, name, score, *bbox, track_id])
+
+
+if __name__ == "__main__":
+    main()
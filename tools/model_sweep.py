@@ -0,0 +1,234 @@
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset.quantize import list_frames
+
+# Our 15 classes, as in config/my-config.yml
+OUR_CLASSES = [
+    "bollard", "bus", "curb", "establishment", "motorcycle",
+    "pedestrian lane", "person", "post", "pothole", "sidewalk",
+    "signage", "stairs", "stoplight", "trash", "vehicle"
+]
+WEIGHT_EXTENSIONS = (".ckpt", ".pth")
+
+
+def find_weights(config_path, weights_dir):
+    """Checkpoint next to the config name, e.g. nanodet-m.yml -> model/nanodet_m.ckpt."""
+    stem = os.path.splitext(os.path.basename(config_path))[0]
+    for name in dict.fromkeys([stem, stem.replace("-", "_"), stem.lower(), stem.lower().replace("-", "_")]):
+        for ext in WEIGHT_EXTENSIONS:
+            path = os.path.join(weights_dir, name + ext)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def load_ground_truth(annotation_path, frame_paths):
+    """COCO-style annotations -> {file name: (boxes [N, 4] x1y1x2y2, class ids [N] in OUR_CLASSES)}."""
+    with open(annotation_path) as f:
+        coco = json.load(f)
+    cat_to_ours = {c["id"]: OUR_CLASSES.index(c["name"]) for c in coco["categories"] if c["name"] in OUR_CLASSES}
+    images = {img["id"]: os.path.basename(img["file_name"]) for img in coco["images"]}
+    wanted = {os.path.basename(p) for p in frame_paths}
+
+    gt = {name: ([], []) for name in wanted}
+    for ann in coco["annotations"]:
+        name = images.get(ann["image_id"])
+        if name not in gt or ann["category_id"] not in cat_to_ours or ann.get("iscrowd", 0):
+            continue
+        x, y, w, h = ann["bbox"]
+        gt[name][0].append([x, y, x + w, y + h])
+        gt[name][1].append(cat_to_ours[ann["category_id"]])
+    return {name: (np.array(b, dtype=np.float32).reshape(-1, 4), np.array(c, dtype=np.int64))
+            for name, (b, c) in gt.items()}
+
+
+def average_precision(recall, precision):
+    """All-point interpolated AP (VOC 2010+)."""
+    mrec = np.concatenate([[0.0], recall, [1.0]])
+    mpre = np.concatenate([[0.0], precision, [0.0]])
+    mpre = np.maximum.accumulate(mpre[::-1])[::-1]
+    idx = np.nonzero(mrec[1:] != mrec[:-1])[0]
+    return float(np.sum((mrec[idx + 1] - mrec[idx]) * mpre[idx + 1]))
+
+
+def map_at_50(predictions, gt, num_classes, iou_threshold=0.5):
+    """
+    mAP@0.5 over the classes that have ground truth.
+
+    Args:
+        predictions (dict): file name -> (boxes [N, 4], scores [N], class ids [N])
+        gt (dict): file name -> (boxes [M, 4], class ids [M])
+
+    Returns:
+        Tuple[float, dict]: mAP and per-class AP keyed by class name
+    """
+    per_class = {}
+    for c in range(num_classes):
+        n_gt = sum(int(np.count_nonzero(cls == c)) for _, cls in gt.values())
+        if n_gt == 0:
+            continue
+        scores, tp = [], []
+        for name, (gt_boxes, gt_cls) in gt.items():
+            boxes, det_scores, det_cls = predictions.get(name, (np.zeros((0, 4)), np.zeros(0), np.zeros(0)))
+            mask = det_cls == c
+            boxes, det_scores = boxes[mask], det_scores[mask]
+            order = np.argsort(-det_scores)
+            boxes, det_scores = boxes[order], det_scores[order]
+            g = gt_boxes[gt_cls == c]
+            matched = np.zeros(len(g), dtype=bool)
+            for box, score in zip(boxes, det_scores):
+                hit = False
+                if len(g):
+                    ix1 = np.maximum(g[:, 0], box[0])
+                    iy1 = np.maximum(g[:, 1], box[1])
+                    ix2 = np.minimum(g[:, 2], box[2])
+                    iy2 = np.minimum(g[:, 3], box[3])
+                    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+                    union = (box[2] - box[0]) * (box[3] - box[1]) + (g[:, 2] - g[:, 0]) * (g[:, 3] - g[:, 1]) - inter
+                    iou = np.where(matched, 0.0, inter / np.maximum(union, 1e-6))
+                    best = int(np.argmax(iou))
+                    if iou[best] >= iou_threshold:
+                        matched[best] = True
+                        hit = True
+                scores.append(score)
+                tp.append(hit)
+        if not scores:
+            per_class[OUR_CLASSES[c]] = 0.0
+            continue
+        order = np.argsort(-np.asarray(scores), kind="stable")
+        tp = np.asarray(tp, dtype=np.float64)[order]
+        tp_cum = np.cumsum(tp)
+        fp_cum = np.cumsum(1.0 - tp)
+        per_class[OUR_CLASSES[c]] = average_precision(tp_cum / n_gt, tp_cum / np.maximum(tp_cum + fp_cum, 1e-9))
+    m_ap = float(np.mean(list(per_class.values()))) if per_class else 0.0
+    return m_ap, per_class
+
+
+def evaluate_one(config, weights, frames_dir, limit, annotations, score_threshold, threads):
+    """Runs in a fresh process so load time and memory are not skewed by earlier models."""
+    import psutil
+    import torch
+
+    from asset.Headless import NanoDetDetector
+
+    if threads:
+        torch.set_num_threads(threads)
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    detector = NanoDetDetector(config, weights, fast_preprocess=True)
+    load_s = time.perf_counter() - start
+    rss_loaded = process.memory_info().rss
+
+    paths = list_frames(frames_dir, limit)
+    frames = [(os.path.basename(p), cv2.imread(p)) for p in paths]
+    frames = [(name, f) for name, f in frames if f is not None]
+
+    # Model class ids -> our class ids (-1 for classes we do not use)
+    to_ours = np.array([OUR_CLASSES.index(n) if n in OUR_CLASSES else -1 for n in detector.class_names])
+
+    detector.get_detections(frames[0][1], score_threshold)  # warm-up
+    latencies = []
+    predictions = {}
+    for name, frame in frames:
+        t0 = time.perf_counter()
+        dets = detector.get_detections(frame, score_threshold)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        ours = to_ours[dets.class_id]
+        keep = ours >= 0
+        predictions[name] = (dets.bbox[keep], dets.score[keep], ours[keep])
+
+    lat = np.asarray(latencies)
+    result = {
+        "config": config,
+        "weights": weights,
+        "input_size": list(detector.input_size),
+        "classes_covered": int(np.count_nonzero(to_ours >= 0)),
+        "load_s": load_s,
+        "latency_ms_p50": float(np.percentile(lat, 50)),
+        "latency_ms_p95": float(np.percentile(lat, 95)),
+        "model_mb": (rss_loaded - rss_before) / (1024 * 1024),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+        "frames": len(frames),
+    }
+    if annotations:
+        gt = load_ground_truth(annotations, paths)
+        result["map50"], result["ap50_per_class"] = map_at_50(predictions, gt, len(OUR_CLASSES))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / mAP@0.5 / memory sweep over the config/ YAMLs")
+    parser.add_argument("--frames", required=True, help="Directory of evaluation frames")
+    parser.add_argument("--annotations", default=None, help="COCO-style JSON for the frames (enables mAP)")
+    parser.add_argument("--configs", default="config", help="Directory searched recursively for .yml files")
+    parser.add_argument("--weights-dir", default="model")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--score-threshold", type=float, default=0.05, help="Low so AP sees the full PR curve")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--json", default=None, help="Write all results to this file")
+    parser.add_argument("--single", nargs=2, metavar=("CONFIG", "WEIGHTS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = evaluate_one(args.single[0], args.single[1], args.frames, args.limit, args.annotations,
+                              args.score_threshold, args.threads)
+        print("RESULT " + json.dumps(result))
+        return
+
+    configs = sorted(glob.glob(os.path.join(args.configs, "**", "*.yml"), recursive=True))
+    results, skipped = [], []
+    for config in configs:
+        weights = find_weights(config, args.weights_dir)
+        if weights is None:
+            skipped.append(config)
+            continue
+        print(f"[INFO] Evaluating {config} with {weights}...")
+        cmd = [sys.executable, os.path.abspath(__file__), "--single", config, weights,
+               "--frames", args.frames, "--limit", str(args.limit),
+               "--score-threshold", str(args.score_threshold)]
+        if args.annotations:
+            cmd += ["--annotations", args.annotations]
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")]
+        if proc.returncode != 0 or not lines:
+            print(f"[WARNING] {config} failed: {proc.stderr.strip().splitlines()[-1:] or proc.returncode}")
+            continue
+        results.append(json.loads(lines[-1][len("RESULT "):]))
+
+    if skipped:
+        print(f"[INFO] No weights in {args.weights_dir} for: {', '.join(os.path.basename(c) for c in skipped)}")
+    if not results:
+        print("[ERROR] No model could be evaluated.")
+        return
+
+    results.sort(key=lambda r: r["latency_ms_p50"])
+    print(f"{'config':<42} {'input':>9} {'p50 ms':>8} {'p95 ms':>8} {'mAP50':>7} {'MB':>7} {'load s':>7}")
+    for r in results:
+        m_ap = f"{r['map50']:.3f}" if "map50" in r else "-"
+        size = "x".join(str(v) for v in r["input_size"])
+        print(f"{os.path.relpath(r['config'], args.configs):<42} {size:>9} {r['latency_ms_p50']:>8.1f} "
+              f"{r['latency_ms_p95']:>8.1f} {m_ap:>7} {r['model_mb']:>7.1f} {r['load_s']:>7.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
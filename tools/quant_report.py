@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset.Headless import NanoDetDetector
+from asset.quantize import calibrate_int8, list_frames
+
+
+def box_iou(a, b) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_frame(reference, candidate, iou_threshold=0.5):
+    """Greedy same-class IoU matching; returns (matched, score deltas)."""
+    used = set()
+    deltas = []
+    for ref in sorted(reference, key=lambda d: -d['score']):
+        best, best_iou = None, iou_threshold
+        for j, det in enumerate(candidate):
+            if j in used or det['class_id'] != ref['class_id']:
+                continue
+            iou = box_iou(ref['bbox'], det['bbox'])
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        if best is not None:
+            used.add(best)
+            deltas.append(candidate[best]['score'] - ref['score'])
+    return len(used), deltas
+
+
+def run_engine(detector, frames, score_threshold):
+    latencies = []
+    outputs = []
+    detector.get_detections(frames[0], score_threshold)  # warm-up
+    for frame in frames:
+        start = time.perf_counter()
+        outputs.append(detector.get_detections(frame, score_threshold))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate an INT8 NanoDet model and compare it with FP32")
+    parser.add_argument("--config", default="config/my-config.yml")
+    parser.add_argument("--model", required=True, help="FP32 checkpoint")
+    parser.add_argument("--frames", required=True, help="Directory of captured street frames")
+    parser.add_argument("--calib-limit", type=int, default=200)
+    parser.add_argument("--eval-limit", type=int, default=None)
+    parser.add_argument("--method", choices=["minmax", "percentile"], default="minmax")
+    parser.add_argument("--score-threshold", type=float, default=0.35)
+    parser.add_argument("--skip-calibration", action="store_true", help="Reuse an existing .int8.onnx")
+    parser.add_argument("--json", default=None, help="Write the report to this file")
+    args = parser.parse_args()
+
+    fp32 = NanoDetDetector(args.config, args.model)
+    if not args.skip_calibration:
+        path = calibrate_int8(fp32, args.frames, limit=args.calib_limit, method=args.method)
+        print(f"[INFO] INT8 model written to {path}")
+    int8 = NanoDetDetector(args.config, args.model, engine="int8")
+
+    frames = [cv2.imread(p) for p in list_frames(args.frames, args.eval_limit)]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        print("[ERROR] No readable frames to evaluate.")
+        return
+
+    ref_out, ref_lat = run_engine(fp32, frames, args.score_threshold)
+    q_out, q_lat = run_engine(int8, frames, args.score_threshold)
+
+    matched = ref_total = q_total = 0
+    deltas = []
+    for ref, cand in zip(ref_out, q_out):
+        m, d = match_frame(ref, cand)
+        matched += m
+        deltas.extend(d)
+        ref_total += len(ref)
+        q_total += len(cand)
+
+    recall = matched / ref_total if ref_total else 1.0
+    precision = matched / q_total if q_total else 1.0
+    report = {
+        "frames": len(frames),
+        "fp32_ms": {"mean": float(ref_lat.mean()), "p50": float(np.percentile(ref_lat, 50)),
+                    "p95": float(np.percentile(ref_lat, 95))},
+        "int8_ms": {"mean": float(q_lat.mean()), "p50": float(np.percentile(q_lat, 50)),
+                    "p95": float(np.percentile(q_lat, 95))},
+        "speedup": float(ref_lat.mean() / q_lat.mean()),
+        "fp32_detections": ref_total,
+        "int8_detections": q_total,
+        "recall_vs_fp32": recall,
+        "precision_vs_fp32": precision,
+        "mean_score_delta": float(np.mean(deltas)) if deltas else 0.0,
+    }
+
+    print(f"{'':>10} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for name in ("fp32", "int8"):
+        lat = report[f"{name}_ms"]
+        print(f"{name:>10} {lat['mean']:>10.2f} {lat['p50']:>10.2f} {lat['p95']:>10.2f}")
+    print(f"Speedup: {report['speedup']:.2f}x")
+    print(f"INT8 vs FP32 on {len(frames)} frames: recall {recall:.3f}, precision {precision:.3f}, "
+          f"mean score delta {report['mean_score_delta']:+.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset.replay import MJPEGStandInServer, open_replay_source
+
+
+def serve(args):
+    server = MJPEGStandInServer(
+        lambda: open_replay_source(args.path, realtime=True, loop=args.loop, fps=args.fps),
+        host=args.host, port=args.port, chunked=args.chunked
+    ).start()
+    print(f"[INFO] Serving {args.path} at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"[INFO] {server.stats}")
+
+
+def run(args):
+    from asset.Nanodet import NanoDetVisualizer
+
+    if args.artifact:
+        detector = NanoDetVisualizer.from_artifact(args.artifact, fast_preprocess=True)
+    else:
+        detector = NanoDetVisualizer(args.config, args.model, engine=args.engine, fast_preprocess=True)
+
+    # Same reduced-scale decode as the live ESP32 stream
+    input_size, keep_ratio = detector.decode_settings()
+    source = open_replay_source(args.path, realtime=not args.fast, loop=False, fps=args.fps,
+                                input_size=input_size, keep_ratio=keep_ratio)
+    start = time.perf_counter()
+    detector.process_camera(url=source, score_threshold=args.score, log_file=args.log)
+    print(f"[INFO] Replay finished in {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames without the ESP32-CAM")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Serve a recording as an ESP32-CAM style /stream endpoint")
+    p_serve.add_argument("path", help="Directory of JPEGs or a video file")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8081)
+    p_serve.add_argument("--fps", type=float, default=10.0, help="Playback rate for JPEG directories")
+    p_serve.add_argument("--loop", action="store_true")
+    p_serve.add_argument("--chunked", action="store_true", help="Chunked transfer encoding like the ESP32 firmware")
+    p_serve.set_defaults(func=serve)
+
+    p_run = sub.add_parser("run", help="Run the detection loop over a recording")
+    p_run.add_argument("path", help="Directory of JPEGs or a video file")
+    p_run.add_argument("--config", default="config/legacy_v0.x_configs/nanodet-m.yml")
+    p_run.add_argument("--model", default="model/nanodet_m.ckpt")
+    p_run.add_argument("--artifact", default=None, help="Frozen artifact to use instead of config + checkpoint")
+    p_run.add_argument("--engine", default="torch", choices=["torch", "onnx", "int8"])
+    p_run.add_argument("--fps", type=float, default=10.0, help="Playback rate for JPEG directories")
+    p_run.add_argument("--fast", action="store_true", help="Process every frame as fast as possible")
+    p_run.add_argument("--score", type=float, default=0.35)
+    p_run.add_argument("--log", default=None, help="Detection log file")
+    p_run.set_defaults(func=run)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()